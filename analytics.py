@@ -0,0 +1,195 @@
+# Class-level mistake analytics over verdict logs (verdict_log.py).
+#
+#   python analytics.py verdicts.jsonl                           # summary JSON on stdout
+#   python analytics.py logs/*.jsonl.gz -o summary.json --period week --top 20
+#   python analytics.py verdicts.jsonl --since 2026-01-05 --mode Implicit
+#
+# Logs are streamed through a generator pipeline (lines -> records -> filter
+# -> aggregate), each line counted as it goes past, so memory depends on the
+# number of distinct problems, tags and periods, never on the number of rows.
+# The summary reports mistake frequencies per rule (STEP_EXPLANATIONS tag),
+# per problem and per period.
+#
+# Verdict lines differ mostly in their timestamp: verdict_log writes "ts"
+# first, so the timestamp is read off the front of each line and the rest is
+# decoded through a bounded cache (DECODE_CACHE_SIZE), so a line repeated
+# across the log is JSON-decoded about once instead of on every row.
+import argparse
+import gzip
+import json
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from step_explanations import STEP_EXPLANATIONS
+
+PERIODS = {"hour": 3600, "day": 86400, "week": 7 * 86400}
+WRONG = ("incorrect", "missing", "unparsable")
+TS_PREFIX = '{"ts":'
+DECODE_CACHE_SIZE = 4096  # distinct line bodies kept decoded
+
+
+# ---------------- PIPELINE ---------------- #
+def read_lines(paths):
+    for path in paths:
+        if path == "-":
+            yield from sys.stdin
+            continue
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            yield from f
+
+@lru_cache(maxsize=DECODE_CACHE_SIZE)
+def _decode_body(body):
+    """A verdict line after its timestamp -> record, or None; shared, so never modified."""
+    try:
+        record = json.loads("{" + body)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) and "status" in record else None
+
+def parse_records(lines, seconds, errors, since=None, until=None):
+    """(period index, record) for each verdict line; undecodable ones go to errors["bad_lines"]."""
+    for line in lines:
+        ts = record = None
+        if line.startswith(TS_PREFIX):
+            comma = line.find(",", len(TS_PREFIX))
+            try:
+                ts = float(line[len(TS_PREFIX):comma])
+            except ValueError:
+                pass
+            else:
+                record = _decode_body(line[comma + 1:].rstrip())
+        if ts is None:
+            # Not in verdict_log's layout; decode it here
+            try:
+                record = json.loads(line)
+                ts = float(record.pop("ts", 0))
+            except (ValueError, TypeError, AttributeError):
+                record = None
+            if not isinstance(record, dict) or "status" not in record:
+                record = None
+        if record is None:
+            errors["bad_lines"] += bool(line.strip())
+            continue
+        if (since is not None and ts < since) or (until is not None and ts >= until):
+            continue
+        yield int(ts // seconds), record
+
+def select(records, mode=None):
+    for bucket, record in records:
+        if mode is None or record.get("mode") == mode:
+            yield bucket, record
+
+
+# ---------------- AGGREGATION ---------------- #
+class Summary:
+    """Running counts per status, tag, problem and period."""
+
+    def __init__(self, period="day"):
+        self.period = period
+        self.seconds = PERIODS[period]
+        self.rows = 0
+        self.statuses = Counter()
+        self.tags = Counter()
+        self.tag_problems = {}   # tag -> set of problem hashes
+        self.problems = {}       # hash -> [statuses, tags, mode, order, inputs]
+        self.timeline = {}       # period index -> [statuses, tags]
+
+    def add(self, bucket, record, count=1):
+        status, tag = record["status"], record.get("tag")
+        problem = record.get("problem")
+        self.rows += count
+        self.statuses[status] += count
+
+        entry = self.problems.get(problem)
+        if entry is None:
+            entry = self.problems[problem] = [Counter(), Counter(), record.get("mode"),
+                                              record.get("order", 1), record.get("inputs")]
+        entry[0][status] += count
+
+        slot = self.timeline.get(bucket)
+        if slot is None:
+            slot = self.timeline[bucket] = [Counter(), Counter()]
+        slot[0][status] += count
+
+        if tag:
+            self.tags[tag] += count
+            self.tag_problems.setdefault(tag, set()).add(problem)
+            entry[1][tag] += count
+            slot[1][tag] += count
+
+    def consume(self, records):
+        for bucket, record in records:
+            self.add(bucket, record)
+        return self
+
+    def to_dict(self, top=10):
+        def wrong(statuses):
+            return sum(statuses[s] for s in WRONG)
+
+        problems = sorted(self.problems.items(), key=lambda item: wrong(item[1][0]), reverse=True)
+        return {
+            "rows": self.rows,
+            "period": self.period,
+            "statuses": dict(self.statuses),
+            "rules": [
+                {"tag": tag, "title": STEP_EXPLANATIONS.get(tag, {}).get("title", tag),
+                 "count": count, "problems": len(self.tag_problems[tag])}
+                for tag, count in self.tags.most_common()
+            ],
+            "problems": [
+                {"problem": problem, "mode": mode, "order": order, "inputs": inputs,
+                 "lines": sum(statuses.values()), "wrong": wrong(statuses),
+                 "wrong_rate": round(wrong(statuses) / sum(statuses.values()), 4),
+                 "statuses": dict(statuses), "rules": dict(tags.most_common(5))}
+                for problem, (statuses, tags, mode, order, inputs) in problems[:top]
+            ],
+            "timeline": [
+                {"start": datetime.fromtimestamp(bucket * self.seconds, timezone.utc).isoformat(timespec="minutes"),
+                 "lines": sum(statuses.values()), "wrong": wrong(statuses), "rules": dict(tags.most_common(5))}
+                for bucket, (statuses, tags) in sorted(self.timeline.items())
+            ],
+        }
+
+
+# ---------------- CLI ---------------- #
+def _timestamp(day):
+    return datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize which rules students get wrong, from verdict logs.")
+    parser.add_argument("logs", nargs="+", help="verdict log files (JSONL, optionally .gz; '-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="summary JSON file (default: stdout)")
+    parser.add_argument("--period", choices=sorted(PERIODS), default="day", help="timeline bucket (default: day)")
+    parser.add_argument("--top", type=int, default=10, help="problems to list, most mistakes first")
+    parser.add_argument("--since", help="first day to include, YYYY-MM-DD (UTC)")
+    parser.add_argument("--until", help="first day to exclude, YYYY-MM-DD (UTC)")
+    parser.add_argument("--mode", choices=["Normal", "Implicit", "Parametric"])
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    errors = Counter()
+    records = parse_records(read_lines(args.logs), PERIODS[args.period], errors,
+                            since=_timestamp(args.since) if args.since else None,
+                            until=_timestamp(args.until) if args.until else None)
+    records = select(records, mode=args.mode)
+    summary = Summary(args.period).consume(records).to_dict(args.top)
+    summary["bad_lines"] = errors["bad_lines"]
+
+    text = json.dumps(summary, ensure_ascii=False, separators=(",", ":"))
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    elapsed = time.perf_counter() - start
+    rate = summary["rows"] / elapsed if elapsed > 0 else 0.0
+    print(f"Aggregated {summary['rows']} verdicts ({errors['bad_lines']} bad lines) in {elapsed:.2f}s "
+          f"- {rate:.0f} rows/second", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,33 @@
-import streamlit as st
-import sympy as sp
+import hashlib
 import re
-import sympy as sp
-from sympy import simplify
-from step_checker import check_derivative_steps, check_steps_against_expected, parse_expr_safe, to_backend, to_latex, parse_expr_safe
-from user_interface import apply_neomath_theme, render_math_keyboard,set_background
-from step_explanations import STEP_EXPLANATIONS
-from sympy.parsing.sympy_parser import parse_expr, standard_transformations, implicit_multiplication_application
+import secrets
+import uuid
+
+import streamlit as st
+from history_store import HistoryStore
+from sandbox import SandboxPool, run_check
+from metrics import request_span, span, start_json_flusher
+from user_interface import apply_neomath_theme, render_math_keyboard, set_background
+from warmup import prewarm_in_background
+
+# SymPy and the checking modules are imported on first use; this loads them
+# (and warms SymPy's caches) on a background thread while the page renders.
+prewarm_in_background()
+
+@st.cache_resource
+def get_sandbox():
+    # One pool of check workers per server process, shared by all sessions
+    return SandboxPool()
+
+@st.cache_resource
+def get_history():
+    # One history database connection per server process (DERIVACHECK_HISTORY_DB)
+    return HistoryStore()
+
+# Start (and warm) the workers now rather than on the first check; they are
+# started without this script (sandbox._start_without_main), so it only runs here
+get_sandbox()
+start_json_flusher()  # no-op unless DERIVACHECK_METRICS_FILE is set
 
 # Apply theme at the start 
 apply_neomath_theme()
@@ -30,10 +51,11 @@ if st.session_state.show_tutorial:
 
     st.markdown("### Step 1: Choose Differentiation Type")
     st.markdown("Pick **Normal**, **Implicit**, or **Parametric** depending on your problem.")
+    st.markdown("Choose **Second** or **Third** to check d²y/dx² or d³y/dx³: write the first derivative, then keep differentiating.")
 
     st.markdown("### Step 2: Enter Your Function or Equation")
     st.markdown("For example: `2x³ + 3x`")
-    st.info("REMINDER!! Use the input button to change the keyboard usage for input box.")
+    st.info("REMINDER!! Tap an input box to choose where the keyboard types.")
 
     st.markdown("### Step 3: Add Your Working Steps")
     st.markdown("Write each of your working step on a new line.")
@@ -56,22 +78,53 @@ if not st.session_state.show_tutorial:
 # ----------------- SESSION STATE ----------------- #
 defaults = {
     "mode": "Normal",
-    "active_box": "Function",
+    "order": 1,
+    "input_format": "text",
     "func": "",
     "x_t": "",
     "y_t": "",
     "steps": "",
-    "history": [],
-    "waiting_power": False,
-    "power_buffer": ""
+    "session_id": None,
+    "history_key": "",
+    "history_key_input": "",
+    "history_pages": [None],  # cursor of each history page visited so far
+    "last_check": 0,
+    "check_memo": {}
 }
 
 for k, v in defaults.items():
     if k not in st.session_state:
         st.session_state[k] = v
-        
-if "cursor_pos" not in st.session_state:
-    st.session_state.cursor_pos = 0
+if st.session_state.session_id is None:
+    st.session_state.session_id = uuid.uuid4().hex
+
+# History lasts for the session unless the student asks for a history key: an
+# unguessable token issued here (and kept in the page address so a bookmark
+# brings it back), never a name or ID someone else could type
+HISTORY_KEY_RE = re.compile(r"[A-Za-z0-9_-]{22}")
+
+def use_history_key(key):
+    st.session_state.update(history_key=key, history_pages=[None])
+    if key:
+        st.query_params["history"] = key
+    else:
+        st.query_params.pop("history", None)
+
+def paste_history_key():
+    key = st.session_state.history_key_input.strip()
+    if HISTORY_KEY_RE.fullmatch(key):
+        use_history_key(key)
+        st.session_state.history_key_input = ""
+
+if not st.session_state.history_key and HISTORY_KEY_RE.fullmatch(st.query_params.get("history", "")):
+    st.session_state.history_key = st.query_params["history"]
+
+def history_owner():
+    # Stored hashed, so the history database does not hold usable keys
+    key = st.session_state.history_key
+    if key:
+        return "key:" + hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return f"session:{st.session_state.session_id}"
 
 
 # ----------------- MODE SELECTION ----------------- #
@@ -84,20 +137,23 @@ st.radio(
     key="mode",
     label_visibility="collapsed"  # hides default spacing
 )
-
-
-# ----------------- ACTIVE BOX ----------------- #
-boxes = ["Function", "Steps"] if st.session_state.mode != "Parametric" else ["x(t)", "y(t)", "Steps"]
-if st.session_state.active_box not in boxes:
-    st.session_state.active_box = boxes[0]
-
-st.markdown('<span class="section-label">Math Keyboard Input Goes To:</span>', unsafe_allow_html=True)
+st.markdown('<span class="section-label">Derivative:</span>', unsafe_allow_html=True)
 st.radio(
-    label=" ",  # visually blank
-    options=boxes,
+    label=" ",
+    options=[1, 2, 3],
+    format_func={1: "First (dy/dx)", 2: "Second (d²y/dx²)", 3: "Third (d³y/dx³)"}.get,
     horizontal=True,
-    key="active_box",
-    label_visibility="collapsed"  # hides the default label spacing
+    key="order",
+    label_visibility="collapsed"
+)
+st.markdown('<span class="section-label">Input Format:</span>', unsafe_allow_html=True)
+st.radio(
+    label=" ",
+    options=["text", "latex"],
+    format_func={"text": "Plain text", "latex": "LaTeX"}.get,
+    horizontal=True,
+    key="input_format",
+    label_visibility="collapsed"
 )
 
 
@@ -127,54 +183,31 @@ def get_placeholders():
 
 # Get current placeholders
 placeholders = get_placeholders()
+if st.session_state.input_format == "latex":
+    placeholders = {
+        "func": "Example: 2x^{3} + 3x",
+        "x_t": "Example: t^{2}",
+        "y_t": "Example: t^{3}",
+        "steps": "Example:\n\\frac{d}{dx}\\left(2x^{3} + 3x\\right)\n6x^{2} + 3",
+    }
 
 if st.session_state.mode in ["Normal", "Implicit"]:
-    st.text_input(
-        "Enter Function / Equation:",
-        key="func",
-        placeholder=placeholders.get("func", "")
-    )
+    boxes = [{"name": "func", "label": "Enter Function / Equation:"}]
 else:
     st.info("💡 In parametric differentiation, you need both dx/dt and dy/dt. Enter them step by step!")
-    st.text_input(
-        "x(t) =",
-        key="x_t",
-        placeholder=placeholders.get("x_t", "")
-    )
-    st.text_input(
-        "y(t) =",
-        key="y_t",
-        placeholder=placeholders.get("y_t", "")
-    )
-
-st.text_area(
-    "Working steps (one per line):",
-    key="steps",
-    height=160,
-    placeholder=placeholders.get("steps", "")
-)
+    boxes = [{"name": "x_t", "label": "x(t) ="}, {"name": "y_t", "label": "y(t) ="}]
+boxes.append({"name": "steps", "label": "Working steps (one per line):", "multiline": True})
+for box in boxes:
+    box["placeholder"] = placeholders.get(box["name"], "")
 
 # ----------------- KEYBOARD ----------------- #
-st.markdown("### 🔢 Math Keyboard")
-
-cursor_pos = st.components.v1.html("""
-<script>
-const pos = window.streamlitCursorPos ?? 0;
-window.parent.postMessage(
-  { type: "streamlit:setCursor", value: pos },
-  "*"
-);
-</script>
-""", height=0)
-
-
 if st.session_state.mode == "Parametric":
     left_keys = [
         ["1","2","3","+","−"],
         ["4","5","6","×","÷"],
         ["7","8","9",".","π"],
         ["0","dx/dt","dy/dt","dy/dx","="],
-        ["sqrt(","⌫","Clear"]
+        ["sqrt(","d/dt","d²y/dx²","⌫","Clear"]
     ]
     right_keys = [
         [None,"aᵇ","x","t",None,None],   # include t here
@@ -188,7 +221,7 @@ else:  # Normal or Implicit
         ["4","5","6","×","÷"],
         ["7","8","9",".","π"],
         ["0","d/dx","dy/dx","sqrt(","="],
-        ["⌫","Clear"]
+        ["d²y/dx²","⌫","Clear"]
     ]
     right_keys = [
         [None,"aᵇ","x",None,None,None],  # no t here
@@ -196,75 +229,27 @@ else:  # Normal or Implicit
         [None,"sin(","cos(","tan(",None,None],
         [None,"sec(","ln(","exp(",None,None]
     ]
-    
-# Superscript digit mapping
-superscript_map = {
-    "0": "⁰", "1": "¹", "2": "²", "3": "³", "4": "⁴",
-    "5": "⁵", "6": "⁶", "7": "⁷", "8": "⁸", "9": "⁹"
-}
-
-def insert_key(key):
-    if not key:
-        return
 
-    # Map active box names to session_state keys
-    box_map = {
-        "Function": "func",
-        "x(t)": "x_t",
-        "y(t)": "y_t",
-        "Steps": "steps"
-    }
-    target = box_map[st.session_state.active_box]
-
-    # Handle exponent start
-    if key == "aᵇ":
-        st.session_state.waiting_power = True
-        st.session_state.power_buffer = ""
-        return
-
-    # If waiting for exponent digits
-    if getattr(st.session_state, "waiting_power", False):
-        if key.isdigit():
-            # Add superscript digit visually
-            st.session_state[target] += superscript_map[key]
-            st.session_state.power_buffer += key
-            return
-        else:
-            # End exponent mode if non-digit pressed
-            st.session_state.waiting_power = False
-            st.session_state.power_buffer = ""
-
-    # Clear button
-    if key == "Clear":
-        st.session_state[target] = ""
-        return
-
-    # Backspace button
-    if key == "⌫":
-        st.session_state[target] = st.session_state[target][:-1]
-        return
-
-    # Default insertion at cursor
-    pos = st.session_state.get("cursor_pos", len(st.session_state[target]))
-    st.session_state[target] = st.session_state[target][:pos] + key + st.session_state[target][pos:]
-    st.session_state["cursor_pos"] = pos + len(key)
-
-
-cols = st.columns([3,2])
-for row in left_keys:
-    row_cols = cols[0].columns(len(row))
-    for i, key in enumerate(row):
-        display_key = "＋" if key == "+" else key  # fix plus sign
-        row_cols[i].button(display_key, on_click=insert_key, args=(key,), use_container_width=True)
-for row in right_keys:
-    row_cols = cols[1].columns(len(row))
-    for i, key in enumerate(row):
-        if key is not None:
-            row_cols[i].button(key, on_click=insert_key, args=(key,), use_container_width=True)
+# The boxes and keys are edited in the browser (tap a box to send keys to it);
+# the script only reruns when the text changes meaningfully or on Check.
+st.markdown("### 🔢 Math Keyboard")
+keyboard = render_math_keyboard(
+    boxes=boxes,
+    values={box["name"]: st.session_state[box["name"]] for box in boxes},
+    left_keys=left_keys,
+    right_keys=right_keys,
+    check=st.session_state.last_check,
+)
+check_requested = False
+if keyboard:
+    for name, value in keyboard["values"].items():
+        st.session_state[name] = value
+    check_requested = keyboard["check"] != st.session_state.last_check
+    st.session_state.last_check = keyboard["check"]
 
 # ----------------- CHECK BUTTON ----------------- #
 st.divider()
-if st.button("✅ Check Steps"):
+if check_requested:
     if st.session_state.mode in ["Normal","Implicit"] and not st.session_state.func.strip():
         st.error("Please enter a function/equation")
         st.stop()
@@ -275,128 +260,101 @@ if st.button("✅ Check Steps"):
         st.error("Please enter your steps")
         st.stop()
 
-    steps_lines = [l.strip() for l in st.session_state.steps.splitlines() if l.strip()]
+    from grading import split_steps
+    from rendering import message_parts, render_text
+
+    steps_lines = split_steps(st.session_state.steps)
 
     # ---------------- PROCESS STEPS ---------------- #
-    if st.session_state.mode=="Parametric":
-        t = sp.symbols('t')
-        x_expr = parse_expr_safe(to_backend(st.session_state.x_t))
-        y_expr = parse_expr_safe(to_backend(st.session_state.y_t))
-
-        dx_dt = sp.diff(x_expr, t)
-        dy_dt = sp.diff(y_expr, t)
-        dy_dx = sp.simplify(dy_dt / dx_dt)
-
-        expected_steps = [
-            {"label": "dx/dt", "expr": dx_dt, "display": r"\frac{dx}{dt} = " + sp.latex(dx_dt)},
-            {"label": "dy/dt", "expr": dy_dt, "display": r"\frac{dy}{dt} = " + sp.latex(dy_dt)},
-            {"label": "dy/dx", "expr": dy_dx, "display": r"\frac{dy}{dx} = " + sp.latex(dy_dx)},
-        ]
-
-        results = check_steps_against_expected(
-           student_steps=steps_lines,
-           expected_steps=expected_steps
-        )
-
-
-    elif st.session_state.mode=="Implicit":
-        x, y = sp.symbols('x y')
-        func_str = st.session_state.func
-        lhs_str, rhs_str = func_str.split("=", 1)
-        lhs_expr = parse_expr_safe(to_backend(lhs_str.strip()))
-        rhs_expr = parse_expr_safe(to_backend(rhs_str.strip()))
-
-        dy_dx_symbol = sp.Symbol('dy/dx')
-        d_lhs = sp.diff(lhs_expr, x) + sp.diff(lhs_expr, y) * dy_dx_symbol
-        d_rhs = sp.diff(rhs_expr, x) + sp.diff(rhs_expr, y) * dy_dx_symbol
-
-        sol = sp.solve(sp.Eq(d_lhs, d_rhs), dy_dx_symbol)
-        dy_dx = sp.simplify(sol[0]) if sol else None
-
-        expected_steps = [
-            {"label": "d/dx(lhs)", "expr": d_lhs, "display": r"\frac{d}{dx}(\text{LHS}) = " + sp.latex(d_lhs)},
-            {"label": "d/dx(rhs)", "expr": d_rhs, "display": r"\frac{d}{dx}(\text{RHS}) = " + sp.latex(d_rhs)},
-        ]
-        if dy_dx is not None:
-            expected_steps.append({"label": "dy/dx", "expr": dy_dx, "display": r"\frac{dy}{dx} = " + sp.latex(dy_dx)})
-
-        results = check_steps_against_expected(
-            student_steps=steps_lines,
-            expected_steps=expected_steps
-        )  
-
-    else:  # Normal
-        x = sp.symbols('x')
-        func_expr = parse_expr_safe(to_backend(st.session_state.func))
-        dfx = sp.simplify(sp.diff(func_expr, x))
-        expected_steps = [
-            {"label": "d/dx", "expr": dfx, "display": r"\frac{d}{dx} = " + sp.latex(dfx)},
-        ]
-
-        results = check_steps_against_expected(
-           student_steps=steps_lines,
-           expected_steps=expected_steps
-        )
+    # Runs in a sandboxed worker so a pathological input can't hang the page
+    # The verdict memo of earlier checks stays in the session: only edited lines are re-checked
+    with request_span(st.session_state.mode, stage="request"):
+        check = run_check(get_sandbox(), {
+            "mode": st.session_state.mode,
+            "order": st.session_state.order,
+            "format": st.session_state.input_format,
+            "func": st.session_state.func,
+            "x_t": st.session_state.x_t,
+            "y_t": st.session_state.y_t,
+            "steps": steps_lines,
+        }, memo=st.session_state.check_memo)
+    if check["status"] != "ok":
+        st.error(check["error"])
+        st.stop()
+    st.session_state.check_memo = check["memo"]
+    results = check["feedback"]
+    expected_steps = check["expected"]
 
     # ---------------- PREVIEW ---------------- #
-    st.markdown("### 👀 Preview")
-    if st.session_state.mode=="Parametric":
-        st.latex("x(t) = " + to_latex(st.session_state.x_t))
-        st.latex("y(t) = " + to_latex(st.session_state.y_t))
-    else:
-        st.latex(to_latex(st.session_state.func))
-    for line in st.session_state.steps.splitlines():
-        st.latex(to_latex(line))
-
-    # ---------------- FEEDBACK ---------------- #
-    st.markdown("## 📋 Feedback")
-    completeness_feedback = check_steps_against_expected(steps_lines, expected_steps)
-    results = completeness_feedback
-
-    for msg in results:
-        if "Correction:" in msg:
-            if msg is None:
-                msg = ""
-            user_input, correct = msg.split("Correction:",1)
-            st.markdown("**Your Input:**")
-            st.latex(to_latex(user_input.strip()))
-            st.markdown("**Correct Answer:**")
-            st.latex(to_latex(correct.strip()))
+    with span("render", mode=st.session_state.mode):
+        st.markdown("### 👀 Preview")
+        # LaTeX input is shown as written
+        preview = (lambda line: line) if st.session_state.input_format == "latex" else render_text
+        if st.session_state.mode=="Parametric":
+            st.latex("x(t) = " + preview(st.session_state.x_t))
+            st.latex("y(t) = " + preview(st.session_state.y_t))
         else:
-            st.write(msg)
-
-    # ---------------- AUTO-COMPUTED REFERENCE ---------------- #
-    st.markdown("### 🔮 Auto-computed reference")
-    for e in expected_steps:
-        st.latex(e["display"])
+            st.latex(preview(st.session_state.func))
+        for line in st.session_state.steps.splitlines():
+            st.latex(preview(line))
+
+        # ---------------- FEEDBACK ---------------- #
+        st.markdown("## 📋 Feedback")
+        for msg in results:
+            parts = message_parts(msg)
+            if parts is not None:
+                user_input, correct = parts
+                st.markdown("**Your Input:**")
+                st.latex(user_input)
+                st.markdown("**Correct Answer:**")
+                st.latex(correct)
+            else:
+                st.write(msg)
+
+        # ---------------- AUTO-COMPUTED REFERENCE ---------------- #
+        st.markdown("### 🔮 Auto-computed reference")
+        for e in expected_steps:
+            st.latex(e["display"])
 
     # ---------------- SAVE HISTORY ---------------- #
-    st.session_state.history.append({
+    get_history().add(history_owner(), {
         "mode": st.session_state.mode,
+        "order": st.session_state.order,
+        "format": st.session_state.input_format,
         "func": st.session_state.func,
-        "x": st.session_state.x_t,
-        "y": st.session_state.y_t,
+        "x_t": st.session_state.x_t,
+        "y_t": st.session_state.y_t,
         "steps": st.session_state.steps,
         "results": results
     })
-    # Keep last 10 entries only
-    st.session_state.history = st.session_state.history[-10:]
+    st.session_state.history_pages = [None]  # back to the newest page
 
 # ----------------- HISTORY SIDEBAR ----------------- #
+# Entries are stored already rendered, one page at a time is read
 st.sidebar.markdown("### 🕘 History")
-for h in reversed(st.session_state.history):
-    st.sidebar.markdown(f"**Mode:** {h['mode']}")
-    if h['mode']=="Parametric":
-        st.sidebar.latex("x(t) = "+to_latex(h['x']))
-        st.sidebar.latex("y(t) = "+to_latex(h['y']))
+with st.sidebar.expander("Keep history across visits"):
+    if st.session_state.history_key:
+        st.code(st.session_state.history_key, language=None)
+        st.caption("Your history key. Bookmark this page or keep the key to see this history "
+                   "on another visit; anyone with the key can read it.")
+        st.button("Stop using this key", on_click=use_history_key, args=("",))
     else:
-        st.sidebar.latex(to_latex(h['func']))
-    st.sidebar.markdown("**Steps / Corrections:**")
-    for msg in h['results']:
-        if "Correction:" in msg:
-            user_input, correct = msg.split("Correction:",1)
-            st.sidebar.markdown("Your Input:"); st.sidebar.latex(to_latex(user_input.strip()))
-            st.sidebar.markdown("Correct Answer:"); st.sidebar.latex(to_latex(correct.strip()))
-        else:
-            st.sidebar.write(msg)
+        st.caption("History is kept for this session only.")
+        st.button("Create a history key", on_click=lambda: use_history_key(secrets.token_urlsafe(16)))
+        st.text_input("Or paste a history key", key="history_key_input", type="password",
+                      on_change=paste_history_key)
+        if st.session_state.history_key_input.strip():
+            st.error("That is not a history key.")
+pages = st.session_state.history_pages
+entries, next_page = get_history().page(history_owner(), before=pages[-1])
+for h in entries:
+    for kind, text in h["rendered"]:
+        getattr(st.sidebar, kind)(text)
     st.sidebar.divider()
+newer, older = st.sidebar.columns(2)
+if len(pages) > 1 and newer.button("◀ Newer"):
+    pages.pop()
+    st.rerun()
+if next_page is not None and older.button("Older ▶"):
+    pages.append(next_page)
+    st.rerun()
@@ -0,0 +1,96 @@
+# Background image pipeline.
+#
+# set_background() used to base64 the full-size JPEG into the page on every
+# rerun (every keyboard press). The backgrounds are now resized and
+# re-encoded once into WebP variants under static/, which Streamlit serves as
+# cacheable files (server.enableStaticServing in .streamlit/config.toml), and
+# the small CSS that points at them is cached per theme.
+#
+#   python assets.py          # build the variants ahead of time (otherwise done on first use)
+import base64
+import hashlib
+import os
+import shutil
+from functools import lru_cache
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, "static")
+STATIC_URL = "app/static"
+
+BACKGROUNDS = {
+    "dark": os.path.join(ROOT, "images", "background1.jpg"),
+    "light": os.path.join(ROOT, "images", "background2.jpg"),
+}
+WIDTHS = (640, 1280, 1920)
+WEBP_QUALITY = 72
+
+
+def _digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:10]
+
+
+def build_variants(theme):
+    """
+    Write the resized variants for a theme and return [(width, filename)], smallest first.
+    Filenames carry a hash of the source image, so a changed image gets new URLs.
+    Without Pillow the original JPEG is copied as a single variant.
+    """
+    source = BACKGROUNDS[theme]
+    digest = _digest(source)
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    try:
+        from PIL import Image
+    except ImportError:
+        name = f"bg-{theme}-{digest}.jpg"
+        target = os.path.join(STATIC_DIR, name)
+        if not os.path.exists(target):
+            shutil.copyfile(source, target)
+        return [(None, name)]
+
+    variants = []
+    with Image.open(source) as image:
+        image = image.convert("RGB")
+        widths = [w for w in WIDTHS if w < image.width] + [min(image.width, WIDTHS[-1])]
+        for width in widths:
+            name = f"bg-{theme}-{width}-{digest}.webp"
+            target = os.path.join(STATIC_DIR, name)
+            if not os.path.exists(target):
+                height = round(image.height * width / image.width)
+                tmp = f"{target}.{os.getpid()}.tmp"
+                image.resize((width, height), Image.LANCZOS).save(tmp, "WEBP", quality=WEBP_QUALITY, method=6)
+                os.replace(tmp, target)
+            variants.append((width, name))
+    return variants
+
+
+@lru_cache(maxsize=None)
+def background_css(theme, static_serving=True):
+    """<style> block for the theme's background, computed once per process."""
+    if not static_serving:
+        # Static serving is off: fall back to embedding the image, encoded only once
+        with open(BACKGROUNDS[theme], "rb") as f:
+            encoded = base64.b64encode(f.read()).decode()
+        return _style(f'url("data:image/jpg;base64,{encoded}")')
+
+    variants = build_variants(theme)
+    rules = [_style(f'url("{STATIC_URL}/{variants[-1][1]}")', wrap=False)]
+    # Smaller screens get smaller files; narrowest last so it wins the cascade
+    for width, name in reversed(variants[:-1]):
+        rules.append(f"@media (max-width: {width}px) {{ .stApp {{ background-image: url(\"{STATIC_URL}/{name}\"); }} }}")
+    return "<style>\n" + "\n".join(rules) + "\n</style>"
+
+
+def _style(image, wrap=True):
+    rule = (
+        f".stApp {{ background-image: {image}; background-size: cover; "
+        "background-repeat: no-repeat; background-attachment: fixed; }"
+    )
+    return f"<style>\n{rule}\n</style>" if wrap else rule
+
+
+if __name__ == "__main__":
+    for theme in BACKGROUNDS:
+        for width, name in build_variants(theme):
+            size = os.path.getsize(os.path.join(STATIC_DIR, name))
+            print(f"{theme:<6} {width or 'orig':>5}  {name}  {size / 1024:.0f} KiB")
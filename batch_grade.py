@@ -0,0 +1,121 @@
+# Headless batch grader.
+#
+#   python batch_grade.py submissions.jsonl -o verdicts.jsonl --workers 4
+#
+# Input is JSONL (one submission object per line) or CSV with the columns
+# mode, func, x_t, y_t, steps (steps separated by newlines) and optional id,
+# order (2 for d²y/dx², ...) and format ("latex" for LaTeX inputs and steps).
+# Records are streamed in chunks to a process pool and verdicts are written as
+# JSONL in input order as soon as each chunk finishes, so memory stays bounded
+# by the number of chunks in flight, not by the size of the input.
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from grading import grade_submission
+
+# ---------------- INPUT ---------------- #
+def read_jsonl(f):
+    """
+    Submissions from JSONL. A line that is not a JSON object comes out as
+    {"line", "input_error"}, so it gets an error verdict of its own instead
+    of stopping the run.
+    """
+    for number, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield {"line": number, "input_error": f"Line {number} is not valid JSON: {e}"}
+            continue
+        if not isinstance(record, dict):
+            yield {"line": number, "input_error": f"Line {number} is not a JSON object"}
+            continue
+        yield record
+
+def read_csv(f):
+    yield from csv.DictReader(f)
+
+def read_submissions(f, fmt):
+    return read_csv(f) if fmt == "csv" else read_jsonl(f)
+
+def chunked(records, size):
+    records = iter(records)
+    while chunk := list(islice(records, size)):
+        yield chunk
+
+# ---------------- WORKERS ---------------- #
+def grade_record(record, grade=grade_submission):
+    """grade(record); unreadable input lines and anything it raises become "error" verdicts."""
+    if "input_error" in record:
+        return {"id": None, "line": record["line"], "status": "error", "error": record["input_error"]}
+    try:
+        return grade(record)
+    except Exception as e:
+        return {"id": record.get("id"), "mode": record.get("mode") or "Normal",
+                "status": "error", "error": f"{type(e).__name__}: {e}"}
+
+def grade_chunk(chunk):
+    return [grade_record(record) for record in chunk]
+
+def grade_stream(records, workers=None, chunksize=32, max_pending=None, grade=grade_chunk):
+    """
+    Yield verdicts for `records` in input order.
+    At most `max_pending` chunks are submitted to the pool at any time.
+    `grade` turns a chunk into its verdicts (a module-level function, so
+    the pool can pickle it).
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    pending = deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in chunked(records, chunksize):
+            pending.append(pool.submit(grade, chunk))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+# ---------------- CLI ---------------- #
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade differentiation submissions without the Streamlit UI.")
+    parser.add_argument("input", help="JSONL or CSV file of submissions ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file for verdicts (default: stdout)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="input format (default: from file extension)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=32, help="submissions per task sent to a worker")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    infile = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    outfile = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+
+    start = time.perf_counter()
+    graded = errors = 0
+    try:
+        for verdict in grade_stream(read_submissions(infile, fmt), args.workers, args.chunksize):
+            outfile.write(json.dumps(verdict, ensure_ascii=False) + "\n")
+            graded += 1
+            errors += verdict["status"] != "ok"
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+
+    elapsed = time.perf_counter() - start
+    rate = graded / elapsed if elapsed > 0 else 0.0
+    print(f"Graded {graded} submissions ({errors} errors) in {elapsed:.2f}s "
+          f"- {rate:.1f} submissions/second", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# Higher-order derivatives: extending cached lower orders vs starting over.
+#
+#   python benchmarks/bench_higher_order.py                  # orders 1-3, corpus problems
+#   python benchmarks/bench_higher_order.py --max-order 4 --rounds 5
+#
+# "scratch" computes order n straight from the input, the way a single
+# function call would: differentiate n times (dividing by dx/dt or
+# substituting dy/dx as the mode needs) and simplify the result once.
+# "reuse" is derivative_engine asked for orders 1, 2, ... n in turn, as a
+# student checking d²y/dx² after dy/dx does; each order starts from the
+# cached, already simplified order below it. Both are timed with every cache
+# cleared first, per order, best of --rounds.
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sympy as sp
+from corpus import PROBLEMS
+from derivative_engine import DERIVATIVE_CACHE, dy_dx_symbol, implicit_steps, normal_steps, parametric_steps, x, y, t
+from grading import parse_problem
+
+
+# ---------------- SCRATCH ---------------- #
+def scratch(mode, inputs, order):
+    if mode == "Parametric":
+        x_t, y_t = inputs
+        dx_dt = sp.diff(x_t, t)
+        result = sp.diff(y_t, t) / dx_dt
+        for _ in range(order - 1):
+            result = sp.diff(result, t) / dx_dt
+    elif mode == "Implicit":
+        lhs, rhs = inputs
+        equation = lhs - rhs
+        dydx = -sp.diff(equation, x) / sp.diff(equation, y)
+        result = dydx
+        for _ in range(order - 1):
+            result = (sp.diff(result, x) + sp.diff(result, y) * dy_dx_symbol).subs(dy_dx_symbol, dydx)
+    else:
+        result = sp.diff(inputs[0], x, order)
+    return sp.simplify(result)
+
+
+# ---------------- REUSE ---------------- #
+ENGINE = {"Normal": normal_steps, "Implicit": implicit_steps, "Parametric": parametric_steps}
+
+def clear_caches():
+    sp.core.cache.clear_cache()
+    DERIVATIVE_CACHE.memory.clear()
+
+
+def time_problem(mode, inputs, max_order, rounds):
+    """{order: (scratch ms, reuse ms)}, where reuse is the cost of order n once n - 1 is cached."""
+    best_scratch = {n: float("inf") for n in range(1, max_order + 1)}
+    best_reuse = dict(best_scratch)
+    for _ in range(rounds):
+        for n in best_scratch:
+            clear_caches()
+            start = time.perf_counter()
+            scratch(mode, inputs, n)
+            best_scratch[n] = min(best_scratch[n], (time.perf_counter() - start) * 1000)
+        clear_caches()
+        for n in best_reuse:
+            start = time.perf_counter()
+            ENGINE[mode](*inputs, order=n)
+            best_reuse[n] = min(best_reuse[n], (time.perf_counter() - start) * 1000)
+    return {n: (best_scratch[n], best_reuse[n]) for n in best_scratch}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time higher-order derivatives with and without reuse.")
+    parser.add_argument("--max-order", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    totals = {}
+    print(f"{'problem':<22} {'order':>5} {'scratch ms':>11} {'reuse ms':>9}")
+    for problem in PROBLEMS:
+        inputs = parse_problem(problem["mode"], func=problem.get("func", ""),
+                               x_t=problem.get("x_t", ""), y_t=problem.get("y_t", ""))
+        for n, (scratch_ms, reuse_ms) in time_problem(problem["mode"], inputs, args.max_order, args.rounds).items():
+            print(f"{problem['name']:<22} {n:>5} {scratch_ms:>11.1f} {reuse_ms:>9.1f}")
+            total = totals.setdefault(n, [0.0, 0.0])
+            total[0] += scratch_ms
+            total[1] += reuse_ms
+
+    print()
+    for n, (scratch_ms, reuse_ms) in totals.items():
+        print(f"order {n}: scratch {scratch_ms:9.1f} ms   reuse {reuse_ms:9.1f} ms   x{scratch_ms / reuse_ms:.1f}")
+
+
+if __name__ == "__main__":
+    main()
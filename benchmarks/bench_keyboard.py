@@ -0,0 +1,110 @@
+# Reruns and bytes per typed expression: server-side keyboard vs the browser component.
+#
+#   python benchmarks/bench_keyboard.py
+#   python benchmarks/bench_keyboard.py --legacy-app /tmp/legacy_app.py
+#
+# "legacy" is app.py as it was before components/math_keyboard was added, where
+# every key was an st.button; by default it is read from git history. Each key
+# press there is one full rerun. With the component, typing stays in the
+# browser and an expression costs one sync rerun (the pause after typing).
+# Bytes are the serialized size of the ForwardMsgs a rerun sends, measured
+# with streamlit.testing's AppTest.
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+# (box, expression, legacy key presses)
+EXPRESSIONS = [
+    ("Function", "2x³+3x", ["2", "x", "aᵇ", "3", "+", "3", "x"]),
+    ("Steps", "6x²+3", ["6", "x", "aᵇ", "2", "+", "3"]),
+    ("Function", "sin(3x)", ["sin(", "3", "x", " )"]),
+    ("Function", "x²+y²=25", ["x", "aᵇ", "2", "+", "y", "aᵇ", "2", "=", "2", "5"]),
+    ("Steps", "2x+2ydy/dx", ["2", "x", "+", "2", "y", "dy/dx"]),
+]
+BOX_KEYS = {"Function": "func", "Steps": "steps"}
+
+_sent = []
+_forward_msgs = LocalScriptRunner.forward_msgs
+
+def _counting_forward_msgs(self):
+    msgs = _forward_msgs(self)
+    _sent.append(sum(m.ByteSize() for m in msgs))
+    return msgs
+
+LocalScriptRunner.forward_msgs = _counting_forward_msgs
+
+
+def legacy_source():
+    """app.py from the commit before the keyboard component was introduced."""
+    rev = subprocess.run(
+        ["git", "log", "--diff-filter=A", "--format=%H", "--", "components/math_keyboard/index.html"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout.split()
+    if not rev:
+        raise SystemExit("component not committed yet; pass --legacy-app")
+    return subprocess.run(["git", "show", f"{rev[-1]}^:app.py"], cwd=ROOT,
+                          capture_output=True, text=True, check=True).stdout
+
+
+def measure_legacy(source):
+    at = AppTest.from_string(source, default_timeout=60)
+    at.run()
+    reruns, total = 0, 0
+    for box, _, keys in EXPRESSIONS:
+        at.radio(key="active_box").set_value(box).run()
+        for key in keys:
+            label = "＋" if key == "+" else key
+            button = next(b for b in at.button if b.label == label)
+            del _sent[:]
+            button.click().run()
+            reruns += 1
+            total += sum(_sent)
+    return reruns, total
+
+
+def measure_component():
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+    at.run()
+    reruns, total = 0, 0
+    values = {"func": "", "steps": ""}
+    for box, expression, _ in EXPRESSIONS:
+        values[BOX_KEYS[box]] = expression
+        # One setComponentValue after the user pauses
+        at.session_state["math_keyboard"] = {"values": dict(values), "check": 0}
+        del _sent[:]
+        at.run()
+        reruns += 1
+        total += sum(_sent)
+    return reruns, total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure keyboard reruns and bytes per expression.")
+    parser.add_argument("--legacy-app", help="path to the pre-component app.py (default: from git)")
+    args = parser.parse_args(argv)
+
+    if args.legacy_app:
+        with open(args.legacy_app, encoding="utf-8") as f:
+            source = f.read()
+    else:
+        source = legacy_source()
+
+    os.chdir(ROOT)
+    n = len(EXPRESSIONS)
+    rows = [("legacy st.button keyboard", *measure_legacy(source)),
+            ("math_keyboard component", *measure_component())]
+    for name, reruns, total in rows:
+        print(f"{name:<28} {reruns / n:>6.1f} reruns/expr {total / n / 1024:>9.1f} KiB/expr")
+    (_, legacy_reruns, legacy_bytes), (_, new_reruns, new_bytes) = rows
+    print(f"reruns: -{(1 - new_reruns / legacy_reruns) * 100:.0f}%   bytes: -{(1 - new_bytes / legacy_bytes) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
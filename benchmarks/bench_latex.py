@@ -0,0 +1,96 @@
+# LaTeX input vs plain text: cost per line of turning input into SymPy.
+#
+#   python benchmarks/bench_latex.py                 # corpus lines, best of 3
+#   python benchmarks/bench_latex.py --rounds 5
+#
+# Every corpus input and step is rendered to LaTeX (sympy.latex, with dy/dx
+# written \frac{dy}{dx}) and timed through:
+#   text         normalizer.parse_math() on the typed line
+#   latex2sympy  latex2sympy2.latex2sympy(), a new ANTLR parser per line
+#   reused       latex_input's single warmed parser, SLL before LL
+#   latex cold   latex_input.latex_to_text() + parse, caches cleared
+#   latex warm   the same with LATEX_CACHE and PARSE_CACHE filled
+# Lines latex2sympy2 cannot read are counted, not timed.
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sympy as sp
+from corpus import PROBLEMS
+from latex_input import LATEX_CACHE, latex_parser, latex_to_text, warm_latex
+from normalizer import parse_math
+from parse_cache import PARSE_CACHE, parse_cached
+from rendering import SYMBOL_NAMES
+
+
+def corpus_lines():
+    """(text, LaTeX) for every input and step in the corpus."""
+    lines = []
+    for problem in PROBLEMS:
+        texts = [problem[k] for k in ("x_t", "y_t") if k in problem]
+        if "func" in problem:
+            texts += [side.strip() for side in problem["func"].split("=")]
+        texts += problem["correct"] + problem["incorrect"]
+        for text in texts:
+            lines.append((text, sp.latex(parse_math(text), symbol_names=SYMBOL_NAMES)))
+    return lines
+
+
+def best_of(rounds, run, before=None):
+    best = float("inf")
+    for _ in range(rounds):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time LaTeX input against plain text.")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    from latex2sympy2 import latex2sympy
+    lines = corpus_lines()
+    warm_latex()
+
+    readable = []
+    for _, latex in lines:
+        try:
+            latex2sympy(latex)
+            readable.append(latex)
+        except Exception:
+            pass
+
+    def clear():
+        LATEX_CACHE.clear()
+        PARSE_CACHE.clear()
+
+    def latex_path():
+        for _, latex in lines:
+            parse_cached(latex_to_text(latex))
+
+    timings = {
+        "text": best_of(args.rounds, lambda: [parse_math(text) for text, _ in lines]),
+        "latex2sympy": best_of(args.rounds, lambda: [latex2sympy(latex) for latex in readable]),
+        "reused": best_of(args.rounds, lambda: [latex_parser().parse(latex) for latex in readable]),
+        "latex cold": best_of(args.rounds, latex_path, before=clear),
+        "latex warm": best_of(args.rounds, latex_path),
+    }
+    counts = {"latex2sympy": len(readable), "reused": len(readable)}
+
+    print(f"{len(lines)} lines, {len(lines) - len(readable)} unreadable by latex2sympy2")
+    for name, seconds in timings.items():
+        n = counts.get(name, len(lines))
+        print(f"{name:<12} {seconds * 1000:9.1f} ms total {seconds * 1000 / max(n, 1):8.3f} ms/line")
+
+
+if __name__ == "__main__":
+    main()
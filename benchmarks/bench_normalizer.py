@@ -0,0 +1,77 @@
+# Throughput of the single-pass normalizer against the previous translation chain.
+#
+#   python benchmarks/bench_normalizer.py [--repeat 2000]
+#
+# "legacy" is the chain step_checker.py used before normalizer.py: ten chained
+# str.replace calls in to_backend, then parse_expr with the
+# implicit_multiplication_application transformations (which evals the
+# generated code). Both sides are measured uncached.
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sympy.parsing.sympy_parser import parse_expr, standard_transformations, implicit_multiplication_application
+from normalizer import normalize, parse_math
+
+CORPUS = [
+    "2x³ + 3x",
+    "6x² + 3",
+    "3(2x+1)²·2",
+    "sin(3x)cos(3x)",
+    "tan(3x)/ln(x)",
+    "x² + y² = 25",
+    "2x + 2y dy/dx",
+    "(x² − 1) ÷ (x + 1)",
+    "3t²/(2t)",
+    "e^(2x) × sin(x)",
+]
+
+LEGACY_TRANSFORMATIONS = standard_transformations + (implicit_multiplication_application,)
+
+
+def legacy_to_backend(expr):
+    expr = expr.replace("⁰","**0").replace("¹","**1").replace("²","**2") \
+               .replace("³","**3").replace("⁴","**4").replace("⁵","**5") \
+               .replace("⁶","**6").replace("⁷","**7").replace("⁸","**8") \
+               .replace("⁹","**9")
+    return expr.replace("−","-").replace("×","*").replace("÷","/")
+
+
+def legacy_parse(expr):
+    return parse_expr(legacy_to_backend(expr), transformations=LEGACY_TRANSFORMATIONS)
+
+
+def rate(func, lines, repeat):
+    start = time.perf_counter()
+    count = 0
+    for _ in range(repeat):
+        for line in lines:
+            try:
+                func(line)
+            except Exception:
+                pass
+            count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the input normalizer.")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    rows = [
+        ("normalize: legacy to_backend", rate(legacy_to_backend, CORPUS, args.repeat * 10)),
+        ("normalize: single-pass lexer", rate(normalize, CORPUS, args.repeat * 10)),
+        ("parse: legacy parse_expr", rate(legacy_parse, CORPUS, args.repeat)),
+        ("parse: normalizer.parse_math", rate(parse_math, CORPUS, args.repeat)),
+    ]
+    for name, lines_per_second in rows:
+        print(f"{name:<32} {lines_per_second:>12,.0f} lines/s")
+    print(f"parse speed-up: {rows[3][1] / rows[2][1]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
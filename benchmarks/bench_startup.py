@@ -0,0 +1,98 @@
+# Import-time report and cold-start budget.
+#
+#   python benchmarks/bench_startup.py                     # per-module import time
+#   python benchmarks/bench_startup.py --budget-ms 1200    # exit 1 if app.py's startup imports exceed it
+#   python benchmarks/bench_startup.py --frozen dist/DerivaCheck/DerivaCheck --budget-ms 3000
+#
+# Each module is imported in a fresh interpreter with -X importtime, so the
+# figure includes everything it pulls in. "app startup" is the set app.py
+# imports before the first page renders; SymPy and the checking modules are
+# deliberately not part of it (warmup.py loads them in the background).
+#
+# For the PyInstaller build, freeze with `--python-option "X importtime"`;
+# --frozen then runs the executable, collects the import-time lines it writes
+# to stderr for --frozen-seconds and applies the same budget to them.
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported by app.py at startup
+APP_STARTUP = ["streamlit", "sandbox", "metrics", "user_interface", "warmup"]
+
+MODULES = APP_STARTUP + [
+    "numpy", "sympy",
+    "normalizer", "parse_cache", "equivalence", "derivative_engine",
+    "step_checker", "grading", "rule_detector", "service",
+]
+
+_LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def parse_importtime(stderr):
+    """{module: cumulative ms} for the top-level imports in -X importtime output."""
+    result = {}
+    for line in stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m and len(m.group(3)) == 1:
+            result[m.group(4)] = int(m.group(2)) / 1000
+    return result
+
+
+def import_time(modules, python=sys.executable):
+    code = "import " + ", ".join(modules)
+    proc = subprocess.run([python, "-X", "importtime", "-c", code], cwd=ROOT,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {modules} failed:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def frozen_import_time(executable, seconds):
+    """Run a frozen build for `seconds` and parse the import times it reports."""
+    proc = subprocess.Popen([executable], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    try:
+        _, stderr = proc.communicate(timeout=seconds)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        _, stderr = proc.communicate()
+    return parse_importtime(stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report DerivaCheck import times.")
+    parser.add_argument("--python", default=sys.executable, help="interpreter to measure")
+    parser.add_argument("--budget-ms", type=float, help="fail if app startup imports take longer")
+    parser.add_argument("--frozen", metavar="EXE", help="measure a PyInstaller build instead")
+    parser.add_argument("--frozen-seconds", type=float, default=30.0)
+    args = parser.parse_args(argv)
+
+    if args.frozen:
+        times = frozen_import_time(args.frozen, args.frozen_seconds)
+        if not times:
+            print("No import times found; was the build frozen with --python-option \"X importtime\"?",
+                  file=sys.stderr)
+            return 2
+        for name, ms in sorted(times.items(), key=lambda kv: -kv[1])[:25]:
+            print(f"{name:<40} {ms:>9.1f} ms")
+        total = sum(times.values())
+        label = "frozen startup"
+    else:
+        for name in MODULES:
+            ms = import_time([name], args.python).get(name, 0.0)
+            print(f"{name:<40} {ms:>9.1f} ms")
+        total = sum(import_time(APP_STARTUP, args.python).values())
+        label = "app startup"
+
+    print(f"{label + ' total':<40} {total:>9.1f} ms")
+    if args.budget_ms is not None and total > args.budget_ms:
+        print(f"OVER BUDGET: {total:.1f} ms > {args.budget_ms:.1f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# Fixed corpus of SM015-style problems for the benchmark suite.
+# Each problem has a correct and an incorrect set of working steps, written
+# the way students type them (superscripts, implicit multiplication, dy/dx).
+
+PROBLEMS = [
+    # ---- Polynomials ----
+    {"name": "poly-cubic", "mode": "Normal", "func": "2x³ + 3x",
+     "correct": ["d/dx (2x³ + 3x)", "6x² + 3"],
+     "incorrect": ["6x³ + 3"]},
+    {"name": "poly-quartic", "mode": "Normal", "func": "x⁴ − 5x² + 7x − 2",
+     "correct": ["4x³ − 10x + 7"],
+     "incorrect": ["4x³ − 10x"]},
+    {"name": "poly-chain", "mode": "Normal", "func": "(2x+1)³",
+     "correct": ["3(2x+1)²·2"],
+     "incorrect": ["3(2x+1)²"]},
+    {"name": "poly-subtraction", "mode": "Normal", "func": "x³ − 3x² − 2x",
+     "correct": ["3x² − 6x + 2 − 4", "3(x^2 - 2x - 1) + 1"],
+     "incorrect": ["6x - 2*3"]},
+
+    # ---- Trig chains ----
+    {"name": "trig-sin-chain", "mode": "Normal", "func": "sin(3x² + 1)",
+     "correct": ["6x cos(3x² + 1)"],
+     "incorrect": ["cos(3x² + 1)"]},
+    {"name": "trig-cos-squared", "mode": "Normal", "func": "cos²(2x)",
+     "correct": ["−4 sin(2x) cos(2x)"],
+     "incorrect": ["4 sin(2x) cos(2x)"]},
+    {"name": "trig-product", "mode": "Normal", "func": "x² tan(x)",
+     "correct": ["2x tan(x) + x² sec²(x)"],
+     "incorrect": ["2x sec²(x)"]},
+
+    # ---- Quotients ----
+    {"name": "quotient-rational", "mode": "Normal", "func": "(x² + 1)/(x − 1)",
+     "correct": ["(2x(x − 1) − (x² + 1))/(x − 1)²"],
+     "incorrect": ["2x/1"]},
+    {"name": "quotient-trig-log", "mode": "Normal", "func": "tan(3x)/ln(x)",
+     "correct": ["(3sec²(3x) ln(x) − tan(3x)/x)/ln(x)²"],
+     "incorrect": ["3sec²(3x) x"]},
+
+    # ---- ln / exp ----
+    {"name": "ln-chain", "mode": "Normal", "func": "ln(x² + 4)",
+     "correct": ["2x/(x² + 4)"],
+     "incorrect": ["1/(x² + 4)"]},
+    {"name": "exp-product", "mode": "Normal", "func": "x e^(2x)",
+     "correct": ["e^(2x) + 2x e^(2x)"],
+     "incorrect": ["2e^(2x)"]},
+
+    # ---- Implicit ----
+    {"name": "implicit-circle", "mode": "Implicit", "func": "x² + y² = 25",
+     "correct": ["2x + 2y dy/dx", "0", "dy/dx = −x/y"],
+     "incorrect": ["2x + 2y", "0", "dy/dx = x/y"]},
+    {"name": "implicit-curve", "mode": "Implicit", "func": "x³ + xy + y³ = 7",
+     "correct": ["3x² + y + x dy/dx + 3y² dy/dx", "0", "dy/dx = −(3x² + y)/(x + 3y²)"],
+     "incorrect": ["3x² + 1 + 3y²", "0", "dy/dx = −(3x² + 1)/(3y²)"]},
+    {"name": "implicit-trig", "mode": "Implicit", "func": "sin(y) + x² = 2y",
+     "correct": ["cos(y) dy/dx + 2x", "2 dy/dx", "dy/dx = 2x/(2 − cos(y))"],
+     "incorrect": ["cos(y) + 2x", "2", "dy/dx = 2x"]},
+
+    # ---- Parametric ----
+    {"name": "parametric-poly", "mode": "Parametric", "x_t": "t²", "y_t": "t³",
+     "correct": ["dx/dt = 2t", "dy/dt = 3t²", "dy/dx = 3t/2"],
+     "incorrect": ["dx/dt = 2t", "dy/dt = 3t", "dy/dx = 3/2"]},
+    {"name": "parametric-trig", "mode": "Parametric", "x_t": "2cos(t)", "y_t": "3sin(t)",
+     "correct": ["dx/dt = −2sin(t)", "dy/dt = 3cos(t)", "dy/dx = −3cos(t)/(2sin(t))"],
+     "incorrect": ["dx/dt = 2sin(t)", "dy/dt = 3cos(t)", "dy/dx = 3cos(t)/(2sin(t))"]},
+    {"name": "parametric-exp", "mode": "Parametric", "x_t": "e^t + t", "y_t": "t e^t",
+     "correct": ["dx/dt = e^t + 1", "dy/dt = e^t + t e^t", "dy/dx = (e^t + t e^t)/(e^t + 1)"],
+     "incorrect": ["dx/dt = e^t", "dy/dt = t e^t", "dy/dx = t"]},
+]
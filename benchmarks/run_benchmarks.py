@@ -0,0 +1,260 @@
+# Reproducible performance benchmarks for the checking pipeline.
+#
+#   python benchmarks/run_benchmarks.py                        # print results as JSON
+#   python benchmarks/run_benchmarks.py -o results.json        # write them to a file
+#   python benchmarks/run_benchmarks.py --update-baseline      # store a new baseline
+#   python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --threshold 0.5
+#
+# Every stage runs over the whole corpus (benchmarks/corpus.py) with all caches
+# cleared first, so a round measures cold work. Each stage reports the median,
+# min and max over --rounds rounds. With --baseline, the run fails (exit 1)
+# when a stage's best round (min_ms, the least noisy figure on a shared
+# machine) is slower than baseline * (1 + threshold) and the difference is
+# above the --noise-ms floor.
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sympy as sp
+from corpus import PROBLEMS
+from derivative_engine import DERIVATIVE_CACHE, normal_steps, implicit_steps, parametric_steps
+from equivalence import _compile, check_equivalence
+from fingerprint import _fingerprint, _point
+from grading import build_expected_steps, mistake_sources
+from intermediate_forms import INDEX_CACHE
+from latex_input import LATEX_CACHE
+from mistakes import MISTAKE_CACHE, diagnose
+from normalizer import normalize, parse_math
+from parse_cache import PARSE_CACHE
+from rendering import RENDER_CACHE, render_expr, render_text
+from rule_detector import RULE_CACHE, detect_rules
+from step_checker import check_derivative_steps, check_steps_against_expected
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+x, y, t = sp.symbols("x y t")
+
+
+def clear_caches():
+    sp.core.cache.clear_cache()
+    PARSE_CACHE.clear()
+    RULE_CACHE.clear()
+    MISTAKE_CACHE.clear()
+    RENDER_CACHE.clear()
+    DERIVATIVE_CACHE.memory.clear()
+    INDEX_CACHE.clear()
+    LATEX_CACHE.clear()
+    _compile.cache_clear()
+    _fingerprint.cache_clear()
+    _point.cache_clear()
+
+
+# ---------------- PREPARATION ---------------- #
+def prepare(problem):
+    """Parse inputs and expected steps once, outside the timed stages."""
+    p = dict(problem)
+    p["steps"] = p["correct"] + p["incorrect"]
+    p["inputs"] = [p[k] for k in ("func", "x_t", "y_t") if k in p]
+    p["expected"] = build_expected_steps(p["mode"], func=p.get("func", ""),
+                                         x_t=p.get("x_t", ""), y_t=p.get("y_t", ""))
+    if p["mode"] == "Implicit":
+        lhs, rhs = p["func"].split("=", 1)
+        p["parsed"] = (parse_math(lhs), parse_math(rhs))
+    else:
+        p["parsed"] = tuple(parse_math(s) for s in p["inputs"])
+    p["parsed_steps"] = [parse_math(s) for s in p["steps"]]
+    return p
+
+
+# ---------------- STAGES ---------------- #
+def stage_normalization(problems):
+    for p in problems:
+        for line in p["inputs"] + p["steps"]:
+            normalize(line)
+
+def stage_parsing(problems):
+    for p in problems:
+        for line in p["inputs"] + p["steps"]:
+            parse_math(line)
+
+def _derivatives(p):
+    if p["mode"] == "Parametric":
+        x_t, y_t = p["parsed"]
+        return [sp.diff(x_t, t), sp.diff(y_t, t)]
+    if p["mode"] == "Implicit":
+        lhs, rhs = p["parsed"]
+        return [sp.diff(lhs - rhs, x), sp.diff(lhs - rhs, y)]
+    return [sp.diff(p["parsed"][0], x)]
+
+def stage_differentiation(problems):
+    for p in problems:
+        _derivatives(p)
+
+def stage_simplification(problems):
+    for p in problems:
+        first, *rest = _derivatives(p)
+        if p["mode"] == "Parametric":
+            sp.simplify(rest[0] / first)
+        elif p["mode"] == "Implicit":
+            sp.simplify(-first / rest[0])
+        else:
+            sp.simplify(first)
+
+def stage_equivalence(problems):
+    for p in problems:
+        for i, step in enumerate(p["parsed_steps"]):
+            expected = p["expected"][i % len(p["expected"])]["expr"]
+            check_equivalence(step, expected)
+
+def stage_latex(problems):
+    for p in problems:
+        for e in p["expected"]:
+            render_expr(e["expr"])
+        for line in p["steps"]:
+            render_text(line)
+
+def stage_derivative_engine(problems):
+    for p in problems:
+        if p["mode"] == "Parametric":
+            parametric_steps(*p["parsed"])
+        elif p["mode"] == "Implicit":
+            implicit_steps(*p["parsed"])
+        else:
+            normal_steps(p["parsed"][0])
+
+def stage_check_steps_against_expected(problems):
+    for p in problems:
+        check_steps_against_expected(p["correct"], p["expected"])
+        check_steps_against_expected(p["incorrect"], p["expected"])
+
+def stage_check_derivative_steps(problems):
+    for p in problems:
+        for steps in (p["correct"], p["incorrect"]):
+            if p["mode"] == "Parametric":
+                check_derivative_steps(steps, mode="Parametric", parametric_inputs=p["parsed"])
+            elif p["mode"] == "Implicit":
+                check_derivative_steps(steps[-1:], original_func=p["parsed"], mode="Implicit")
+            else:
+                check_derivative_steps(steps, original_func=p["func"])
+
+def stage_detect_rules(problems):
+    for p in problems:
+        for expr in p["parsed"]:
+            detect_rules(expr, mode=p["mode"])
+
+def stage_diagnose_mistakes(problems):
+    for p in problems:
+        sources = mistake_sources(p["mode"], p["parsed"], p["expected"])
+        for i, line in enumerate(p["parsed_steps"]):
+            k = i % len(p["expected"])
+            if k in sources:
+                func, var, implicit = sources[k]
+                diagnose(line, func, var, implicit)
+
+STAGES = {
+    "normalization": stage_normalization,
+    "parsing": stage_parsing,
+    "differentiation": stage_differentiation,
+    "simplification": stage_simplification,
+    "equivalence": stage_equivalence,
+    "latex_rendering": stage_latex,
+    "derivative_engine": stage_derivative_engine,
+    "check_steps_against_expected": stage_check_steps_against_expected,
+    "check_derivative_steps": stage_check_derivative_steps,
+    "detect_rules": stage_detect_rules,
+    "diagnose_mistakes": stage_diagnose_mistakes,
+}
+
+
+# ---------------- RUNNER ---------------- #
+def run(rounds, stages=None):
+    problems = [prepare(p) for p in PROBLEMS]
+    results = {}
+    for name, stage in STAGES.items():
+        if stages and name not in stages:
+            continue
+        stage(problems)  # warm imports and lazy SymPy initialization
+        timings = []
+        for _ in range(rounds):
+            clear_caches()
+            start = time.perf_counter()
+            stage(problems)
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = {
+            "median_ms": round(statistics.median(timings), 3),
+            "min_ms": round(min(timings), 3),
+            "max_ms": round(max(timings), 3),
+            "rounds": rounds,
+        }
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "sympy": sp.__version__,
+            "machine": platform.machine(),
+            "problems": len(problems),
+        },
+        "stages": results,
+    }
+
+
+def compare(current, baseline, threshold, noise_ms):
+    """Return a list of human-readable regressions against the baseline."""
+    regressions = []
+    for name, stats in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if base is None:
+            continue
+        current_ms, base_ms = stats["min_ms"], base["min_ms"]
+        if current_ms > base_ms * (1 + threshold) and current_ms - base_ms > noise_ms:
+            regressions.append(
+                f"{name}: {current_ms:.2f} ms vs baseline {base_ms:.2f} ms "
+                f"(+{(current_ms / base_ms - 1) * 100:.0f}%, limit +{threshold * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the DerivaCheck checking pipeline.")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--stage", action="append", choices=list(STAGES), help="only run these stages")
+    parser.add_argument("-o", "--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--threshold", type=float, default=0.5, help="allowed slowdown per stage (0.5 = 50%%)")
+    parser.add_argument("--noise-ms", type=float, default=2.0, help="ignore regressions smaller than this")
+    parser.add_argument("--update-baseline", nargs="?", const=DEFAULT_BASELINE, metavar="PATH",
+                        help=f"store the results as the new baseline (default: {DEFAULT_BASELINE})")
+    args = parser.parse_args(argv)
+
+    results = run(args.rounds, args.stage)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.update_baseline:
+        with open(args.update_baseline, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Baseline written to {args.update_baseline}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold, args.noise_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("No stage regressed past the threshold.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from sympy import srepr, sympify
+
+# Returned by get() when a key is not cached (None can be a cached value).
+MISSING = object()
+
+
+# ---------------- IN-PROCESS TIER ---------------- #
+class LRUCache:
+    """Thread-safe, size-bounded LRU mapping with hit/miss/eviction counters."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def values(self):
+        with self._lock:
+            return list(self._data.values())
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# ---------------- ON-DISK TIER ---------------- #
+class SQLiteStore:
+    """
+    File-backed key/value store that survives restarts.
+    Holds at most `maxsize` rows; the least recently used rows are evicted.
+    """
+
+    def __init__(self, path, maxsize=10000):
+        self.path = path
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return MISSING
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, accessed) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            size = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if size > self.maxsize:
+                evicted = self._conn.execute(
+                    "DELETE FROM entries WHERE key IN "
+                    "(SELECT key FROM entries ORDER BY accessed LIMIT ?)",
+                    (size - self.maxsize,),
+                ).rowcount
+                self.evictions += evicted
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self):
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# ---------------- DERIVATIVE CACHE ---------------- #
+def canonical_key(mode, *exprs):
+    """Content address of a problem: the mode plus srepr() of each parsed input."""
+    payload = "|".join([mode] + [srepr(sympify(e)) for e in exprs])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _dumps(results):
+    return json.dumps([None if r is None else srepr(r) for r in results])
+
+
+def _loads(text):
+    return tuple(None if r is None else sympify(r) for r in json.loads(text))
+
+
+class DerivativeCache:
+    """
+    Two-tier cache for derivative results (tuples of SymPy expressions).
+    The LRU tier is per process; the optional SQLite tier is shared by every
+    process pointed at the same file and survives Streamlit restarts.
+    """
+
+    def __init__(self, maxsize=256, path=None, disk_maxsize=10000):
+        self.memory = LRUCache(maxsize)
+        self.disk = SQLiteStore(path, disk_maxsize) if path else None
+
+    def get(self, key):
+        results = self.memory.get(key)
+        if results is not MISSING or self.disk is None:
+            return results
+        stored = self.disk.get(key)
+        if stored is MISSING:
+            return MISSING
+        results = _loads(stored)
+        self.memory.put(key, results)
+        return results
+
+    def put(self, key, results):
+        results = tuple(results)
+        self.memory.put(key, results)
+        if self.disk is not None:
+            self.disk.put(key, _dumps(results))
+
+    def get_or_compute(self, mode, inputs, compute):
+        """Return the cached results for (mode, inputs), computing them on a miss."""
+        key = canonical_key(mode, *inputs)
+        results = self.get(key)
+        if results is MISSING:
+            results = tuple(compute(*inputs))
+            self.put(key, results)
+        return results
+
+    def stats(self):
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
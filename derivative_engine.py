@@ -1,7 +1,163 @@
-from sympy import symbols, diff, simplify, solve, latex
+import os
+
+from sympy import (symbols, Symbol, Derivative, Eq, cancel, count_ops, diff, expand, factor, fraction, simplify,
+                   solve, latex, sympify, together)
+from cache import DerivativeCache
+from metrics import span
 
 # Symbols
 x, y, t = symbols('x y t')
+MAX_ORDER = 4
+dy_dx_symbol = Symbol('dy/dx')
+# y -> dy/dx -> d²y/dx² ...: what each one differentiates to with respect to x
+_Y_CHAIN = [(y, dy_dx_symbol)] + [
+    (Symbol(f"d{sup}y/dx{sup}" if sup else "dy/dx"), Symbol(f"d{nxt}y/dx{nxt}"))
+    for sup, nxt in (("", "²"), ("²", "³"), ("³", "⁴"))
+]
+
+# Shared across sessions; set DERIVACHECK_CACHE_DB to also keep results on disk.
+DERIVATIVE_CACHE = DerivativeCache(
+    maxsize=int(os.environ.get("DERIVACHECK_CACHE_SIZE", "512")),
+    path=os.environ.get("DERIVACHECK_CACHE_DB") or None,
+)
+
+# ---------------- IMPLICIT DIFFERENTIATION ---------------- #
+def implicit_diff(expr, var=x):
+    """d/dvar of expr, where y depends on x: y' is dy/dx, (dy/dx)' is d²y/dx², ..."""
+    result = diff(expr, var)
+    if var == x:
+        for symbol, derivative in _Y_CHAIN:
+            if expr.has(symbol):
+                result += diff(expr, symbol) * derivative
+    return result
+
+def expand_derivatives(expr):
+    """expr with unevaluated d/dx(...) (normalizer.parse_math) worked out by implicit_diff()."""
+    def evaluate(d):
+        inner = d.expr
+        for var, count in d.variable_count:
+            for _ in range(count):
+                inner = implicit_diff(inner, var)
+        return inner
+    return expr.replace(lambda e: isinstance(e, Derivative), evaluate)
+
+# ---------------- EXPECTED STEPS ---------------- #
+def _normal_steps(func_expr):
+    with span("diff", expr=func_expr):
+        dfx = diff(func_expr, x)
+    with span("simplify") as s:
+        s.expr = simplify(dfx)
+    return (s.expr,)
+
+def _implicit_steps(lhs, rhs):
+    with span("diff", expr=lhs - rhs):
+        d_lhs = diff(lhs, x) + diff(lhs, y) * dy_dx_symbol
+        d_rhs = diff(rhs, x) + diff(rhs, y) * dy_dx_symbol
+    with span("solve") as s:
+        sol = solve(Eq(d_lhs, d_rhs), dy_dx_symbol)
+        dydx = simplify(sol[0]) if sol else None
+        s.expr = dydx
+    return d_lhs, d_rhs, dydx
+
+def _parametric_steps(x_t, y_t):
+    with span("diff", expr=y_t):
+        dx_dt = diff(x_t, t)
+        dy_dt = diff(y_t, t)
+    with span("simplify") as s:
+        s.expr = simplify(dy_dt / dx_dt)
+    return dx_dt, dy_dt, s.expr
+
+# ---------------- HIGHER ORDERS ---------------- #
+# Each order extends the (cached, already simplified) steps of the order
+# below it by one differentiation, instead of starting from the input again.
+# Since that input is already compact, a factor / cancel pass is enough to
+# tidy the new derivative; a full simplify() costs 5-15x more for much the
+# same result.
+def _tidy(expr):
+    """Shortest of expr, factor(expr) and expr over a common denominator."""
+    candidates = [expr]
+    for transform in (factor, lambda e: cancel(together(e))):
+        try:
+            candidates.append(transform(expr))
+        except Exception:
+            pass
+    return min(candidates, key=count_ops)
+
+def _next_normal(previous, func_expr):
+    last = previous[-1]
+    with span("diff", expr=last):
+        d = diff(last, x)
+    with span("simplify") as s:
+        s.expr = _tidy(d)
+    return previous + (s.expr,)
+
+def _use_equation(expr, lhs, rhs):
+    """expr with the equation substituted back in where that shortens it: (-x²-y²)/y³ -> -25/y³."""
+    numerator, denominator = fraction(together(expr))
+    best = expr
+    for candidate in (numerator.subs(lhs, rhs), expand(numerator).subs(lhs, rhs)):
+        reduced = factor(candidate / denominator)
+        if count_ops(reduced) < count_ops(best):
+            best = reduced
+    return best
+
+def _next_implicit(previous, lhs, rhs):
+    # Differentiate the last derivative again (y still depends on x), then
+    # substitute the first derivative for dy/dx. Adds (d/dx of the previous
+    # derivative, dⁿy/dxⁿ reduced using the equation itself, dⁿy/dxⁿ from
+    # the unreduced lower orders), so both ways of working can be checked.
+    dydx = previous[2]
+    if dydx is None or previous[-1] is None:
+        return previous + (None, None, None)
+    reduced, plain = previous[-2:] if len(previous) > 3 else (dydx, dydx)
+    with span("diff", expr=reduced):
+        d_last = diff(reduced, x) + diff(reduced, y) * dy_dx_symbol
+        d_plain = diff(plain, x) + diff(plain, y) * dy_dx_symbol
+    with span("simplify") as s:
+        s.expr = _use_equation(_tidy(d_last.subs(dy_dx_symbol, dydx)), lhs, rhs)
+        plain = _tidy(d_plain.subs(dy_dx_symbol, dydx))
+    return previous + (d_last, s.expr, plain)
+
+def _next_parametric(previous, x_t, y_t):
+    # dⁿy/dxⁿ = d/dt(dⁿ⁻¹y/dxⁿ⁻¹) / (dx/dt)
+    dx_dt, last = previous[0], previous[-1]
+    with span("diff", expr=last):
+        d_dt = diff(last, t)
+    with span("simplify") as s:
+        s.expr = _tidy(d_dt / dx_dt)
+    return previous + (d_dt, s.expr)
+
+def order_mode(mode, order=1):
+    """Cache key prefix for a derivative order; first order keeps the bare mode."""
+    return mode if order == 1 else f"{mode}:{order}"
+
+def _steps(mode, inputs, order, first, extend):
+    if order == 1:
+        return DERIVATIVE_CACHE.get_or_compute(mode, inputs, first)
+    return DERIVATIVE_CACHE.get_or_compute(
+        order_mode(mode, order), inputs,
+        lambda *args: extend(_steps(mode, args, order - 1, first, extend), *args),
+    )
+
+def normal_steps(func_expr, order=1):
+    """Returns (df/dx, d²f/dx², ...) up to `order` for y = f(x), cached."""
+    return _steps("Normal", (sympify(func_expr),), order, _normal_steps, _next_normal)
+
+def implicit_steps(lhs, rhs=0, order=1):
+    """
+    Returns (d/dx(LHS), d/dx(RHS), dy/dx) for lhs = rhs, cached, and for each
+    higher order (d/dx of the previous derivative, dⁿy/dxⁿ reduced using
+    the equation, dⁿy/dxⁿ without it).
+    dy/dx is None when the differentiated equation cannot be solved for it.
+    """
+    return _steps("Implicit", (sympify(lhs), sympify(rhs)), order, _implicit_steps, _next_implicit)
+
+def parametric_steps(x_t, y_t, order=1):
+    """
+    Returns (dx/dt, dy/dt, dy/dx) for x = x(t), y = y(t), cached, and for each
+    higher order (d/dt of the previous derivative, dⁿy/dxⁿ).
+    """
+    return _steps("Parametric", (sympify(x_t), sympify(y_t)), order, _parametric_steps, _next_parametric)
 
 # ---------------- PARAMETRIC ---------------- #
 def parametric_derivative_chain(x_t, y_t):
@@ -9,13 +165,11 @@ def parametric_derivative_chain(x_t, y_t):
     Computes dy/dx for parametric equations using the chain rule.
     Returns (simplified expression, LaTeX string)
     """
-    dx_dt = diff(x_t, t)
-    dy_dt = diff(y_t, t)
+    dx_dt, dy_dt, dydx = parametric_steps(x_t, y_t)
 
     if dx_dt == 0:
         raise ValueError("dx/dt is zero, derivative undefined.")
 
-    dydx = simplify(dy_dt / dx_dt)
     return dydx, latex(dydx)
 
 # ---------------- IMPLICIT ---------------- #
@@ -24,16 +178,9 @@ def implicit_derivative(lhs, rhs=0):
     Computes dy/dx for an implicit equation lhs = rhs.
     Returns (simplified expression, LaTeX string)
     """
-    expr = lhs - rhs
-    dydx_symbol = symbols('dy_dx')
-
-    # Form equation: dx/dx + dy/dy * dy/dx = 0
-    eq = diff(expr, x) + diff(expr, y) * dydx_symbol
-
-    # Solve for dy/dx
-    solutions = solve(eq, dydx_symbol)
-    if not solutions:
+    # Form equation: d/dx(lhs) = d/dx(rhs) and solve for dy/dx
+    dydx = implicit_steps(lhs, rhs)[2]
+    if dydx is None:
         raise ValueError("Could not solve for dy/dx")
 
-    dydx = simplify(solutions[0])
-    return dydx, latex(dydx)
\ No newline at end of file
+    return dydx, latex(dydx)
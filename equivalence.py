@@ -0,0 +1,180 @@
+from functools import lru_cache
+
+import numpy as np
+from sympy import (Abs, Derivative, Expr, Pow, Symbol, cancel, cos, cot, csc, expand, fraction, lambdify, log,
+                   sec, sign, simplify, sin, sympify, tan)
+
+from derivative_engine import expand_derivatives
+
+# ---------------- PROBE SETTINGS ---------------- #
+# Defaults for the numeric probe. Every key can be overridden per call
+# (check_equivalence(a, b, points=64)) or globally via configure_probe().
+PROBE_SETTINGS = {
+    "points": 32,          # random sample points per comparison
+    "seed": 2025,          # RNG seed, fixed so verdicts are reproducible
+    # sample intervals for every free symbol (or one (low, high) pair); both
+    # signs, so x and sqrt(x**2) differ. Points where either side is not real
+    # are masked out.
+    "domain": ((-2.7, -0.3), (0.3, 2.7)),
+    "rtol": 1e-9,          # relative tolerance for a numeric match
+    "atol": 1e-11,         # absolute tolerance for a numeric match
+    "tie_factor": 1e3,     # mismatches within tie_factor * tolerance are "near ties"
+    "min_valid": 8,        # fewer real, finite samples than this -> inconclusive
+}
+
+TIER_STRUCTURAL = "structural"
+TIER_NUMERIC = "numeric"
+TIER_EXACT = "exact"
+
+
+def configure_probe(**settings):
+    """Update the default probe settings (points, seed, domain, rtol, atol, ...)."""
+    unknown = set(settings) - set(PROBE_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown probe settings: {', '.join(sorted(unknown))}")
+    PROBE_SETTINGS.update(settings)
+
+
+# ---------------- NUMERIC PROBE ---------------- #
+@lru_cache(maxsize=512)
+def _compile(expr, symbols):
+    """Lambdify an expression once; shared across every comparison that uses it."""
+    return lambdify(symbols, expr, modules="numpy", dummify=True)
+
+
+def _intervals(domain):
+    if np.isscalar(domain[0]):
+        domain = (domain,)
+    return np.array(domain, dtype=float)
+
+
+def _sample(symbols, settings):
+    rng = np.random.default_rng(settings["seed"])
+    intervals = _intervals(settings["domain"])
+    points = settings["points"]
+    samples = []
+    for _ in symbols:
+        low, high = intervals[rng.integers(len(intervals), size=points)].T
+        samples.append(low + (high - low) * rng.random(points))
+    return samples
+
+
+def _evaluate(expr, symbols, samples, points):
+    values = _compile(expr, symbols)(*samples)
+    return np.broadcast_to(np.asarray(values, dtype=complex), (points,))
+
+
+def numeric_probe(expr1, expr2, **overrides):
+    """
+    Compare two expressions at a batch of random points.
+    Returns True (all points match), False (a clear mismatch) or
+    None when the probe is inconclusive (NaN / complex values, near ties,
+    or expressions that cannot be evaluated numerically).
+    """
+    settings = {**PROBE_SETTINGS, **overrides}
+    symbols = tuple(sorted(expr1.free_symbols | expr2.free_symbols, key=str))
+
+    try:
+        samples = _sample(symbols, settings)
+        with np.errstate(all="ignore"):
+            a = _evaluate(expr1, symbols, samples, settings["points"])
+            b = _evaluate(expr2, symbols, samples, settings["points"])
+    except Exception:
+        return None
+
+    valid = (
+        np.isfinite(a) & np.isfinite(b)
+        & (np.abs(a.imag) <= settings["atol"])
+        & (np.abs(b.imag) <= settings["atol"])
+    )
+    if valid.sum() < settings["min_valid"]:
+        return None
+
+    a, b = a.real[valid], b.real[valid]
+    diff = np.abs(a - b)
+    tolerance = settings["atol"] + settings["rtol"] * np.abs(b)
+
+    if np.any(diff > settings["tie_factor"] * tolerance):
+        return False
+    if np.all(diff <= tolerance):
+        return True
+    return None
+
+
+# ---------------- EQUIVALENCE ENGINE ---------------- #
+def _branch_sensitive(expr):
+    """
+    True when expr has Abs, sign, an even root or the log of something not
+    known to be positive: on the sampled points where such a term is real it
+    can agree with a different expression (sqrt(x**2) and x for x > 0), so a
+    numeric match is not proof.
+    """
+    for node in expr.atoms(Abs, sign, Pow, log):
+        if isinstance(node, (Abs, sign)):
+            return True
+        if isinstance(node, log) and not node.args[0].is_positive:
+            return True
+        if (isinstance(node, Pow) and node.exp.is_Rational and node.exp.q % 2 == 0
+                and not node.base.is_nonnegative):
+            return True
+    return False
+
+
+_SIN_COS = {tan: lambda u: sin(u) / cos(u), sec: lambda u: 1 / cos(u),
+            csc: lambda u: 1 / sin(u), cot: lambda u: cos(u) / sin(u)}
+
+
+def _is_even_sin_power(node):
+    return node.is_Pow and isinstance(node.base, sin) and node.exp.is_Integer and node.exp > 0 and node.exp % 2 == 0
+
+
+def _is_trig_rational_zero(diff):
+    """
+    Exact test that a difference is 0 once written in sin/cos over a common
+    denominator with sin² = 1 - cos². Most branch-sensitive matches are such
+    a rearrangement, and this is far cheaper than simplify(); False only
+    means "not shown", so the caller falls back to simplify().
+    """
+    for func, rewrite in _SIN_COS.items():
+        diff = diff.replace(func, rewrite)
+    numerator, _ = fraction(cancel(diff))
+    numerator = expand(numerator).replace(_is_even_sin_power,
+                                          lambda p: (1 - cos(p.base.args[0]) ** 2) ** (p.exp // 2))
+    return expand(numerator) == 0
+
+
+def _real(expr):
+    """expr over real symbols, as the checker means them: |x|² = x², x·sign(x) = |x|."""
+    return expr.xreplace({s: Symbol(s.name, real=True) for s in expr.free_symbols if s.is_real is None})
+
+
+def check_equivalence(expr1, expr2, **overrides):
+    """
+    Decide whether two SymPy expressions are mathematically equivalent.
+    Cheap tiers run first; simplify() is only used when they are inconclusive.
+    Returns {"equivalent": bool, "tier": "structural" | "numeric" | "exact"}.
+    """
+    expr1, expr2 = sympify(expr1), sympify(expr2)
+    # Students may leave d/dx(...) unevaluated in a step; y depends on x there
+    if expr1.has(Derivative):
+        expr1 = expand_derivatives(expr1)
+    if expr2.has(Derivative):
+        expr2 = expand_derivatives(expr2)
+
+    if expr1 == expr2:
+        return {"equivalent": True, "tier": TIER_STRUCTURAL}
+
+    if isinstance(expr1, Expr) and isinstance(expr2, Expr):
+        probe = numeric_probe(expr1, expr2, **overrides)
+        # A mismatch is always final; a match only when no branch can hide a difference
+        if probe is False or (probe and not (_branch_sensitive(expr1) or _branch_sensitive(expr2))):
+            return {"equivalent": probe, "tier": TIER_NUMERIC}
+        if probe and _is_trig_rational_zero(expr1 - expr2):
+            return {"equivalent": True, "tier": TIER_EXACT}
+
+    return {"equivalent": simplify(_real(expr1 - expr2)) == 0, "tier": TIER_EXACT}
+
+
+def is_equivalent(expr1, expr2, **overrides):
+    """Boolean shortcut for check_equivalence()."""
+    return check_equivalence(expr1, expr2, **overrides)["equivalent"]
@@ -0,0 +1,144 @@
+# Numeric fingerprints: a hash of an expression's values at fixed points.
+#
+# Equal expressions evaluate to the same numbers, so they share a fingerprint
+# (up to the rare value that rounds differently at the last kept digit).
+# Evaluation is done in 30-digit arithmetic and quantised to 12 significant
+# digits before hashing, so algebraically equal forms like (x+1)**2 and
+# x**2 + 2*x + 1 agree. A FingerprintIndex maps fingerprints to known forms,
+# so a student line is matched against any number of candidates with one
+# dictionary lookup plus one confirming check_equivalence() on a hit.
+import hashlib
+from functools import lru_cache
+
+import mpmath
+from sympy import Derivative, Expr, Float, S, Symbol, sympify
+
+from derivative_engine import expand_derivatives
+from equivalence import check_equivalence
+
+POINTS = 3            # evaluation points per expression
+PRECISION = 30        # working digits
+SIGNIFICANT = 12      # digits kept before hashing
+ZERO = 1e-20          # magnitudes below this hash as 0
+DOMAIN = (0.3, 2.7)   # positive points; hits are confirmed by check_equivalence()
+
+
+@lru_cache(maxsize=None)
+def _point(name, index):
+    """Fixed evaluation point for a symbol name; the same in every process."""
+    digest = hashlib.sha256(f"{name}:{index}".encode("utf-8")).digest()
+    fraction = int.from_bytes(digest[:8], "big") / 2**64
+    low, high = DOMAIN
+    return mpmath.mpf(low) + (high - low) * mpmath.mpf(fraction)
+
+
+# SymPy function name -> mpmath function, for the direct evaluator
+_FUNCTIONS = {
+    name: getattr(mpmath, name)
+    for name in ("sin", "cos", "tan", "sec", "csc", "cot", "asin", "acos", "atan",
+                 "sinh", "cosh", "tanh", "exp", "log", "sqrt")
+}
+_FUNCTIONS["Abs"] = mpmath.fabs
+
+
+def _evaluate(expr, env):
+    """
+    Evaluate an expression tree with mpmath at one point. Walking the tree
+    directly is several times cheaper than lambdify() or evalf() for the
+    small expressions students write; anything unusual goes to evalf().
+    """
+    if expr.is_Symbol:
+        return env[expr.name]
+    if expr.is_Integer:
+        return int(expr)
+    if expr.is_Rational:
+        return mpmath.mpf(expr.p) / expr.q
+    if expr.is_Float:
+        return mpmath.mpf(expr)
+    if expr.is_Add:
+        return mpmath.fsum(_evaluate(arg, env) for arg in expr.args)
+    if expr.is_Mul:
+        return mpmath.fprod(_evaluate(arg, env) for arg in expr.args)
+    if expr.is_Pow:
+        return mpmath.power(_evaluate(expr.base, env), _evaluate(expr.exp, env))
+    if expr is S.Pi:
+        return +mpmath.pi
+    if expr is S.Exp1:
+        return +mpmath.e
+    if expr is S.ImaginaryUnit:
+        return mpmath.mpc(0, 1)
+    func = _FUNCTIONS.get(type(expr).__name__)
+    if func is not None and len(expr.args) == 1:
+        return func(_evaluate(expr.args[0], env))
+    subs = {Symbol(name): Float(value, PRECISION) for name, value in env.items()}
+    return mpmath.mpmathify(complex(expr.xreplace(subs).evalf(PRECISION)))
+
+
+def _quantise(value):
+    value = complex(value)
+    parts = []
+    for part in (value.real, value.imag):
+        if part != part or part in (float("inf"), float("-inf")):
+            raise ValueError("non-finite value")
+        parts.append("0" if abs(part) < ZERO else f"{part:.{SIGNIFICANT - 1}e}")
+    return ",".join(parts)
+
+
+@lru_cache(maxsize=2048)
+def _fingerprint(expr):
+    names = [s.name for s in expr.free_symbols]
+    values = []
+    with mpmath.workdps(PRECISION):
+        for i in range(POINTS):
+            values.append(_quantise(_evaluate(expr, {name: _point(name, i) for name in names})))
+    # Each symbol name has its own points, so x**2 and t**2 still differ
+    payload = ";".join(values)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def fingerprint(expr):
+    """Hex fingerprint of a SymPy expression, or None when it cannot be evaluated at the points."""
+    try:
+        expr = sympify(expr)
+        if expr.has(Derivative):
+            expr = expand_derivatives(expr)
+        if not isinstance(expr, Expr):
+            return None
+        return _fingerprint(expr)
+    except Exception:
+        return None
+
+
+class FingerprintIndex:
+    """Known expressions bucketed by fingerprint, each with an attached value."""
+
+    def __init__(self, items=()):
+        self._buckets = {}
+        for expr, value in items:
+            self.add(expr, value)
+
+    def add(self, expr, value):
+        fp = fingerprint(expr)
+        if fp is not None:
+            self._buckets.setdefault(fp, []).append((expr, value))
+        return fp
+
+    def candidates(self, expr):
+        """Entries sharing the expression's fingerprint (unconfirmed)."""
+        fp = fingerprint(expr)
+        return list(self._buckets.get(fp, ())) if fp is not None else []
+
+    def lookup(self, expr, where=None):
+        """
+        Value of the first known expression equivalent to `expr`, confirmed;
+        None on a miss. `where(value)` can restrict which entries count.
+        """
+        for known, value in self.candidates(expr):
+            if where is not None and not where(value):
+                continue
+            if check_equivalence(expr, known)["equivalent"]:
+                return value
+        return None
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self._buckets.values())
@@ -0,0 +1,288 @@
+# Pure-Python grading core: what the "Check Steps" button does, without
+# Streamlit. Shared by app.py and the headless batch grader.
+import hashlib
+import time
+
+from cache import canonical_key
+from derivative_engine import MAX_ORDER, x, t, normal_steps, implicit_steps, order_mode, parametric_steps
+from step_checker import check_steps_against_expected, parse_expr_safe, to_backend
+from metrics import request_span, span
+from problem_bank import bank_from_env
+from intermediate_forms import intermediate_index
+from mistakes import diagnose
+from verdict_log import log_result
+from latex_input import latex_to_text
+from rendering import render_expr
+from normalizer import MathSyntaxError
+
+MODES = ("Normal", "Implicit", "Parametric")
+INPUT_FORMATS = ("text", "latex")
+MEMO_MAX_ENTRIES = 200
+SUPERSCRIPT_DIGITS = str.maketrans("0123456789", "⁰¹²³⁴⁵⁶⁷⁸⁹")
+
+# Set DERIVACHECK_PROBLEM_BANK to a file built by `python problem_bank.py build`
+PROBLEM_BANK = bank_from_env()
+
+# ---------------- EXPECTED STEPS ---------------- #
+def _parse_input(text):
+    with span("parse") as s:
+        s.expr = parse_expr_safe(to_backend(text))
+    return s.expr
+
+def parse_problem(mode, func="", x_t="", y_t=""):
+    """Parsed inputs: (x(t), y(t)) for Parametric, (lhs, rhs) for Implicit, (f,) for Normal."""
+    if mode == "Parametric":
+        return _parse_input(x_t), _parse_input(y_t)
+    if mode == "Implicit":
+        lhs_str, rhs_str = func.split("=", 1)
+        return _parse_input(lhs_str.strip()), _parse_input(rhs_str.strip())
+    return (_parse_input(func),)
+
+def _nth(n, top="y"):
+    """Label and LaTeX for the n-th derivative of `top` by x: ("d²y/dx²", r"\frac{d^{2}y}{dx^{2}}")."""
+    if n == 1:
+        return f"d{top}/dx", rf"\frac{{d{top}}}{{dx}}"
+    sup = str(n).translate(SUPERSCRIPT_DIGITS)
+    return f"d{sup}{top}/dx{sup}", rf"\frac{{d^{{{n}}}{top}}}{{dx^{{{n}}}}}"
+
+def _step(label, lhs, expr, also=None):
+    step = {"label": label, "expr": expr,
+            "display": lhs + " = " + render_expr(expr)}
+    if also is not None and also != expr:
+        # An equally correct form, e.g. before substituting the equation back in
+        step["also"] = [also]
+    return step
+
+def _higher_order_steps(orders, var):
+    """Steps for orders 2 and up, from (d/dvar of the previous derivative, dⁿy/dxⁿ[, other form]) tuples."""
+    steps = []
+    for n, (d_previous, nth, *also) in enumerate(orders, start=2):
+        label, latex = _nth(n - 1)
+        steps.append(_step(f"d/d{var}({label})", rf"\frac{{d}}{{d{var}}}\left({latex}\right)", d_previous))
+        steps.append(_step(*_nth(n), nth, *also))
+    return steps
+
+def build_expected_steps(mode, func="", x_t="", y_t="", order=1, use_bank=True):
+    """
+    Parse the problem and return the expected steps as {"label", "expr",
+    "display"} dicts; for order > 1 the steps of every order up to it.
+    use_bank=False always derives them (problem_bank.py build).
+    """
+    inputs = parse_problem(mode, func=func, x_t=x_t, y_t=y_t)
+    if use_bank and PROBLEM_BANK is not None:
+        # Precompiled bank: no symbolic work for problems it covers
+        steps = PROBLEM_BANK.get(canonical_key(order_mode(mode, order), *inputs))
+        if steps is not None:
+            return steps
+
+    if mode == "Parametric":
+        results = parametric_steps(*inputs, order=order)
+        dx_dt, dy_dt, dy_dx = results[:3]
+
+        return [
+            {"label": "dx/dt", "expr": dx_dt, "display": r"\frac{dx}{dt} = " + render_expr(dx_dt)},
+            {"label": "dy/dt", "expr": dy_dt, "display": r"\frac{dy}{dt} = " + render_expr(dy_dt)},
+            {"label": "dy/dx", "expr": dy_dx, "display": r"\frac{dy}{dx} = " + render_expr(dy_dx)},
+        ] + _higher_order_steps(zip(results[3::2], results[4::2]), "t")
+
+    if mode == "Implicit":
+        results = implicit_steps(*inputs, order=order)
+        d_lhs, d_rhs, dy_dx = results[:3]
+
+        expected_steps = [
+            {"label": "d/dx(lhs)", "expr": d_lhs, "display": r"\frac{d}{dx}(\text{LHS}) = " + render_expr(d_lhs)},
+            {"label": "d/dx(rhs)", "expr": d_rhs, "display": r"\frac{d}{dx}(\text{RHS}) = " + render_expr(d_rhs)},
+        ]
+        if dy_dx is not None:
+            expected_steps.append({"label": "dy/dx", "expr": dy_dx, "display": r"\frac{dy}{dx} = " + render_expr(dy_dx)})
+        elif order > 1:
+            raise ValueError("Could not solve for dy/dx, so higher derivatives are undefined")
+        return expected_steps + _higher_order_steps(zip(results[3::3], results[4::3], results[5::3]), "x")
+
+    # Normal
+    results = normal_steps(*inputs, order=order)
+    return [
+        {"label": "d/dx", "expr": results[0], "display": r"\frac{d}{dx} = " + render_expr(results[0])},
+    ] + [_step(*_nth(n, top=""), dfx) for n, dfx in enumerate(results[1:], start=2)]
+
+def mistake_sources(mode, inputs, expected_steps):
+    """
+    {expected step index: (function, variable, implicit)} for the steps that
+    are one differentiation of something known, so a wrong line there can be
+    matched against the typical mistakes (mistakes.diagnose).
+    """
+    exprs = [step["expr"] for step in expected_steps]
+    if mode == "Parametric":
+        sources = {0: (inputs[0], t, False), 1: (inputs[1], t, False)}
+        # d/dt(dⁿ⁻¹y/dxⁿ⁻¹) steps
+        sources.update({k: (exprs[k - 1], t, False) for k in range(3, len(exprs), 2)})
+    elif mode == "Implicit":
+        sources = {0: (inputs[0], x, True), 1: (inputs[1], x, True)}
+        sources.update({k: (exprs[k - 1], x, True) for k in range(3, len(exprs), 2)})
+    else:
+        sources = {0: (inputs[0], x, False)}
+        sources.update({k: (exprs[k - 1], x, False) for k in range(1, len(exprs))})
+    return sources
+
+def _explainer(mode, inputs, expected_steps):
+    sources = mistake_sources(mode, inputs, expected_steps)
+    def explain(student_expr, j):
+        return diagnose(student_expr, *sources[j]) if j in sources else None
+    return explain
+
+# ---------------- SUBMISSIONS ---------------- #
+def _field(record, key):
+    return record.get(key) or ""
+
+def _order(record):
+    """Derivative order of a submission; 1 when absent (CSV columns arrive as strings)."""
+    return int(record.get("order") or 1)
+
+def validate_submission(record):
+    """Return an error message for an incomplete or malformed submission, or None."""
+    for key in ("mode", "format", "func", "x_t", "y_t"):
+        if not isinstance(_field(record, key), str):
+            return f"{key} must be a string"
+    steps = _field(record, "steps")
+    if not isinstance(steps, str) and not (isinstance(steps, list) and all(isinstance(line, str) for line in steps)):
+        return "steps must be a string or a list of strings"
+    mode = _field(record, "mode") or "Normal"
+    if mode not in MODES:
+        return f"Unknown mode: {mode}"
+    if (_field(record, "format") or "text") not in INPUT_FORMATS:
+        return f"Unknown format: {record['format']}"
+    try:
+        order = _order(record)
+    except (TypeError, ValueError):
+        return f"Order must be a whole number: {record.get('order')!r}"
+    if not 1 <= order <= MAX_ORDER:
+        return f"Order must be between 1 and {MAX_ORDER}"
+    if mode in ("Normal", "Implicit") and not _field(record, "func").strip():
+        return "Please enter a function/equation"
+    if mode == "Implicit" and "=" not in record["func"]:
+        return "Implicit mode needs an equation with '='"
+    if mode == "Parametric" and (not _field(record, "x_t").strip() or not _field(record, "y_t").strip()):
+        return "Please enter both x(t) and y(t)"
+    if not split_steps(_field(record, "steps")):
+        return "Please enter your steps"
+    return None
+
+def split_steps(steps):
+    """Steps arrive as one string (one step per line) or as a list of lines."""
+    if isinstance(steps, str):
+        steps = steps.splitlines()
+    return [line.strip() for line in steps if line and line.strip()]
+
+def from_latex(record):
+    """
+    The record with its LaTeX inputs and steps converted to the text the
+    normalizer reads. Raises MathSyntaxError for unreadable inputs; an
+    unreadable step is kept as written and comes back "unparsable".
+    """
+    converted = dict(record, format="text")
+    for key in ("func", "x_t", "y_t"):
+        if _field(record, key).strip():
+            converted[key] = latex_to_text(record[key])
+    steps = []
+    for line in split_steps(record["steps"]):
+        try:
+            steps.append(latex_to_text(line))
+        except MathSyntaxError:
+            steps.append(line)
+    converted["steps"] = steps
+    return converted
+
+def problem_key(record):
+    """Identifies the problem (mode + inputs) a submission's steps belong to."""
+    fields = [order_mode(_field(record, "mode") or "Normal", _order(record))]
+    fields += [" ".join(_field(record, k).split()) for k in ("func", "x_t", "y_t")]
+    return hashlib.sha1("\x1f".join(fields).encode("utf-8")).hexdigest()
+
+def _memo_entries(record, memo):
+    """The caller's verdict memo, or a fresh one when it belongs to a different problem."""
+    if not isinstance(memo, dict):
+        return None
+    if memo.get("problem") != problem_key(record):
+        return {}
+    return dict(memo.get("entries") or {})
+
+def _logged_verdicts(result, record, memo, lines):
+    """
+    Verdicts worth logging: with a memo from an earlier check of the same
+    problem, only those of lines edited since then (and the missing steps of
+    a changed answer), so re-checks do not count the same line again.
+    """
+    previous = memo.get("lines") if isinstance(memo, dict) and memo.get("problem") == problem_key(record) else None
+    if not isinstance(previous, list):
+        return result["verdicts"]
+    changed = {i + 1 for i, line in enumerate(lines) if i >= len(previous) or previous[i] != line}
+    if not changed and len(lines) == len(previous):
+        return []
+    return [v for v in result["verdicts"] if v["step"] in changed or v["step"] > len(lines)]
+
+def grade_submission(record, memo=None):
+    """
+    Grade one submission: {"mode", "func" | "x_t" + "y_t", "steps", optional
+    "id", "order" (1 for dy/dx, 2 for d²y/dx², ...) and "format" ("text" or
+    "latex" for inputs and steps written in LaTeX).
+    Returns a JSON-serializable verdict; problems that cannot be graded come
+    back with status "error" instead of raising.
+
+    With `memo` (the "memo" of a previous result, {} to start one), lines
+    already checked against the same problem reuse their verdicts and the
+    result carries the updated memo back; only lines changed since that check
+    are written to the verdict log. Memos are reused as they are, so they
+    must come from the caller's own state (app.py keeps one per session),
+    never from the submission: a "memo" field in the record is ignored.
+    """
+    start = time.perf_counter()
+    result = {"id": record.get("id"), "mode": _field(record, "mode") or "Normal"}
+
+    error = validate_submission(record)
+    if error:
+        result.update(status="error", error=error)
+        return result
+    result["order"] = _order(record)
+    if record.get("format") == "latex":
+        try:
+            record = from_latex(record)
+        except MathSyntaxError as e:
+            result.update(status="error", error=str(e))
+            return result
+
+    steps_lines = split_steps(record["steps"])
+    try:
+        with request_span(result["mode"]):
+            inputs = {k: _field(record, k) for k in ("func", "x_t", "y_t")}
+            expected_steps = build_expected_steps(result["mode"], order=result["order"], **inputs)
+            verdicts = []
+            memo_entries = _memo_entries(record, memo)
+            problem = parse_problem(result["mode"], **inputs)
+            intermediates = None
+            if len(steps_lines) > len(expected_steps):
+                # Only needed when there are lines to spare for working
+                intermediates = intermediate_index(result["mode"], problem, expected_steps, order=result["order"])
+            feedback = check_steps_against_expected(steps_lines, expected_steps, verdicts=verdicts, memo=memo_entries,
+                                                    intermediates=intermediates,
+                                                    explain=_explainer(result["mode"], problem, expected_steps))
+    except Exception as e:
+        result.update(status="error", error=f"{type(e).__name__}: {e}")
+        return result
+
+    result.update(
+        status="ok",
+        correct=sum(v["status"] == "correct" for v in verdicts),
+        intermediate=sum(v["status"] == "intermediate" for v in verdicts),
+        total=len(expected_steps),
+        verdicts=verdicts,
+        feedback=feedback,
+        expected=[{"label": e["label"], "display": e["display"]} for e in expected_steps],
+        elapsed_ms=round((time.perf_counter() - start) * 1000, 3),
+    )
+    if memo_entries is not None:
+        # Oldest entries go first; a session only needs the lines it is still editing
+        entries = dict(list(memo_entries.items())[-MEMO_MAX_ENTRIES:])
+        result["memo"] = {"problem": problem_key(record), "entries": entries, "lines": steps_lines}
+    log_result(dict(result, verdicts=_logged_verdicts(result, record, memo, steps_lines)), problem_key(record),
+               [v for v in inputs.values() if v])  # DERIVACHECK_VERDICT_LOG
+    return result
@@ -0,0 +1,116 @@
+# Check history, kept in SQLite so it survives reruns, restarts and new visits.
+#
+#   DERIVACHECK_HISTORY_DB=history.db streamlit run app.py     # default: history.db
+#
+# Each check is one row, owned by the browser session, or by the (hashed)
+# history key app.py issues to a student who wants history across visits.
+# The sidebar blocks (markdown / LaTeX) are rendered once when the row is
+# written and stored with it, so showing history never re-renders LaTeX or
+# re-splits feedback messages. Pages are
+# read newest first with keyset pagination on the (owner, created, id)
+# index: a page costs the same however long the history grows.
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.environ.get("DERIVACHECK_HISTORY_DB", "history.db")
+PAGE_SIZE = int(os.environ.get("DERIVACHECK_HISTORY_PAGE_SIZE", "5"))
+
+
+# ---------------- RENDERING ---------------- #
+def render_entry(mode, order, func, x_t, y_t, results, fmt="text"):
+    """Sidebar blocks for one check: [(st method name, text)], in display order."""
+    from rendering import message_parts, render_text
+
+    # LaTeX inputs are shown as written
+    show = (lambda text: text) if fmt == "latex" else render_text
+    blocks = [("markdown", f"**Mode:** {mode}" + (f" (order {order})" if order > 1 else ""))]
+    if mode == "Parametric":
+        blocks.append(("latex", "x(t) = " + show(x_t)))
+        blocks.append(("latex", "y(t) = " + show(y_t)))
+    else:
+        blocks.append(("latex", show(func)))
+    blocks.append(("markdown", "**Steps / Corrections:**"))
+    for msg in results:
+        parts = message_parts(msg)
+        if parts is not None:
+            blocks.append(("markdown", "Your Input:"))
+            blocks.append(("latex", parts[0]))
+            blocks.append(("markdown", "Correct Answer:"))
+            blocks.append(("latex", parts[1]))
+        else:
+            blocks.append(("write", msg))
+    return blocks
+
+
+# ---------------- STORE ---------------- #
+class HistoryStore:
+    """Checks per owner, newest first, with their pre-rendered sidebar blocks."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checks ("
+            " id INTEGER PRIMARY KEY, owner TEXT NOT NULL, created REAL NOT NULL,"
+            " mode TEXT NOT NULL, derivative_order INTEGER NOT NULL, func TEXT, x_t TEXT, y_t TEXT,"
+            " steps TEXT NOT NULL, results TEXT NOT NULL, rendered TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS checks_owner_created ON checks(owner, created, id)")
+        self._conn.commit()
+
+    def add(self, owner, entry):
+        """
+        Store one check. `entry` has "mode", "order", "func", "x_t", "y_t",
+        "steps", "results" (the feedback messages) and optionally "format".
+        Returns the row id.
+        """
+        order = entry.get("order", 1)
+        rendered = render_entry(entry["mode"], order, entry.get("func", ""),
+                                entry.get("x_t", ""), entry.get("y_t", ""), entry["results"],
+                                entry.get("format", "text"))
+        with self._lock:
+            row_id = self._conn.execute(
+                "INSERT INTO checks (owner, created, mode, derivative_order, func, x_t, y_t, steps, results, rendered)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (owner, time.time(), entry["mode"], order, entry.get("func", ""), entry.get("x_t", ""),
+                 entry.get("y_t", ""), entry["steps"], json.dumps(entry["results"], ensure_ascii=False),
+                 json.dumps(rendered, ensure_ascii=False)),
+            ).lastrowid
+            self._conn.commit()
+        return row_id
+
+    def page(self, owner, before=None, size=PAGE_SIZE):
+        """
+        Up to `size` checks older than the cursor `before` (None: the newest),
+        as ([{"id", "created", "mode", "order", "rendered"}], cursor of the
+        next page or None when there is none).
+        """
+        query = "SELECT id, created, mode, derivative_order, rendered FROM checks WHERE owner = ?"
+        params = [owner]
+        if before is not None:
+            query += " AND (created < ? OR (created = ? AND id < ?))"
+            params += [before[0], before[0], before[1]]
+        query += " ORDER BY created DESC, id DESC LIMIT ?"
+        params.append(size + 1)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        entries = [{"id": row_id, "created": created, "mode": mode, "order": order, "rendered": json.loads(rendered)}
+                   for row_id, created, mode, order, rendered in rows[:size]]
+        cursor = (entries[-1]["created"], entries[-1]["id"]) if len(rows) > size else None
+        return entries, cursor
+
+    def count(self, owner):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM checks WHERE owner = ?", (owner,)).fetchone()[0]
+
+    def clear(self, owner):
+        """Delete every check of one owner."""
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM checks WHERE owner = ?", (owner,)).rowcount
+            self._conn.commit()
+        return deleted
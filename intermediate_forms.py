@@ -0,0 +1,90 @@
+# Acceptable intermediate lines for a problem, indexed by fingerprint.
+#
+# Working lines come in two kinds. Rewrites of the step being worked on
+# (d/dx(...) left unevaluated, 3(2x+1)²·2 before tidying to 6(2x+1)², an
+# expanded or factored form) are equal to the step, so the equivalence check
+# already accepts them; check_steps_against_expected() only has to keep them
+# from using up the step. This module covers the other kind, lines that are
+# not equal to any expected step:
+#   - side calculations: derivatives of the inner functions, factors,
+#     numerator and denominator (u', v', d/dx(inner))
+#   - for implicit equations, the differentiated equation moved to one side,
+#     either way round, or divided through by a common factor
+# The forms are fingerprinted once per problem (fingerprint.FingerprintIndex),
+# so classifying a line is a lookup rather than a round of simplify() calls.
+# Expanded, factored or combined versions of a form need no entries of their
+# own: equal expressions share a fingerprint, so they land in the same bucket.
+from sympy import expand
+
+from cache import LRUCache, MISSING, canonical_key
+from derivative_engine import implicit_diff, order_mode, x, t
+from fingerprint import FingerprintIndex, fingerprint
+
+MAX_SIDE_DERIVATIVES = 24  # per expression, preorder, outermost first
+MAX_DEPTH = 3
+
+INDEX_CACHE = LRUCache(256)
+
+
+# ---------------- FORMS ---------------- #
+def side_derivatives(expr, var):
+    """Derivatives of the pieces of expr (inner functions, factors, numerator / denominator)."""
+    pieces, seen = [], set()
+    numerator, denominator = expr.as_numer_denom()
+    stack = [(piece, 1) for piece in (denominator, numerator) if denominator != 1] + [(expr, 0)]
+    while stack and len(pieces) < MAX_SIDE_DERIVATIVES:
+        node, depth = stack.pop()
+        if depth and node not in seen and node.has(var) and not node.is_Symbol:
+            seen.add(node)
+            pieces.append(("derivative of a part", implicit_diff(node, var)))
+        if depth < MAX_DEPTH:
+            stack.extend((arg, depth + 1) for arg in reversed(node.args))
+    return pieces
+
+def intermediate_forms(mode, inputs, expected_steps):
+    """
+    [(expected step index, label, form)]: the lines a student may write
+    before reaching expected_steps[index].
+    """
+    forms = []
+    exprs = [step["expr"] for step in expected_steps]
+
+    if mode == "Parametric":
+        for i, source in enumerate(inputs):
+            forms += [(i, label, f) for label, f in side_derivatives(source, t)]
+    elif mode == "Implicit":
+        for i, side in enumerate(inputs):
+            forms += [(i, label, f) for label, f in side_derivatives(side, x)]
+        if len(exprs) >= 3:
+            # d/dx(LHS) = d/dx(RHS) rearranged, in any order, or divided through
+            # by a common factor (2x + 2y dy/dx = 0 -> x + y dy/dx = 0)
+            equation = expand(exprs[0] - exprs[1])
+            primitive = equation.as_content_primitive()[1]
+            for form in (equation, -equation, primitive, -primitive):
+                forms.append((2, "differentiated equation", form))
+    else:
+        (func,) = inputs
+        forms += [(0, label, f) for label, f in side_derivatives(func, x)]
+    return forms
+
+def build_index(mode, inputs, expected_steps):
+    """FingerprintIndex of intermediate forms; values are (expected step index, label)."""
+    index, seen = FingerprintIndex(), set()
+    steps = {fingerprint(e["expr"]) for e in expected_steps if e["expr"] is not None}
+    for i, label, form in intermediate_forms(mode, inputs, expected_steps):
+        # Equal forms share a fingerprint; one entry per step is enough, and
+        # forms equal to an expected step are handled by the step comparison
+        key = (i, fingerprint(form))
+        if key[1] is not None and key[1] not in steps and key not in seen:
+            seen.add(key)
+            index.add(form, (i, label))
+    return index
+
+def intermediate_index(mode, inputs, expected_steps, order=1):
+    """build_index(), cached per problem and derivative order."""
+    key = canonical_key(order_mode(mode, order), *inputs)
+    index = INDEX_CACHE.get(key)
+    if index is MISSING:
+        index = build_index(mode, inputs, expected_steps)
+        INDEX_CACHE.put(key, index)
+    return index
@@ -0,0 +1,322 @@
+# LaTeX input: \frac{dy}{dx}, \sin^2 x, x^{2} \cdot e^{3x} ... into the text
+# the normalizer parses, so LaTeX answers are checked exactly like typed ones.
+#
+# Most student and LMS LaTeX is a handful of macros, and rewriting those
+# (\frac{a}{b} -> ((a)/(b)), \sin -> sin, ^{n} -> ^(n), \frac{dy}{dx} and y' -> dy/dx)
+# then parsing with normalizer.parse_math() takes well under a millisecond.
+# Anything else goes to latex2sympy2, whose ANTLR parser costs tens to
+# hundreds of milliseconds a line: it is built once per process, warmed by
+# warm_latex() (warmup.py), tried in fast SLL mode before full LL, and the
+# converted text of every line is kept in LATEX_CACHE.
+import os
+import re
+import threading
+
+from sympy import Derivative, E, Symbol, log
+from sympy.printing.str import StrPrinter
+
+from cache import LRUCache, MISSING
+from normalizer import LABELS, MathSyntaxError
+from parse_cache import ParseFailure, normalize_input, parse_cached
+
+LATEX_CACHE = LRUCache(maxsize=int(os.environ.get("DERIVACHECK_LATEX_CACHE_SIZE", "2048")))
+
+# Lines that exercise the latex2sympy2 fallback's grammar decisions
+WARMUP_LATEX = [
+    r"3x^{2}\sin(2x)+\frac{1}{x}",
+    r"\frac{d}{dx}\left(x^2\right)",
+    r"2x + 2y\frac{dy}{dx} = 0",
+    r"\sqrt{x^2+1}\,e^{2x}",
+    r"\ln(x)\cos^{2}x",
+]
+
+
+# ---------------- DIRECT REWRITE ---------------- #
+_TOKEN_RE = re.compile(r"\\[A-Za-z]+|\\.|.", re.DOTALL)
+
+_MACROS = {
+    r"\cdot": "*", r"\times": "*", r"\div": "/", r"\pi": "pi",
+    r"\theta": "theta", r"\alpha": "alpha", r"\beta": "beta",
+    r"\{": "(", r"\}": ")",
+}
+_FUNCTIONS = {"sin", "cos", "tan", "sec", "csc", "cot", "sinh", "cosh", "tanh",
+              "arcsin", "arccos", "arctan", "ln", "log", "exp"}
+_SPACES = {r"\,", r"\;", r"\:", r"\!", r"\ ", r"\quad", r"\qquad", r"\displaystyle", r"\left", r"\right", "$"}
+_NUMERATOR_RE = re.compile(r"d(?:\^\(?([2-4])\)?)?([xy]?)")
+_DENOMINATOR_RE = re.compile(r"d([xt])(?:\^\(?([2-4])\)?)?")
+_PRIME_ERROR = "Primes are only read on y (y', y''); write f'(x) as d/dx(...)"
+
+
+class _Unsupported(Exception):
+    """The direct rewrite does not cover this input; latex2sympy2 takes it."""
+
+
+class _Rewriter:
+    def __init__(self, text):
+        self.tokens = _TOKEN_RE.findall(text)
+        self.pos = 0
+
+    def take(self):
+        if self.pos >= len(self.tokens):
+            raise _Unsupported("unexpected end")
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def argument(self):
+        """A macro argument: {group} or a single token."""
+        token = self.take()
+        while token.isspace():
+            token = self.take()
+        if token == "{":
+            return self.group()
+        return self.atom(token)
+
+    def group(self):
+        """Text up to the matching }."""
+        parts = []
+        while True:
+            token = self.take()
+            if token == "}":
+                return "".join(parts)
+            parts.append(self.atom(token))
+
+    def atom(self, token):
+        if token == "y" and self.pos < len(self.tokens) and self.tokens[self.pos] == "'":
+            return self.prime()
+        if token in ("'", r"\prime"):
+            raise MathSyntaxError(_PRIME_ERROR)
+        if token == "{":
+            return "(" + self.group() + ")"
+        if token == "}" or token in ("_", "&", "\\\\"):
+            raise _Unsupported(token)
+        if token == "^":
+            return "^(" + self.argument() + ")"
+        if not token.startswith("\\") or len(token) == 1:
+            return token
+        if token in _SPACES:
+            return " "
+        if token in _MACROS:
+            return _MACROS[token]
+        name = token[1:]
+        if name in _FUNCTIONS:
+            return f" {name} "
+        if name in ("frac", "dfrac", "tfrac"):
+            return self.fraction(self.argument(), self.argument())
+        if name == "sqrt":
+            return self.root()
+        if name in ("mathrm", "operatorname"):
+            return self.argument()
+        raise _Unsupported(token)
+
+    def fraction(self, numerator, denominator):
+        top, bottom = "".join(numerator.split()), "".join(denominator.split())
+        top_match, bottom_match = _NUMERATOR_RE.fullmatch(top), _DENOMINATOR_RE.fullmatch(bottom)
+        if top_match and bottom_match and top_match.group(1) == bottom_match.group(2):
+            order, name = top_match.group(1), top_match.group(2)
+            var = bottom_match.group(1)
+            if not name:
+                return f" d/d{var} "              # \frac{d}{dx}: the operator
+            if order:
+                return f" d^{order}{name}/d{var}^{order} "
+            return f" d{name}/d{var} "
+        return f"(({numerator})/({denominator}))"
+
+    def prime(self):
+        """y', y'', ... after the y: the dy/dx, d²y/dx² labels."""
+        order = 0
+        while self.pos < len(self.tokens) and self.tokens[self.pos] == "'":
+            self.pos += 1
+            order += 1
+        if order == 1:
+            return " dy/dx "
+        if order > 4:
+            raise MathSyntaxError("Derivatives above the fourth are not supported")
+        return f" d^{order}y/dx^{order} "
+
+    def root(self):
+        index = None
+        if self.pos < len(self.tokens) and self.tokens[self.pos] == "[":
+            self.pos += 1
+            parts = []
+            while True:
+                token = self.take()
+                if token == "]":
+                    break
+                parts.append(self.atom(token))
+            index = "".join(parts)
+        radicand = self.argument()
+        if index is None:
+            return f"sqrt({radicand})"
+        return f"(({radicand})^(1/({index})))"
+
+    def text(self):
+        parts = []
+        while self.pos < len(self.tokens):
+            parts.append(self.atom(self.take()))
+        return "".join(parts)
+
+
+def rewrite_latex(latex):
+    """Plain-text spelling of a LaTeX line, or None when it uses anything the rewrite doesn't cover."""
+    try:
+        return normalize_input(_Rewriter(latex).text())
+    except _Unsupported:
+        return None
+
+
+# ---------------- LATEX2SYMPY2 FALLBACK ---------------- #
+class _TextPrinter(StrPrinter):
+    """SymPy -> text the normalizer reads back as the same expression."""
+
+    def _print_Exp1(self, expr):
+        return "e"
+
+    def _print_Abs(self, expr):
+        return f"abs({self._print(expr.args[0])})"
+
+    def _print_Derivative(self, expr):
+        (var, count), = expr.variable_count
+        if count != 1:
+            raise MathSyntaxError(f"Unsupported derivative: {expr}")
+        return f"d/d{var}({self._print(expr.expr)})"
+
+_PRINTER = _TextPrinter()
+
+# latex2sympy2 spells derivatives of y, x as Derivative objects
+_x, _y, _t = Symbol("x"), Symbol("y"), Symbol("t")
+_DERIVATIVE_LABELS = {(_y, _x, 1): LABELS["dy/dx"], (_x, _t, 1): LABELS["dx/dt"], (_y, _t, 1): LABELS["dy/dt"]}
+for _n, _sup in ((2, "²"), (3, "³"), (4, "⁴")):
+    _DERIVATIVE_LABELS[(_y, _x, _n)] = LABELS[f"d{_sup}y/dx{_sup}"]
+
+
+def _tidy(expr):
+    """latex2sympy2 output -> the objects the checker uses (dy/dx labels, natural log)."""
+    def label(d):
+        if len(d.variable_count) == 1:
+            (var, count), = d.variable_count
+            return _DERIVATIVE_LABELS.get((d.expr, var, count), d)
+        return d
+    expr = expr.replace(lambda e: isinstance(e, Derivative), label)
+    return expr.replace(lambda e: isinstance(e, log) and len(e.args) == 2 and e.args[1] == E,
+                        lambda e: log(e.args[0]))
+
+
+class _LatexParser:
+    """latex2sympy2's ANTLR lexer and parser, built once and reused for every line."""
+
+    def __init__(self):
+        try:
+            import latex2sympy2
+            from antlr4 import CommonTokenStream, InputStream
+            from antlr4.atn.PredictionMode import PredictionMode
+            from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+        except ImportError as e:
+            raise MathSyntaxError("LaTeX input needs latex2sympy2: pip install latex2sympy2") from e
+        self.module = latex2sympy2
+        self.InputStream = InputStream
+        self.PredictionMode = PredictionMode
+        self.strategies = (BailErrorStrategy(), DefaultErrorStrategy())
+        self.lexer = latex2sympy2.PSLexer(InputStream(""))
+        self.lexer.removeErrorListeners()
+        self.tokens = CommonTokenStream(self.lexer)
+        self.parser = latex2sympy2.PSParser(self.tokens)
+        self.parser.removeErrorListeners()
+        # latex2sympy2 keeps conversion state in module globals
+        self.lock = threading.Lock()
+
+    def _parse(self, latex, mode, strategy, listener=None):
+        self.lexer.inputStream = self.InputStream(latex)
+        self.lexer.reset()
+        self.tokens.setTokenSource(self.lexer)
+        self.parser.setTokenStream(self.tokens)
+        self.parser._interp.predictionMode = mode
+        self.parser._errHandler = strategy
+        self.parser.removeErrorListeners()
+        if listener is not None:
+            self.parser.addErrorListener(listener)
+        return self.parser.math()
+
+    def parse(self, latex):
+        """SymPy expression for a LaTeX expression (no '=')."""
+        latex = latex.replace(r"\dfrac", r"\frac").replace(r"\tfrac", r"\frac")
+        latex = latex.replace(r"\mathrm{d}", "d").replace(r"\displaystyle", " ").replace("$", " ")
+        with self.lock:
+            self.module.frac_type = r"\frac"
+            self.module.VARIABLE_VALUES = {}
+            # convert_atom() overwrites the global `var` table with a Symbol
+            # after a differential (dx), which breaks every later call
+            self.module.var = {}
+            self.module.variances = {}
+            try:
+                # SLL prediction is much faster and right for most lines; bail out on the first error
+                math = self._parse(latex, self.PredictionMode.SLL, self.strategies[0])
+            except Exception:
+                listener = self.module.MathErrorListener(latex)
+                math = self._parse(latex, self.PredictionMode.LL, self.strategies[1], listener)
+            if math.relation_list():
+                raise MathSyntaxError("Lists are not supported")
+            return _tidy(self.module.convert_relation(math.relation()))
+
+
+_parser = None
+_parser_lock = threading.Lock()
+
+def latex_parser():
+    """The process's _LatexParser, built on first use."""
+    global _parser
+    with _parser_lock:
+        if _parser is None:
+            _parser = _LatexParser()
+    return _parser
+
+def _fallback_text(latex):
+    # latex2sympy2 drops primes silently: y' would be read as y
+    if "'" in latex or r"\prime" in latex:
+        raise MathSyntaxError(_PRIME_ERROR)
+    try:
+        expr = latex_parser().parse(latex)
+    except MathSyntaxError:
+        raise
+    except Exception as e:
+        raise MathSyntaxError(f"Could not read LaTeX: {latex}") from e
+    return _PRINTER.doprint(expr)
+
+
+# ---------------- PUBLIC API ---------------- #
+def _side_to_text(latex):
+    text = rewrite_latex(latex)
+    if text:
+        try:
+            parse_cached(text)  # also leaves the parse in PARSE_CACHE for the checker
+            return text
+        except Exception:
+            pass
+    return _fallback_text(latex)
+
+def latex_to_text(latex):
+    """
+    Plain-text form of one LaTeX line, for the normalizer; 'lhs = rhs' keeps
+    its '=' so dy/dx = ... and implicit equations read as typed input does.
+    Raises MathSyntaxError when the line cannot be read. Cached.
+    """
+    key = normalize_input(latex)
+    entry = LATEX_CACHE.get(key)
+    if entry is MISSING:
+        try:
+            if not key:
+                raise MathSyntaxError("Empty input")
+            entry = " = ".join(_side_to_text(side) for side in key.split("="))
+        except Exception as e:
+            entry = ParseFailure(e)
+        LATEX_CACHE.put(key, entry)
+    if isinstance(entry, ParseFailure):
+        raise entry.error.with_traceback(None)
+    return entry
+
+def warm_latex():
+    """Build the latex2sympy2 parser and run the warm-up lines through it."""
+    parser = latex_parser()
+    for latex in WARMUP_LATEX:
+        for side in latex.split("="):
+            parser.parse(side)
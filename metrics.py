@@ -0,0 +1,270 @@
+# Hot-path instrumentation: timing spans, latency histograms and exporters.
+#
+#   with request_span("Normal"):            # one "Check Steps" click / graded submission
+#       with span("parse") as s:
+#           s.expr = parse_expr_safe(line)  # tags the span with node count and depth
+#
+# Spans are aggregated per (stage, mode, size class) into histograms. With the
+# counters (the sandbox pool's jobs, timeouts, kills ...) they can be exported
+# as Prometheus text (render_prometheus, served at /metrics by service.py) or
+# flushed periodically to a JSON file (DERIVACHECK_METRICS_FILE).
+# Setting DERIVACHECK_PROFILE_SLOWEST=5 profiles every request with cProfile
+# and keeps the .prof dumps (in DERIVACHECK_PROFILE_DIR) of the slowest 5%.
+import contextvars
+import cProfile
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Upper bounds in seconds; the last bucket is +Inf
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+NODE_CLASSES = ((10, "1-10"), (30, "11-30"), (100, "31-100"))
+DEPTH_CLASSES = ((3, "1-3"), (6, "4-6"), (10, "7-10"))
+
+_current_mode = contextvars.ContextVar("derivacheck_mode", default="unknown")
+
+
+# ---------------- EXPRESSION SIZE ---------------- #
+def expression_size(expr):
+    """(node count, depth) of a SymPy expression tree."""
+    if expr is None:
+        return 0, 0
+    from sympy import Basic  # sympy stays out of the app's cold-start path
+    if not isinstance(expr, Basic):
+        return 0, 0
+    nodes, depth = 0, 0
+    stack = [(expr, 1)]
+    while stack:
+        node, level = stack.pop()
+        nodes += 1
+        depth = max(depth, level)
+        stack.extend((arg, level + 1) for arg in node.args)
+    return nodes, depth
+
+
+def _size_class(value, classes):
+    for bound, label in classes:
+        if value <= bound:
+            return label
+    return f"{classes[-1][0] + 1}+"
+
+
+# ---------------- REGISTRY ---------------- #
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+
+class MetricsRegistry:
+    """Span histograms keyed by (stage, mode, nodes, depth) labels, and plain counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        # Worker processes also keep raw observations until the parent drains them
+        self.track_pending = False
+        self._pending = []
+
+    def observe(self, stage, seconds, mode=None, expr=None):
+        nodes, depth = expression_size(expr)
+        labels = (
+            stage,
+            mode or _current_mode.get(),
+            _size_class(nodes, NODE_CLASSES) if expr is not None else "n/a",
+            _size_class(depth, DEPTH_CLASSES) if expr is not None else "n/a",
+        )
+        self._record(labels, seconds)
+
+    def _record(self, labels, seconds):
+        with self._lock:
+            self._histograms.setdefault(labels, Histogram()).observe(seconds)
+            if self.track_pending:
+                self._pending.append((labels, seconds))
+
+    def count(self, name, amount=1):
+        """Add to a monotonic counter (sandbox_jobs, sandbox_timeouts, ...)."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def counters(self):
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+    def drain(self):
+        """Observations recorded since the last drain (used to ship worker metrics)."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        return pending
+
+    def merge(self, observations):
+        """Fold observations drained in another process into this registry."""
+        for labels, seconds in observations:
+            self._record(tuple(labels), seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                {
+                    "stage": stage, "mode": mode, "nodes": nodes, "depth": depth,
+                    "count": h.count, "sum_seconds": round(h.sum, 6),
+                    "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], h.counts)),
+                }
+                for (stage, mode, nodes, depth), h in sorted(self._histograms.items())
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._pending.clear()
+
+
+METRICS = MetricsRegistry()
+
+
+# ---------------- SPANS ---------------- #
+class Span:
+    def __init__(self, stage, mode):
+        self.stage = stage
+        self.mode = mode
+        self.expr = None
+        self.seconds = None
+
+
+@contextmanager
+def span(stage, mode=None, expr=None):
+    """Time a block; set `.expr` on the yielded span to tag it with the expression size."""
+    s = Span(stage, mode)
+    s.expr = expr
+    start = time.perf_counter()
+    try:
+        yield s
+    finally:
+        s.seconds = time.perf_counter() - start
+        METRICS.observe(stage, s.seconds, mode=s.mode, expr=s.expr)
+
+
+# ---------------- PROFILING ---------------- #
+class SlowRequestProfiler:
+    """Profiles every request and keeps the dumps of the slowest `percent` percent."""
+
+    def __init__(self, percent, directory, window=500):
+        self.percent = percent
+        self.directory = directory
+        self._durations = deque(maxlen=window)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def is_slow(self, seconds):
+        with self._lock:
+            self._durations.append(seconds)
+            ranked = sorted(self._durations)
+        cutoff = ranked[min(len(ranked) - 1, int(len(ranked) * (1 - self.percent / 100)))]
+        return seconds >= cutoff
+
+    @contextmanager
+    def profile(self, label):
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            seconds = time.perf_counter() - start
+            if self.is_slow(seconds):
+                name = f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-{seconds * 1000:.0f}ms.prof"
+                profiler.dump_stats(os.path.join(self.directory, name))
+
+
+def _profiler_from_env():
+    percent = float(os.environ.get("DERIVACHECK_PROFILE_SLOWEST", "0") or 0)
+    if percent <= 0:
+        return None
+    return SlowRequestProfiler(percent, os.environ.get("DERIVACHECK_PROFILE_DIR", "profiles"))
+
+
+PROFILER = _profiler_from_env()
+
+
+@contextmanager
+def request_span(mode, stage="check"):
+    """Span for a whole check; sets the mode for nested spans and applies the profiler."""
+    token = _current_mode.set(mode)
+    try:
+        with span(stage, mode=mode):
+            if PROFILER is None:
+                yield
+            else:
+                with PROFILER.profile(mode):
+                    yield
+    finally:
+        _current_mode.reset(token)
+
+
+# ---------------- EXPORT ---------------- #
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def render_prometheus(registry=METRICS):
+    """Prometheus text exposition format for every span histogram and counter."""
+    name = "derivacheck_span_duration_seconds"
+    lines = [f"# HELP {name} Time spent in each checking stage.", f"# TYPE {name} histogram"]
+    for h in registry.snapshot():
+        labels = ",".join(f'{k}="{_escape(h[k])}"' for k in ("stage", "mode", "nodes", "depth"))
+        cumulative = 0
+        for bound, count in h["buckets"].items():
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {h['sum_seconds']}")
+        lines.append(f"{name}_count{{{labels}}} {h['count']}")
+    for counter, value in registry.counters().items():
+        lines += [f"# TYPE derivacheck_{counter}_total counter", f"derivacheck_{counter}_total {value}"]
+    return "\n".join(lines) + "\n"
+
+
+def write_json(path, registry=METRICS):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"generated_at": time.time(), "spans": registry.snapshot(),
+                   "counters": registry.counters()}, f, indent=1)
+    os.replace(tmp, path)
+
+
+_flusher = None
+
+def start_json_flusher(path=None, interval=None):
+    """Flush metrics to a JSON file every `interval` seconds from a daemon thread (once per process)."""
+    global _flusher
+    path = path or os.environ.get("DERIVACHECK_METRICS_FILE")
+    if not path or _flusher is not None:
+        return _flusher
+    interval = interval or float(os.environ.get("DERIVACHECK_METRICS_INTERVAL", "30"))
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                write_json(path)
+            except OSError:
+                pass
+
+    _flusher = threading.Thread(target=loop, name="metrics-flusher", daemon=True)
+    _flusher.start()
+    return _flusher
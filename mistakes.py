@@ -0,0 +1,243 @@
+# Diagnose a wrong derivative by finding which typical mistake produces it.
+#
+# From the function being differentiated, a differentiator with one fault
+# injected at one node builds the usual wrong answers: the chain factor
+# dropped, the sign of cos / cot / csc flipped, (u/v)' taken as u'/v',
+# (uv)' as u'v', the exponent not decremented, dy/dx left off a y term. All
+# candidates for a function are compiled into one NumPy function and
+# evaluated at fixed points in a single vectorized pass, so matching a
+# student line costs one array comparison instead of a simplify() per
+# candidate. A match is reported with its STEP_EXPLANATIONS tag.
+import numpy as np
+from sympy import Add, Dummy, Function, Mul, Pow, S, Symbol, lambdify, log
+
+from cache import LRUCache, MISSING
+from derivative_engine import dy_dx_symbol, x, y
+from step_explanations import STEP_EXPLANATIONS
+
+POINTS = 8             # evaluation points per symbol
+DOMAIN = (0.3, 2.7)    # positive half of the equivalence probe's domain
+TOLERANCE = 1e-8       # relative difference that still counts as equal
+
+# Functions whose derivative starts with a minus sign
+NEGATIVE_DERIVATIVES = ("cos", "cot", "csc")
+
+MISTAKE_CACHE = LRUCache(256)
+
+
+# ---------------- FAULTY DIFFERENTIATION ---------------- #
+class _Differentiator:
+    """
+    d/dvar with at most one kind of mistake, made at node `fault[0]` of
+    kind `fault[1]`, or at every node it applies to when `fault[0]` is None.
+    """
+
+    def __init__(self, var, implicit, fault=None):
+        self.var = var
+        self.implicit = implicit
+        self.fault = fault
+
+    def depends(self, expr):
+        return expr.has(self.var) or (self.implicit and expr.has(y))
+
+    def at_fault(self, expr, kind):
+        return self.fault is not None and self.fault[1] == kind and self.fault[0] in (None, expr)
+
+    def d(self, expr):
+        if not self.depends(expr):
+            return S.Zero
+        if expr == self.var:
+            return S.One
+        if self.implicit and expr == y:
+            return S.One if self.at_fault(expr, "implicit_missing_chain") else dy_dx_symbol
+        if isinstance(expr, Add):
+            return Add(*[self.d(arg) for arg in expr.args])
+        if isinstance(expr, Mul):
+            return self.product(expr)
+        if isinstance(expr, Pow):
+            return self.power(expr)
+        if isinstance(expr, Function) and len(expr.args) == 1:
+            return self.function(expr)
+        return self.fallback(expr)
+
+    def fallback(self, expr):
+        """Anything without a modelled mistake is differentiated correctly."""
+        result = expr.diff(self.var)
+        if self.implicit:
+            result += expr.diff(y) * dy_dx_symbol
+        return result
+
+    def product(self, expr):
+        numerator, denominator = expr.as_numer_denom()
+        if self.at_fault(expr, "forgot_quotient"):
+            return self.d(numerator) / self.d(denominator)
+        factors = expr.args
+        if self.at_fault(expr, "forgot_product"):
+            return Mul(*[self.d(f) if self.depends(f) else f for f in factors])
+        return Add(*[Mul(*factors[:i], self.d(f), *factors[i + 1:])
+                     for i, f in enumerate(factors) if self.depends(f)])
+
+    def power(self, expr):
+        base, exponent = expr.args
+        if self.depends(exponent):
+            if self.depends(base):
+                # x**x and friends: no typical mistake modelled here
+                return self.fallback(expr)
+            # a**g(x) = a**g ln(a) g'
+            inner = S.One if self.at_fault(expr, "forgot_chain") else self.d(exponent)
+            return expr * log(base) * inner
+        if self.at_fault(expr, "power_rule"):
+            outer = exponent * base**exponent
+        else:
+            outer = exponent * base**(exponent - 1)
+        inner = S.One if self.at_fault(expr, "forgot_chain") else self.d(base)
+        return outer * inner
+
+    def function(self, expr):
+        (arg,) = expr.args
+        u = Dummy("u")
+        outer = expr.func(u).diff(u).subs(u, arg)
+        if self.at_fault(expr, "missing_negative"):
+            outer = -outer
+        inner = S.One if self.at_fault(expr, "forgot_chain") else self.d(arg)
+        return outer * inner
+
+
+def _faults(expr, var, implicit):
+    """(node, mistake tag) for every place in expr where a typical mistake can happen."""
+    d = _Differentiator(var, implicit)
+    faults = []
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if not d.depends(node):
+            continue
+        if implicit and node == y:
+            faults.append((node, "implicit_missing_chain"))
+        elif isinstance(node, Mul):
+            numerator, denominator = node.as_numer_denom()
+            if d.depends(numerator) and d.depends(denominator):
+                faults.append((node, "forgot_quotient"))
+            elif sum(d.depends(f) for f in node.args) > 1:
+                faults.append((node, "forgot_product"))
+        elif isinstance(node, Pow):
+            base_depends, exp_depends = d.depends(node.base), d.depends(node.exp)
+            if not exp_depends and node.exp != -1:
+                faults.append((node, "power_rule"))
+            inner = node.exp if exp_depends else node.base
+            if not (base_depends and exp_depends) and not inner.is_Symbol:
+                faults.append((node, "forgot_chain"))
+        elif isinstance(node, Function) and len(node.args) == 1:
+            if node.func.__name__ in NEGATIVE_DERIVATIVES:
+                faults.append((node, "missing_negative"))
+            if not node.args[0].is_Symbol:
+                faults.append((node, "forgot_chain"))
+        stack.extend(reversed(node.args))
+    return faults
+
+
+# ---------------- VECTORIZED MATCHING ---------------- #
+# SymPy function name -> NumPy ufunc, for evaluating student lines directly
+_UFUNCS = {
+    "sin": np.sin, "cos": np.cos, "tan": np.tan, "exp": np.exp, "log": np.log,
+    "asin": np.arcsin, "acos": np.arccos, "atan": np.arctan,
+    "sinh": np.sinh, "cosh": np.cosh, "tanh": np.tanh, "Abs": np.abs,
+    "sec": lambda v: 1 / np.cos(v), "csc": lambda v: 1 / np.sin(v), "cot": lambda v: 1 / np.tan(v),
+}
+
+def _evaluate(expr, points):
+    """
+    Complex values of expr at every point. Walking the tree with NumPy is
+    much cheaper than compiling a one-off lambdify() per student line.
+    """
+    if expr.is_Symbol:
+        return points[expr.name].astype(complex)
+    if expr.is_Number or expr.is_NumberSymbol or expr is S.ImaginaryUnit:
+        return np.full(POINTS, complex(expr))
+    if expr.is_Add:
+        return sum(_evaluate(arg, points) for arg in expr.args)
+    if expr.is_Mul:
+        return np.prod([_evaluate(arg, points) for arg in expr.args], axis=0)
+    if expr.is_Pow:
+        return np.power(_evaluate(expr.base, points), _evaluate(expr.exp, points))
+    ufunc = _UFUNCS.get(type(expr).__name__)
+    if ufunc is not None and len(expr.args) == 1:
+        return ufunc(_evaluate(expr.args[0], points))
+    names = sorted(points)
+    compiled = lambdify([Symbol(name) for name in names], expr, modules="numpy", dummify=True)
+    return np.broadcast_to(np.asarray(compiled(*[points[n] for n in names]), dtype=complex), (POINTS,))
+
+def _points(names):
+    """{name: array of POINTS values}; fixed, so results are reproducible."""
+    rng = np.random.default_rng(15)
+    low, high = DOMAIN
+    return {name: rng.uniform(low, high, POINTS) for name in sorted(names)}
+
+class MistakeSet:
+    """The wrong derivatives of one function, compiled for matching student lines."""
+
+    def __init__(self, func, var=x, implicit=False):
+        self.candidates = []  # (tag, subexpr, wrong derivative)
+        correct = _Differentiator(var, implicit).d(func)
+        faults = _faults(func, var, implicit)
+        # The same mistake made everywhere it applies (4x⁴ - 10x² for x⁴ - 5x²)
+        tags = [tag for _, tag in faults]
+        faults += [(None, tag) for tag in dict.fromkeys(tags) if tags.count(tag) > 1]
+        for node, tag in faults:
+            wrong = _Differentiator(var, implicit, (node, tag)).d(func)
+            if wrong != correct:
+                self.candidates.append((tag, node, wrong))
+
+        exprs = [correct] + [wrong for _, _, wrong in self.candidates]
+        self.symbols = sorted(set().union(*(e.free_symbols for e in exprs)) | {var}, key=lambda s: s.name)
+        self.points = _points(s.name for s in self.symbols)
+        args = [self.points[s.name] for s in self.symbols]
+        # One call evaluates every candidate at every point: a (1 + candidates) x POINTS array
+        compiled = lambdify(self.symbols, exprs, modules="numpy", dummify=True)
+        with np.errstate(all="ignore"):
+            self.values = np.array([np.broadcast_to(np.asarray(v, dtype=complex), (POINTS,))
+                                    for v in compiled(*args)])
+
+    def _evaluate(self, expr):
+        if not expr.free_symbols <= set(self.symbols):
+            return None
+        with np.errstate(all="ignore"):
+            return np.broadcast_to(_evaluate(expr, self.points), (POINTS,))
+
+    def match(self, student_expr):
+        """{"tag", "title", "textbook", "subexpr"} for the mistake that produces student_expr, or None."""
+        student = self._evaluate(student_expr)
+        if student is None or not self.candidates or not np.all(np.isfinite(student)):
+            return None
+        with np.errstate(all="ignore"):
+            error = np.abs(self.values - student) / (1 + np.abs(student))
+        # Worst point per candidate; NaN (outside a candidate's domain) never matches
+        worst = np.where(np.isfinite(error), error, np.inf).max(axis=1)
+        if worst[0] < TOLERANCE:
+            return None  # it is the correct derivative
+        best = int(np.argmin(worst[1:]))
+        if worst[1 + best] >= TOLERANCE:
+            return None
+        tag, node, _ = self.candidates[best]
+        explanation = STEP_EXPLANATIONS[tag]
+        return {"tag": tag, "title": explanation["title"], "textbook": explanation["textbook"], "subexpr": node}
+
+    def __len__(self):
+        return len(self.candidates)
+
+
+def mistake_set(func, var=x, implicit=False):
+    """MistakeSet for a function, cached."""
+    key = (func, var, implicit)
+    mistakes = MISTAKE_CACHE.get(key)
+    if mistakes is MISSING:
+        mistakes = MistakeSet(func, var, implicit)
+        MISTAKE_CACHE.put(key, mistakes)
+    return mistakes
+
+def diagnose(student_expr, func, var=x, implicit=False):
+    """Which typical mistake turns d/dvar(func) into student_expr; None if none does."""
+    try:
+        return mistake_set(func, var, implicit).match(student_expr)
+    except Exception:
+        return None
@@ -0,0 +1,292 @@
+# Single-pass normalizer for student math input.
+#
+# One compiled regex turns the raw text (superscript runs, − × ÷ ·, π, √, ln,
+# dy/dx, d²y/dx², dx/dt, d/dx, ...) into a token stream, and a small
+# recursive-descent parser builds the SymPy expression straight from the
+# tokens, handling implicit multiplication (2x, 3(x+1), x sin x) and function
+# application without brackets (sin 2x, ln x). Nothing goes through eval().
+import re
+
+import sympy as sp
+
+# Symbols for derivative notation typed by students
+DY_DX = sp.Symbol("dy/dx")
+DX_DT = sp.Symbol("dx/dt")
+DY_DT = sp.Symbol("dy/dt")
+LABELS = {"dy/dx": DY_DX, "dx/dt": DX_DT, "dy/dt": DY_DT}
+# Higher-order labels: d²y/dx², d³y/dx³, d⁴y/dx⁴
+for _n in "²³⁴":
+    LABELS[f"d{_n}y/dx{_n}"] = sp.Symbol(f"d{_n}y/dx{_n}")
+
+FUNCTIONS = {
+    "sqrt": sp.sqrt, "abs": sp.Abs, "exp": sp.exp, "ln": sp.log, "log": sp.log,
+    "sin": sp.sin, "cos": sp.cos, "tan": sp.tan,
+    "sec": sp.sec, "csc": sp.csc, "cosec": sp.csc, "cot": sp.cot,
+    "arcsin": sp.asin, "arccos": sp.acos, "arctan": sp.atan,
+    "asin": sp.asin, "acos": sp.acos, "atan": sp.atan,
+    "sinh": sp.sinh, "cosh": sp.cosh, "tanh": sp.tanh,
+}
+INVERSES = {sp.sin: sp.asin, sp.cos: sp.acos, sp.tan: sp.atan,
+            sp.sec: sp.asec, sp.csc: sp.acsc, sp.cot: sp.acot}
+CONSTANTS = {"pi": sp.pi, "e": sp.E}
+GREEK = ("alpha", "beta", "theta")
+
+SUPERSCRIPTS = str.maketrans("⁰¹²³⁴⁵⁶⁷⁸⁹⁺⁻", "0123456789+-")
+_TO_SUPERSCRIPT = str.maketrans("0123456789", "⁰¹²³⁴⁵⁶⁷⁸⁹")
+OPERATORS = {"−": "-", "–": "-", "×": "*", "·": "*", "⋅": "*", "÷": "/",
+             "^": "**", "[": "(", "]": ")", "{": "(", "}": ")"}
+
+# Longest words first so "cosec" wins over "cos" and "sinh" over "sin"
+_WORDS = sorted(list(FUNCTIONS) + ["pi"] + list(GREEK), key=len, reverse=True)
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<nlabel>d\s*(?:\^\s*)?[2-4²³⁴]\s*y\s*/\s*d\s*x\s*(?:\^\s*)?[2-4²³⁴])
+  | (?P<label>d\s*y\s*/\s*d\s*x|d\s*x\s*/\s*d\s*t|d\s*y\s*/\s*d\s*t|dy_dx)
+  | (?P<dop>d\s*/\s*d\s*[xt])
+  | (?P<sup>[⁺⁻]?[⁰¹²³⁴⁵⁶⁷⁸⁹]+)
+  | (?P<num>\d+(?:\.\d*)?|\.\d+)
+  | (?P<word>""" + "|".join(_WORDS) + r""")
+  | (?P<name>[A-Za-z])
+  | (?P<op>\*\*|[-+*/^=(),\[\]{}−–×·⋅÷])
+  | (?P<root>√)
+  | (?P<pi>π)
+""", re.VERBOSE)
+
+
+class MathSyntaxError(ValueError):
+    """Raised for input the normalizer cannot tokenize or parse."""
+
+
+# ---------------- LEXER ---------------- #
+def tokenize(text):
+    """
+    Yield (kind, value) tokens in canonical spelling:
+    num, name, func, const, label, dop ("d/dx" or "d/dt"), op.
+    Superscript runs become ("op", "**") followed by the exponent.
+    """
+    pos, end = 0, len(text)
+    while pos < end:
+        m = _TOKEN_RE.match(text, pos)
+        if m is None:
+            raise MathSyntaxError(f"Unexpected character {text[pos]!r} at position {pos + 1}")
+        pos = m.end()
+        kind, value = m.lastgroup, m.group()
+
+        if kind == "ws":
+            continue
+        if kind == "label":
+            yield "label", "dy/dx" if value == "dy_dx" else re.sub(r"\s+", "", value)
+        elif kind == "nlabel":
+            # d2y/dx2, d^2y/dx^2 and d²y/dx² all spell the second derivative
+            n = re.search(r"[2-4²³⁴]", value).group().translate(_TO_SUPERSCRIPT)
+            yield "label", f"d{n}y/dx{n}"
+        elif kind == "dop":
+            yield "dop", "d/d" + value[-1]
+        elif kind == "sup":
+            exponent = value.translate(SUPERSCRIPTS).lstrip("+")
+            yield "op", "**"
+            if exponent.startswith("-"):
+                yield from (("op", "("), ("op", "-"), ("num", exponent[1:]), ("op", ")"))
+            else:
+                yield "num", exponent
+        elif kind == "word":
+            if value in FUNCTIONS:
+                yield "func", value
+            elif value == "pi":
+                yield "const", "pi"
+            else:
+                yield "name", value
+        elif kind == "name":
+            yield ("const", "e") if value == "e" else ("name", value)
+        elif kind == "root":
+            yield "func", "sqrt"
+        elif kind == "pi":
+            yield "const", "pi"
+        elif kind == "op":
+            yield "op", OPERATORS.get(value, value)
+        else:
+            yield kind, value
+
+
+def normalize(text):
+    """Canonical, explicitly spelled form of an input line (e.g. '2x¹²' -> '2 x ** 12')."""
+    if not text:
+        return ""
+    return " ".join(value for _, value in tokenize(text))
+
+
+def translate_superscripts(text):
+    """Replace superscript runs with ** exponents ('x¹²' -> 'x**12')."""
+    return re.sub(r"[⁺⁻]?[⁰¹²³⁴⁵⁶⁷⁸⁹]+",
+                  lambda m: "**" + m.group().translate(SUPERSCRIPTS).lstrip("+"), text)
+
+
+# ---------------- PARSER ---------------- #
+_ATOM_START = {"num", "name", "func", "const", "label", "dop"}
+
+
+class _Parser:
+    def __init__(self, tokens, symbols, evaluate=True):
+        self.tokens = list(tokens)
+        self.pos = 0
+        self.symbols = symbols
+        self.evaluate = evaluate
+
+    def peek(self, offset=0):
+        i = self.pos + offset
+        return self.tokens[i] if i < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def expect(self, value):
+        kind, got = self.take()
+        if got != value:
+            raise MathSyntaxError(f"Expected {value!r} but found {got or 'end of input'!r}")
+
+    def at_op(self, *values):
+        kind, value = self.peek()
+        return kind == "op" and value in values
+
+    def starts_atom(self):
+        kind, value = self.peek()
+        return kind in _ATOM_START or (kind == "op" and value == "(")
+
+    # line := expr ['=' expr]
+    def line(self):
+        lhs = self.expr()
+        if self.at_op("="):
+            self.take()
+            rhs = self.expr()
+            # "d/dx(LHS) = d/dx(RHS)": differentiating both sides, d/dx(LHS - RHS)
+            if (isinstance(lhs, sp.Derivative) and isinstance(rhs, sp.Derivative)
+                    and lhs.variable_count == rhs.variable_count):
+                result = sp.Derivative(self.add(lhs.expr, self.neg(rhs.expr)), *lhs.variable_count)
+            # "dy/dx = ...", "y = ...", "d/dx(f) = ...": the claim is the right-hand side
+            elif lhs in LABELS.values() or lhs == self.symbol("y") or isinstance(lhs, sp.Derivative):
+                result = rhs
+            else:
+                result = self.add(lhs, self.neg(rhs))
+        else:
+            result = lhs
+        if self.pos < len(self.tokens):
+            raise MathSyntaxError(f"Unexpected {self.peek()[1]!r}")
+        return result
+
+    # expr := term (('+'|'-') term)*
+    def expr(self):
+        result = self.term()
+        while self.at_op("+", "-"):
+            op = self.take()[1]
+            rhs = self.term()
+            result = self.add(result, rhs if op == "+" else self.neg(rhs))
+        return result
+
+    # term := unary (('*'|'/') unary | implicit power)*
+    def term(self):
+        result = self.unary()
+        while True:
+            if self.at_op("*", "/"):
+                op = self.take()[1]
+                rhs = self.unary()
+                result = self.mul(result, rhs if op == "*" else self.pow(rhs, sp.S.NegativeOne))
+            elif self.starts_atom():
+                result = self.mul(result, self.power())
+            else:
+                return result
+
+    # unary := ('-'|'+') unary | power
+    def unary(self):
+        if self.at_op("-"):
+            self.take()
+            return self.neg(self.unary())
+        if self.at_op("+"):
+            self.take()
+            return self.unary()
+        return self.power()
+
+    # power := atom ['**' unary]   (right associative)
+    def power(self):
+        base = self.atom()
+        if self.at_op("**"):
+            self.take()
+            return self.pow(base, self.unary())
+        return base
+
+    def atom(self):
+        kind, value = self.take()
+        if kind == "num":
+            return sp.Integer(value) if value.isdigit() else sp.Float(value)
+        if kind == "name":
+            return self.symbol(value)
+        if kind == "const":
+            return CONSTANTS[value]
+        if kind == "label":
+            return LABELS[value]
+        if kind == "func":
+            return self.application(FUNCTIONS[value])
+        if kind == "dop":
+            return sp.Derivative(self.argument(), self.symbol(value[-1]))
+        if kind == "op" and value == "(":
+            inner = self.expr()
+            self.expect(")")
+            return inner
+        raise MathSyntaxError(f"Unexpected {value or 'end of input'!r}")
+
+    def application(self, func):
+        # sin²x, sin^2 x, sin⁻¹x: the exponent belongs to the function, not its argument
+        exponent = None
+        if self.at_op("**"):
+            self.take()
+            exponent = self.unary()
+        if exponent == -1 and func in INVERSES:
+            return INVERSES[func](self.argument(), evaluate=self.evaluate)
+        result = func(self.argument(), evaluate=self.evaluate)
+        return result if exponent is None else self.pow(result, exponent)
+
+    def argument(self):
+        # f(expr), or without brackets the following run of numbers and symbols: sin 2x, ln x²
+        if self.at_op("("):
+            return self.atom()
+        result = self.power()
+        while self.peek()[0] in ("num", "name", "const"):
+            result = self.mul(result, self.power())
+        return result
+
+    # Nodes are built with evaluate= rather than under sp.evaluate(False),
+    # which clears SymPy's whole cache each time it is switched
+    def add(self, a, b):
+        return sp.Add(a, b, evaluate=self.evaluate)
+
+    def mul(self, a, b):
+        return sp.Mul(a, b, evaluate=self.evaluate)
+
+    def neg(self, a):
+        if self.evaluate or a.is_Number:
+            return -a
+        return sp.Mul(sp.S.NegativeOne, a, evaluate=False)
+
+    def pow(self, base, exp):
+        return sp.Pow(base, exp, evaluate=self.evaluate)
+
+    def symbol(self, name):
+        if name not in self.symbols:
+            self.symbols[name] = sp.Symbol(name)
+        return self.symbols[name]
+
+
+def parse_math(text, symbols=None, evaluate=True):
+    """
+    Parse one line of student input into a SymPy expression.
+    'lhs = rhs' becomes lhs - rhs, except when lhs is y, dy/dx, dx/dt, dy/dt,
+    d²y/dx² (and higher) or d/dx(...), where the right-hand side is returned;
+    d/dx(a) = d/dx(b) becomes d/dx(a - b).
+    `symbols` optionally maps names to the SymPy objects to use for them;
+    evaluate=False keeps the line as typed (2*3x stays 2*3*x).
+    """
+    if not text or not text.strip():
+        raise MathSyntaxError("Empty input")
+    return _Parser(tokenize(text), dict(symbols or {}), evaluate).line()
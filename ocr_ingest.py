@@ -0,0 +1,251 @@
+# Grade photographed handwritten working.
+#
+#   python ocr_ingest.py uploads.jsonl -o verdicts.jsonl --workers 4
+#   python ocr_ingest.py page1.jpg page2.jpg --mode Normal --func "sin(x²)"
+#
+# A manifest has the batch_grade.py fields with "images" (a path, a list of
+# paths, or in CSV paths separated by ";", relative to the manifest) in place
+# of "steps"; the pages of one submission are read in order. Each page is normalized with OpenCV
+# (deskew, binarize, crop into lines, downscale), every line is OCR'd
+# locally with Tesseract as a single text line, and the text goes through
+# the same normalizer as typed input before grading.
+#
+# Preprocessed pages are cached on disk by content hash (DERIVACHECK_OCR_CACHE,
+# default .ocr_cache), so re-submitted photos skip OpenCV. Submissions run in
+# a process pool through batch_grade.grade_stream(); OpenCV and pytesseract
+# are only imported by the workers that need them.
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from functools import partial
+
+import numpy as np
+
+from batch_grade import grade_record, grade_stream, read_submissions
+from grading import grade_submission
+
+CACHE_DIR = os.environ.get("DERIVACHECK_OCR_CACHE", ".ocr_cache")
+PREPROCESS_VERSION = 1     # bump when preprocessing changes; old cache entries are ignored
+MAX_SKEW = 15.0            # degrees; larger angles are more likely page layout than skew
+LINE_HEIGHT = 64           # px; taller line crops are downscaled to this
+MIN_LINE_HEIGHT = 8        # px; shorter ink bands are specks, not lines
+LINE_GAP = 4               # px of blank rows that still belong to the same line
+PADDING = 6                # px kept around each cropped line
+INK_FRACTION = 0.005       # share of a row's pixels that must be ink
+
+# One text line per image; the characters that can appear in working
+TESSERACT_CONFIG = ("--psm 7 -c tessedit_char_whitelist="
+                    "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ+-*/^=().,²³√π")
+
+# Characters Tesseract confuses in handwriting -> what the normalizer expects
+OCR_FIXES = str.maketrans({"—": "-", "–": "-", "−": "-", "×": "*", "÷": "/", "'": "", "\"": "", "`": ""})
+_DIGIT_LETTER_RE = re.compile(r"(?<=\d)[oO](?=\d)|(?<=\d)[lI|](?=\d)")
+
+
+def _cv2():
+    try:
+        import cv2
+    except ImportError as e:
+        raise RuntimeError("OCR ingestion needs OpenCV: pip install opencv-python") from e
+    return cv2
+
+def _tesseract():
+    try:
+        import pytesseract
+    except ImportError as e:
+        raise RuntimeError("OCR ingestion needs pytesseract and the tesseract binary") from e
+    return pytesseract
+
+
+# ---------------- PREPROCESSING ---------------- #
+def deskew(gray):
+    """Rotate a grayscale page so its lines of writing are horizontal."""
+    cv2 = _cv2()
+    ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)[1]
+    points = cv2.findNonZero(ink)
+    if points is None or len(points) < 50:
+        return gray
+    angle = cv2.minAreaRect(points)[-1]
+    if angle > 45:
+        angle -= 90
+    if abs(angle) < 0.3 or abs(angle) > MAX_SKEW:
+        return gray
+    h, w = gray.shape
+    rotation = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(gray, rotation, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+
+def binarize(gray):
+    """Black ink on white; adaptive, so uneven lighting across a photo is evened out."""
+    cv2 = _cv2()
+    blurred = cv2.GaussianBlur(gray, (3, 3), 0)
+    return cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15)
+
+def split_lines(binary):
+    """Crops of each line of writing, top to bottom, from the horizontal ink profile."""
+    ink_rows = (binary < 128).sum(axis=1) > INK_FRACTION * binary.shape[1]
+    lines, start, blank = [], None, 0
+    for row, has_ink in enumerate(ink_rows):
+        if has_ink:
+            start = row if start is None else start
+            blank = 0
+        elif start is not None:
+            blank += 1
+            if blank > LINE_GAP:
+                lines.append((start, row - blank + 1))
+                start, blank = None, 0
+    if start is not None:
+        lines.append((start, len(ink_rows) - blank))
+
+    crops = []
+    for top, bottom in lines:
+        if bottom - top < MIN_LINE_HEIGHT:
+            continue
+        band = binary[max(top - PADDING, 0):bottom + PADDING]
+        ink_cols = np.flatnonzero((band < 128).any(axis=0))
+        left, right = max(ink_cols[0] - PADDING, 0), ink_cols[-1] + PADDING + 1
+        crops.append(band[:, left:right])
+    return crops
+
+def downscale(line):
+    """Shrink tall line crops to LINE_HEIGHT; phone photos are far larger than OCR needs."""
+    h, w = line.shape
+    if h <= LINE_HEIGHT:
+        return line
+    cv2 = _cv2()
+    width = max(1, round(w * LINE_HEIGHT / h))
+    return cv2.resize(line, (width, LINE_HEIGHT), interpolation=cv2.INTER_AREA)
+
+def preprocess_image(data):
+    """Encoded image bytes -> list of binarized, downscaled line crops."""
+    cv2 = _cv2()
+    gray = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise ValueError("not a readable image")
+    return [downscale(line) for line in split_lines(binarize(deskew(gray)))]
+
+
+# ---------------- CACHE ---------------- #
+def _cache_path(digest):
+    return os.path.join(CACHE_DIR, digest[:2], f"{digest}.npz")
+
+def preprocess_cached(path):
+    """preprocess_image() for a file, cached on disk by content hash."""
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data + f"|v{PREPROCESS_VERSION}".encode("ascii")).hexdigest()
+    cached = _cache_path(digest)
+    try:
+        with np.load(cached) as stored:
+            return [stored[f"line{i}"] for i in range(len(stored.files))]
+    except (OSError, ValueError, KeyError):
+        pass
+    lines = preprocess_image(data)
+    try:
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        tmp = f"{cached}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(tmp, **{f"line{i}": line for i, line in enumerate(lines)})
+        os.replace(tmp, cached)
+    except OSError:
+        pass  # an unwritable cache only costs speed
+    return lines
+
+
+# ---------------- OCR ---------------- #
+def clean_ocr_text(text):
+    """OCR output for one line -> text the normalizer accepts; "" for noise."""
+    text = " ".join(text.translate(OCR_FIXES).split())
+    text = _DIGIT_LETTER_RE.sub(lambda m: "0" if m.group() in "oO" else "1", text)
+    return text if any(c.isalnum() for c in text) else ""
+
+def read_page(path):
+    """Text of each line of working on one page, in order."""
+    pytesseract = _tesseract()
+    texts = []
+    for line in preprocess_cached(path):
+        text = clean_ocr_text(pytesseract.image_to_string(line, config=TESSERACT_CONFIG))
+        if text:
+            texts.append(text)
+    return texts
+
+def image_paths(record, base_dir=""):
+    """The record's image paths in page order; relative ones are relative to base_dir (the manifest's folder)."""
+    images = record.get("images") or []
+    if isinstance(images, str):
+        images = [p.strip() for p in re.split(r"[;\n]", images) if p.strip()]
+    if not isinstance(images, list) or not all(isinstance(p, str) for p in images):
+        raise ValueError("images must be a path or a list of paths")
+    return [os.path.join(base_dir, p) for p in images]
+
+def ocr_submission(record, base_dir=""):
+    """grade_submission() for a record whose steps are in "images"; the verdict carries the OCR'd lines."""
+    error = {"id": record.get("id"), "mode": record.get("mode") or "Normal", "status": "error"}
+    try:
+        paths = image_paths(record, base_dir)
+    except ValueError as e:
+        return dict(error, error=str(e), pages=0)
+    lines = []
+    for page, path in enumerate(paths, start=1):
+        try:
+            lines += read_page(path)
+        except Exception as e:  # OSError, cv2.error from a corrupt image, a missing OCR engine...
+            return dict(error, error=f"OCR failed on page {page} ({path}): {e}", pages=len(paths))
+    result = grade_submission(dict(record, steps=lines))
+    result["ocr_lines"] = lines
+    result["pages"] = len(paths)
+    return result
+
+def ocr_chunk(chunk, base_dir=""):
+    return [grade_record(record, lambda r: ocr_submission(r, base_dir)) for record in chunk]
+
+
+# ---------------- CLI ---------------- #
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade photographed working with local OCR.")
+    parser.add_argument("inputs", nargs="+", help="a JSONL/CSV manifest, or the image files of one submission")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file for verdicts (default: stdout)")
+    parser.add_argument("--mode", default="Normal", help="for image files: Normal, Implicit or Parametric")
+    parser.add_argument("--order", type=int, default=1, help="for image files: derivative order")
+    parser.add_argument("--func", default="", help="for image files: function or equation")
+    parser.add_argument("--x-t", default="", help="for image files: x(t)")
+    parser.add_argument("--y-t", default="", help="for image files: y(t)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=4, help="submissions per task sent to a worker")
+    args = parser.parse_args(argv)
+
+    infile = None
+    base_dir = ""
+    manifest = args.inputs[0]
+    if len(args.inputs) == 1 and manifest.lower().endswith((".jsonl", ".csv")):
+        infile = open(manifest, newline="", encoding="utf-8")
+        base_dir = os.path.dirname(os.path.abspath(manifest))
+        records = read_submissions(infile, "csv" if manifest.lower().endswith(".csv") else "jsonl")
+    else:
+        records = [{"mode": args.mode, "order": args.order, "func": args.func,
+                    "x_t": args.x_t, "y_t": args.y_t, "images": args.inputs}]
+    outfile = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+
+    start = time.perf_counter()
+    graded = pages = errors = 0
+    try:
+        for verdict in grade_stream(records, args.workers, args.chunksize, grade=partial(ocr_chunk, base_dir=base_dir)):
+            outfile.write(json.dumps(verdict, ensure_ascii=False) + "\n")
+            graded += 1
+            pages += verdict.get("pages", 0)
+            errors += verdict["status"] != "ok"
+    finally:
+        if infile is not None:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+
+    elapsed = time.perf_counter() - start
+    rate = pages / elapsed if elapsed > 0 else 0.0
+    print(f"Read {pages} pages for {graded} submissions ({errors} errors) in {elapsed:.2f}s "
+          f"- {rate:.2f} pages/second", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
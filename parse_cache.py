@@ -0,0 +1,58 @@
+import os
+
+from sympy import srepr
+from cache import LRUCache, MISSING
+from normalizer import parse_math
+
+# One parse of a given line serves preview, checking and history on every rerun.
+PARSE_CACHE = LRUCache(maxsize=int(os.environ.get("DERIVACHECK_PARSE_CACHE_SIZE", "2048")))
+
+
+class ParseFailure:
+    """Negative cache entry: the input is known not to parse."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def normalize_input(text):
+    """Canonical spelling of an input line for cache lookups (collapses whitespace)."""
+    return " ".join(text.split())
+
+
+def _symbol_table_key(local_dict):
+    if not local_dict:
+        return ()
+    return tuple(sorted((name, srepr(value)) for name, value in local_dict.items()))
+
+
+def parse_cached(text, local_dict=None, evaluate=True):
+    """
+    normalizer.parse_math() with a bounded cache keyed on the normalized input
+    and the active symbol table. SymPy expressions are immutable, so cached results
+    are shared safely; inputs that fail to parse re-raise the cached error.
+    evaluate=False keeps the line as typed (2*3x stays 2*3*x), for display.
+    """
+    text = normalize_input(text)
+    key = (text, _symbol_table_key(local_dict))
+    if not evaluate:
+        key += ("unevaluated",)
+
+    entry = PARSE_CACHE.get(key)
+    if entry is MISSING:
+        try:
+            entry = parse_math(text, local_dict, evaluate)
+        except Exception as e:
+            entry = ParseFailure(e)
+        PARSE_CACHE.put(key, entry)
+
+    if isinstance(entry, ParseFailure):
+        raise entry.error.with_traceback(None)
+    return entry
+
+
+def parse_cache_stats():
+    """LRU counters plus the number of cached failures."""
+    stats = PARSE_CACHE.stats()
+    stats["negative"] = sum(isinstance(v, ParseFailure) for v in PARSE_CACHE.values())
+    return stats
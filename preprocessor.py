@@ -1,19 +1,10 @@
-from sympy import simplify, sympify
+from sympy import simplify
+from parse_cache import parse_cached
+from normalizer import translate_superscripts
 
 def replace_superscripts(expr_str):
     """Convert superscript characters to ** exponent format for sympy."""
-    sup_map = {
-        "⁰": "0", "¹": "1", "²": "2", "³": "3",
-        "⁴": "4", "⁵": "5", "⁶": "6",
-        "⁷": "7", "⁸": "8", "⁹": "9"
-    }
-    result = ""
-    for c in expr_str:
-        if c in sup_map:
-            result += "**" + sup_map[c]
-        else:
-            result += c
-    return result
+    return translate_superscripts(expr_str)
 
 def preprocess_input(input_text):
     """
@@ -22,8 +13,7 @@ def preprocess_input(input_text):
     """
     input_text = input_text.strip()
     try:
-        input_text = replace_superscripts(input_text)
-        expr = sympify(input_text)
+        expr = parse_cached(input_text)
         return simplify(expr)
     except Exception as e:
         return f"Error parsing input: {e}"
@@ -0,0 +1,205 @@
+# Precompiled problem bank: expected steps for a fixed question set, looked up
+# by canonical hash from a memory-mapped file instead of being re-derived.
+#
+#   python problem_bank.py build sm015.jsonl -o sm015.dcpb     # JSONL or CSV, same fields as batch_grade.py
+#   python problem_bank.py info sm015.dcpb
+#   DERIVACHECK_PROBLEM_BANK=sm015.dcpb streamlit run app.py
+#
+# File layout (little-endian):
+#   header   magic "DCPB", version u16, render version u16, slot count u32, entry count u32
+#            (the render version is rendering.RENDER_VERSION, for the stored "display")
+#   slots    slot count x (16-byte key digest, data offset u64, data length u32),
+#            open addressing with linear probing; length 0 marks an empty slot
+#   data     one UTF-8 JSON object per problem: {"mode", "order", "inputs",
+#            "steps": [{"label", "expr" (srepr), "display", optional "also"}]}
+#            keyed by the mode with its order (derivative_engine.order_mode)
+# Every process maps the same read-only pages, so worker processes share them.
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+
+from sympy import srepr, sympify
+
+from cache import LRUCache, MISSING, canonical_key
+from rendering import RENDER_VERSION
+
+MAGIC = b"DCPB"
+VERSION = 1
+HEADER = struct.Struct("<4sHHII")
+SLOT = struct.Struct("<16sQI")
+
+
+def _digest(key):
+    """16-byte slot digest of a canonical_key() hex string."""
+    return bytes.fromhex(key)[:16]
+
+
+def _slot_index(digest, slot_count):
+    return int.from_bytes(digest[:8], "little") & (slot_count - 1)
+
+
+# ---------------- BUILD ---------------- #
+def write_bank(path, problems):
+    """
+    Write a bank file from (key, payload dict) pairs. The slot table is the
+    next power of two at least twice the entry count, so probes stay short.
+    """
+    entries = {}
+    for key, payload in problems:
+        entries[_digest(key)] = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    slot_count = 1
+    while slot_count < 2 * max(len(entries), 1):
+        slot_count *= 2
+    slots = [None] * slot_count
+    data_start = HEADER.size + SLOT.size * slot_count
+    offset = data_start
+    blobs = []
+    for digest, blob in entries.items():
+        i = _slot_index(digest, slot_count)
+        while slots[i] is not None:
+            i = (i + 1) & (slot_count - 1)
+        slots[i] = (digest, offset, len(blob))
+        blobs.append(blob)
+        offset += len(blob)
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RENDER_VERSION, slot_count, len(entries)))
+        for slot in slots:
+            f.write(SLOT.pack(*slot) if slot else SLOT.pack(b"\0" * 16, 0, 0))
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp, path)
+    return len(entries)
+
+
+def _encode_step(step):
+    encoded = {"label": step["label"], "expr": srepr(step["expr"]), "display": step["display"]}
+    if "also" in step:
+        encoded["also"] = [srepr(e) for e in step["also"]]
+    return encoded
+
+
+def _decode_step(step):
+    decoded = {"label": step["label"], "expr": sympify(step["expr"]), "display": step["display"]}
+    if "also" in step:
+        decoded["also"] = [sympify(e) for e in step["also"]]
+    return decoded
+
+
+def compile_problem(record):
+    """(key, payload) for one problem record, doing the symbolic work once."""
+    from derivative_engine import order_mode
+    from grading import build_expected_steps, parse_problem
+
+    mode = record.get("mode") or "Normal"
+    order = int(record.get("order") or 1)
+    inputs = parse_problem(mode, func=record.get("func") or "", x_t=record.get("x_t") or "",
+                           y_t=record.get("y_t") or "")
+    # Derived afresh, never copied from a loaded bank that may be stale
+    steps = build_expected_steps(mode, func=record.get("func") or "", x_t=record.get("x_t") or "",
+                                 y_t=record.get("y_t") or "", order=order, use_bank=False)
+    payload = {
+        "mode": mode,
+        "order": order,
+        "inputs": [record.get(k) for k in ("func", "x_t", "y_t") if record.get(k)],
+        "steps": [_encode_step(s) for s in steps],
+    }
+    return canonical_key(order_mode(mode, order), *inputs), payload
+
+
+# ---------------- LOOKUP ---------------- #
+class ProblemBank:
+    """Read-only view of a bank file; get() is one hash, a short probe and a JSON decode."""
+
+    def __init__(self, path, cache_size=1024):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, render_version, self.slot_count, self.entry_count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} problem bank")
+        if render_version != RENDER_VERSION:
+            raise ValueError(f"{path} was built with render version {render_version}, "
+                             f"this is {RENDER_VERSION}: rebuild it with `python problem_bank.py build`")
+        # Decoded steps, so repeat lookups skip rebuilding the SymPy trees
+        self._decoded = LRUCache(cache_size)
+
+    def _payload(self, key):
+        digest = _digest(key)
+        i = _slot_index(digest, self.slot_count)
+        for _ in range(self.slot_count):
+            slot_digest, offset, length = SLOT.unpack_from(self._map, HEADER.size + SLOT.size * i)
+            if length == 0:
+                return None
+            if slot_digest == digest:
+                return json.loads(self._map[offset:offset + length].decode("utf-8"))
+            i = (i + 1) & (self.slot_count - 1)
+        return None
+
+    def get(self, key):
+        """Expected steps ({"label", "expr", "display"[, "also"]} dicts) for a canonical_key(), or None."""
+        steps = self._decoded.get(key)
+        if steps is MISSING:
+            payload = self._payload(key)
+            steps = None if payload is None else [_decode_step(s) for s in payload["steps"]]
+            self._decoded.put(key, steps)
+        # Callers may annotate the dicts; hand out copies
+        return None if steps is None else [dict(s) for s in steps]
+
+    def __len__(self):
+        return self.entry_count
+
+    def close(self):
+        self._map.close()
+
+
+def bank_from_env():
+    """The bank named by DERIVACHECK_PROBLEM_BANK, or None when unset."""
+    path = os.environ.get("DERIVACHECK_PROBLEM_BANK")
+    return ProblemBank(path) if path else None
+
+
+# ---------------- CLI ---------------- #
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect a precompiled problem bank.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="compile a problem list (JSONL or CSV)")
+    build.add_argument("input")
+    build.add_argument("-o", "--output", required=True)
+    build.add_argument("--format", choices=["jsonl", "csv"], help="default: from the file extension")
+    info = sub.add_parser("info", help="print a bank's size")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        bank = ProblemBank(args.path)
+        print(f"{args.path}: {len(bank)} problems, {bank.slot_count} slots, {os.path.getsize(args.path)} bytes")
+        return 0
+
+    from batch_grade import read_csv, read_jsonl
+
+    fmt = args.format or ("csv" if args.input.endswith(".csv") else "jsonl")
+    compiled, failed = [], 0
+    with open(args.input, encoding="utf-8", newline="") as f:
+        for record in (read_csv if fmt == "csv" else read_jsonl)(f):
+            if "input_error" in record:
+                failed += 1
+                print(f"skipped {record['input_error']}", file=sys.stderr)
+                continue
+            try:
+                compiled.append(compile_problem(record))
+            except Exception as e:
+                failed += 1
+                print(f"skipped {record.get('id') or record}: {type(e).__name__}: {e}", file=sys.stderr)
+    count = write_bank(args.output, compiled)
+    print(f"wrote {count} problems to {args.output} ({failed} skipped)", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+# LaTeX for the page: expected steps, previews, corrections and history.
+#
+# Lines are rendered from the SymPy expression the normalizer parses them to,
+# unevaluated so a line is shown as it was typed; the old string rewrite
+# (step_checker.to_latex) dropped every "*" and showed 2*3 as 23, and is now
+# only the fallback for lines that do not parse. The unevaluated parse has its
+# own PARSE_CACHE entry, since grading needs the evaluated one. Results are memoized in
+# RENDER_CACHE, one per server process and so shared by every session: SymPy
+# expressions hash by structure, so a rerun, another student on the same
+# problem or a history entry renders nothing twice.
+import os
+import re
+
+import sympy as sp
+from sympy.printing.latex import LatexPrinter
+
+from cache import LRUCache, MISSING
+from normalizer import LABELS, SUPERSCRIPTS
+from parse_cache import normalize_input, parse_cached
+
+# Bump when the LaTeX printed for an expression changes: problem banks store
+# it, and refuse to load when built with another version
+RENDER_VERSION = 2
+RENDER_CACHE = LRUCache(maxsize=int(os.environ.get("DERIVACHECK_RENDER_CACHE_SIZE", "4096")))
+
+
+def _fraction(label):
+    """"d²y/dx²" -> \\frac{d^{2}y}{dx^{2}}."""
+    top, bottom = (re.sub("[²³⁴]", lambda m: "^{" + m.group().translate(SUPERSCRIPTS) + "}", part)
+                   for part in label.split("/"))
+    return rf"\frac{{{top}}}{{{bottom}}}"
+
+# dy/dx, d²y/dx², dx/dt, dy/dt printed as fractions
+SYMBOL_NAMES = {symbol: _fraction(label) for label, symbol in LABELS.items()}
+
+
+class _Printer(LatexPrinter):
+    """sp.latex() with d/dx(...) printed with its parentheses, as it is typed."""
+
+    def _print_Derivative(self, expr):
+        if len(expr.variable_count) != 1:
+            return super()._print_Derivative(expr)
+        (var, count), = expr.variable_count
+        if count == 1:
+            operator = r"\frac{d}{d %s}" % self._print(var)
+        else:
+            operator = r"\frac{d^{%d}}{d %s^{%d}}" % (count, self._print(var), count)
+        return r"%s\left(%s\right)" % (operator, self._print(expr.expr))
+
+
+class _LinePrinter(_Printer):
+    """
+    Printer for lines parsed unevaluated, in the order they were typed.
+    Subtraction parses to nested Add(a, Mul(-1, b)) and unary minus to
+    Mul(-1, ...); both are flattened and printed as a sign, so
+    "x^2 - 2x - 1" prints as typed rather than as (x^2 - 2x) + (-1)·1.
+    Products are printed here too: LatexPrinter._print_Mul() normalizes
+    signs and fractions through SymPy's assumptions and is most of the cost.
+    """
+
+    def __init__(self):
+        super().__init__({"symbol_names": SYMBOL_NAMES, "order": "none"})
+
+    @staticmethod
+    def _signed(expr):
+        """(negative, factors without the sign) of a typed term."""
+        if expr.is_Number and expr.is_negative:
+            return True, [-expr]
+        if not isinstance(expr, sp.Mul):
+            return False, [expr]
+        negative, factors = False, []
+        stack = list(reversed(expr.args))
+        while stack:
+            arg = stack.pop()
+            if isinstance(arg, sp.Mul):
+                stack.extend(reversed(arg.args))
+            elif arg.is_Number and arg.is_negative:
+                # Negating a typed 2*3 leaves Mul(3, -2): the coefficient goes first
+                negative = not negative
+                if arg != -1:
+                    factors.insert(0, -arg)
+            else:
+                factors.append(arg)
+        return negative, factors or [sp.S.One]
+
+    def _product(self, factors):
+        if len(factors) == 1:
+            return self._print(factors[0])
+        tex = ""
+        for factor in factors:
+            part = self._print(factor)
+            if isinstance(factor, sp.Add):
+                part = r"\left(%s\right)" % part
+            if tex:
+                # A number after another factor: 2 \cdot 3, not 23
+                tex += r" \cdot " if part[0].isdigit() else " "
+            tex += part
+        return tex
+
+    def _unsigned(self, factors):
+        numerator, denominator = [], []
+        for factor in factors:
+            if factor.is_Pow and factor.exp.is_Number and factor.exp.is_negative:
+                denominator.append(factor.base if factor.exp == -1 else sp.Pow(factor.base, -factor.exp, evaluate=False))
+            else:
+                numerator.append(factor)
+        if denominator:
+            return r"\frac{%s}{%s}" % (self._product(numerator or [sp.S.One]), self._product(denominator))
+        if len(numerator) == 1 and isinstance(numerator[0], sp.Add):
+            return r"\left(%s\right)" % self._print(numerator[0])
+        return self._product(numerator)
+
+    def _print_Mul(self, expr):
+        if not isinstance(expr, sp.Mul):
+            return super()._print_Mul(expr)  # _print_Pow passes negative powers here
+        negative, factors = self._signed(expr)
+        return ("- " if negative else "") + self._unsigned(factors)
+
+    def _print_Add(self, expr):
+        terms, stack = [], list(reversed(expr.args))
+        while stack:
+            arg = stack.pop()
+            if isinstance(arg, sp.Add):
+                stack.extend(reversed(arg.args))
+            else:
+                terms.append(arg)
+        parts = []
+        for i, term in enumerate(terms):
+            negative, factors = self._signed(term)
+            if i:
+                parts.append("-" if negative else "+")
+            elif negative:
+                parts.append("-")
+            parts.append(self._unsigned(factors))
+        return " ".join(parts)
+
+
+_PRINTER = _Printer({"symbol_names": SYMBOL_NAMES})
+_LINE_PRINTER = _LinePrinter()
+
+
+def _cached(key, render):
+    latex = RENDER_CACHE.get(key)
+    if latex is MISSING:
+        latex = render()
+        RENDER_CACHE.put(key, latex)
+    return latex
+
+def render_expr(expr):
+    """LaTeX for a SymPy expression."""
+    return _cached(("expr", expr), lambda: _PRINTER.doprint(expr))
+
+def _render_side(text):
+    if not text.strip():
+        return ""
+    try:
+        # Unevaluated, so the line is shown as written: 2*3x stays 2 \cdot 3 x
+        expr = parse_cached(text, evaluate=False)
+    except Exception:
+        from step_checker import to_latex
+        return to_latex(text)
+    return _cached(("line", expr), lambda: _LINE_PRINTER.doprint(expr))
+
+def render_text(text):
+    """
+    LaTeX for a typed line. Each side of an '=' is rendered on its own, so
+    "dy/dx = 2x" keeps its left-hand side; lines that do not parse fall back
+    to step_checker.to_latex().
+    """
+    text = normalize_input(text or "")
+    return _cached(("text", text), lambda: " = ".join(_render_side(side) for side in text.split("=")))
+
+def message_parts(msg):
+    """
+    (student part, correction) LaTeX for a feedback message with a
+    "Correction:", or None. Checker messages are already LaTeX
+    (\\text{...} and an expected step's display); a plain-text student part
+    is rendered.
+    """
+    if not msg or "Correction:" not in msg:
+        return None
+
+    def split():
+        student, correction = (part.strip() for part in msg.split("Correction:", 1))
+        if not student.startswith("\\text"):
+            student = render_text(student)
+        return student, correction
+    return _cached(("message", msg), split)
@@ -1,30 +1,145 @@
-from sympy import symbols, Pow, Mul
+# Which differentiation rules an expression needs, and where.
+#
+# One memoized walk over the tree: each subtree is visited once per
+# (expression, variable, mode), and SymPy's structural hashing means a
+# subexpression shared between problems, or repeated across a batch, is
+# classified once and reused from RULE_CACHE. Tags are the STEP_EXPLANATIONS
+# keys, so a hit can be turned straight into feedback.
+from sympy import Add, Function, Mul, Pow, symbols
 
-x = symbols('x')
+from cache import LRUCache, MISSING
+from step_explanations import STEP_EXPLANATIONS
 
-def detect_rules(expr):
+x, y, t = symbols('x y t')
+
+RULE_CACHE = LRUCache(4096)
+
+# SymPy function -> tag for its own derivative
+FUNCTION_TAGS = {
+    "sin": "sin_rule", "cos": "cos_rule", "tan": "tan_rule",
+    "sec": "sec_rule", "csc": "csc_rule", "cot": "cot_rule",
+    "exp": "exp_rule", "log": "ln_rule",
+}
+
+
+# ---------------- VISITOR ---------------- #
+def _visit(expr, var, implicit):
     """
-    Detect which differentiation rules are involved in the expression.
-    Returns: list of rules
+    (depends on var, ((tag, subexpr), ...)) for one subtree, outermost
+    rule first. In implicit mode y counts as a function of x.
     """
-    rules = []
+    key = (expr, var, implicit)
+    cached = RULE_CACHE.get(key)
+    if cached is not MISSING:
+        return cached
+
+    if expr.is_Symbol:
+        result = (expr == var or (implicit and expr == y), ())
+        RULE_CACHE.put(key, result)
+        return result
+    if not expr.args:
+        result = (False, ())
+        RULE_CACHE.put(key, result)
+        return result
+
+    children = [_visit(arg, var, implicit) for arg in expr.args]
+    depends = any(d for d, _ in children)
+    hits = []
+    if depends:
+        hits = _node_rules(expr, var, implicit, [d for d, _ in children])
+    quotient = ("quotient_rule", expr) in hits
+    for arg, (_, child_hits) in zip(expr.args, children):
+        if quotient and _is_reciprocal(arg) and arg.exp == -1:
+            # The quotient rule differentiates v itself, not v**-1
+            child_hits = _visit(arg.base, var, implicit)[1]
+        hits.extend(child_hits)
+
+    result = (depends, tuple(hits))
+    RULE_CACHE.put(key, result)
+    return result
+
+def _node_rules(expr, var, implicit, depends):
+    """Rules applied at this node itself; `depends` is per argument."""
+    hits = []
+    if implicit and y in expr.args:
+        # d/dx of a term built on y needs a dy/dx factor
+        hits.append(("implicit_dydx", y if isinstance(expr, Add) else expr))
 
-    # Power Rule
-    if expr.has(Pow) or expr.is_polynomial(x):
-        rules.append("Power Rule")
+    if isinstance(expr, Add):
+        if var in expr.args:
+            hits.append(("power_rule", var))
 
-    # Product Rule
-    if expr.is_Mul and any(term.has(x) for term in expr.args):
-        rules.append("Product Rule")
+    elif isinstance(expr, Mul):
+        numerator = [a for a, d in zip(expr.args, depends) if d and not _is_reciprocal(a)]
+        denominator = [a for a, d in zip(expr.args, depends) if d and _is_reciprocal(a)]
+        if denominator and numerator:
+            hits.append(("quotient_rule", expr))
+        elif len(numerator) > 1:
+            hits.append(("product_rule", expr))
+        if var in expr.args:
+            hits.append(("power_rule", var))
 
-    # Quotient Rule
-    numerator, denominator = expr.as_numer_denom()
-    if denominator.has(x):
-        rules.append("Quotient Rule")
+    elif isinstance(expr, Pow):
+        base_depends, exp_depends = depends
+        inner = None
+        if base_depends:
+            hits.append(("power_rule", expr))
+            inner = expr.base
+        if exp_depends:
+            # a**f(x) (and x**x) differentiate through e**(f ln a)
+            hits.append(("exp_rule", expr))
+            inner = expr.exp
+        if inner is not None and not inner.is_Symbol:
+            hits.append(("chain_rule", expr))
 
-    # Chain Rule
-    atoms = expr.atoms()
-    if any(sub != x and sub.has(x) for sub in atoms):
-        rules.append("Chain Rule")
+    elif isinstance(expr, Function):
+        tag = FUNCTION_TAGS.get(expr.func.__name__)
+        if tag:
+            hits.append((tag, expr))
+        if any(not arg.is_Symbol for arg, d in zip(expr.args, depends) if d):
+            hits.append(("chain_rule", expr))
+    return hits
 
-    return list(set(rules))
\ No newline at end of file
+def _is_reciprocal(factor):
+    return isinstance(factor, Pow) and factor.exp.is_negative
+
+
+# ---------------- PUBLIC API ---------------- #
+def classify_rules(expr, var=x, mode="Normal"):
+    """
+    Every rule needed to differentiate expr, outermost first:
+    [{"tag", "title", "subexpr"}], one entry per (tag, subexpression).
+    """
+    implicit = mode == "Implicit"
+    if mode == "Parametric":
+        var = t
+    depends, hits = _visit(expr, var, implicit)
+    if expr == var:
+        hits = (("power_rule", expr),)
+    elif implicit and expr == y:
+        hits = (("implicit_dydx", expr),)
+    elif not depends:
+        hits = (("constant_rule", expr),)
+    elif isinstance(expr, Add):
+        # Constant terms of the expression itself (not of inner functions)
+        hits += tuple(("constant_rule", arg) for arg in expr.args if not _visit(arg, var, implicit)[0])
+    if mode == "Parametric":
+        hits = (("parametric_rule", expr),) + hits
+
+    rules, seen = [], set()
+    for tag, subexpr in hits:
+        if (tag, subexpr) not in seen:
+            seen.add((tag, subexpr))
+            rules.append({"tag": tag, "title": STEP_EXPLANATIONS[tag]["title"], "subexpr": subexpr})
+    return rules
+
+def detect_rules(expr, var=x, mode="Normal"):
+    """
+    Detect which differentiation rules are involved in the expression.
+    Returns: list of rule titles, each once
+    """
+    titles = []
+    for rule in classify_rules(expr, var, mode):
+        if rule["title"] not in titles:
+            titles.append(rule["title"])
+    return titles
@@ -0,0 +1,334 @@
+# Isolated subprocess workers for running checks with a time and memory budget.
+#
+# A pathological input (a huge power tower, an implicit equation sp.solve never
+# finishes) used to pin the Streamlit process. Checks now run in long-lived
+# worker processes; a worker that overruns its wall-clock timeout or RSS cap is
+# killed and replaced, and the caller gets a "too_complex" verdict instead.
+#
+# Workers are forked from a fork server that has already imported the checker,
+# and each one runs warmup.prewarm() (every mode, SymPy's lazy setup, the
+# LaTeX parser) before it is handed any job, so no check pays for a cold
+# process. A worker is recycled after DERIVACHECK_SANDBOX_MAX_JOBS jobs or once
+# its RSS passes DERIVACHECK_SANDBOX_RECYCLE_RSS_MB: its replacement warms up
+# while it keeps serving, and it is retired once the replacement is ready.
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+
+from metrics import METRICS
+
+DEFAULT_TIMEOUT = float(os.environ.get("DERIVACHECK_CHECK_TIMEOUT", "10"))
+DEFAULT_MAX_RSS_MB = float(os.environ.get("DERIVACHECK_CHECK_MAX_RSS_MB", "1024"))
+DEFAULT_WORKERS = int(os.environ.get("DERIVACHECK_SANDBOX_WORKERS", "2"))
+DEFAULT_MAX_JOBS = int(os.environ.get("DERIVACHECK_SANDBOX_MAX_JOBS", "500"))
+DEFAULT_RECYCLE_RSS_MB = float(os.environ.get("DERIVACHECK_SANDBOX_RECYCLE_RSS_MB", "512"))
+WARM_WORKERS = os.environ.get("DERIVACHECK_SANDBOX_WARM", "1") != "0"
+WARM_TIMEOUT = 120.0  # seconds a new worker may take to warm up
+
+# Imported once by the fork server; workers forked from it start with them loaded.
+# Not "__main__": under `streamlit run` that is app.py, which would run in bare
+# mode in the fork server, starting its threads before every fork
+PRELOAD = ["grading", "rendering", "warmup"]
+
+TOO_COMPLEX_MESSAGE = "⏱️ This problem is too complex to verify automatically. Try simplifying your input."
+
+
+class SandboxAbort(RuntimeError):
+    """Raised when a job is killed for exceeding its budget (reason: timeout, memory, crashed)."""
+
+    def __init__(self, reason):
+        super().__init__(f"Check aborted: {reason}")
+        self.reason = reason
+
+
+# ---------------- WORKER PROCESS ---------------- #
+def worker_context():
+    """
+    Multiprocessing context for check workers: a fork server where the platform
+    has one, spawn otherwise. Not plain fork, which is unsafe in a
+    multi-threaded Streamlit server.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(PRELOAD)
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+def warm_worker():
+    """Run warmup.prewarm() in a new worker; a worker that fails to warm still works, just slower at first."""
+    from warmup import prewarm
+    try:
+        prewarm()
+    except Exception:
+        pass
+
+def _worker_main(conn, warm):
+    METRICS.track_pending = True
+    if warm:
+        warm_worker()
+    # The pool hands out this worker only after this message
+    conn.send(("ready", None, METRICS.drain()))
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        func, args = job
+        try:
+            outcome = ("ok", func(*args))
+        except MemoryError:
+            outcome = ("memory", None)
+        except Exception as e:
+            outcome = ("error", f"{type(e).__name__}: {e}")
+        # Timing spans recorded here are merged into the parent's registry
+        conn.send(outcome + (METRICS.drain(),))
+
+
+def _rss_bytes(pid):
+    """Resident set size of a process, or None where /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+_start_lock = threading.Lock()
+
+def _start_without_main(process):
+    """
+    Start a worker process without it re-running the parent's script. The
+    fork server and spawn re-import __main__ (as __mp_main__) in each new
+    process when it has a __file__; jobs only use importable modules, so the
+    path is hidden while the process starts.
+    """
+    main = sys.modules.get("__main__")
+    with _start_lock:
+        path = main.__dict__.pop("__file__", None) if main is not None else None
+        try:
+            process.start()
+        finally:
+            if path is not None:
+                main.__file__ = path
+
+
+class _Worker:
+    def __init__(self, ctx, warm):
+        self.warm = warm
+        self.jobs = 0
+        self.replacing = False   # a replacement is warming up
+        self.retired = False     # the replacement is ready; stop this one when it is next free
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, warm), daemon=True)
+        _start_without_main(self.process)
+        child_conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.kill()
+
+
+# ---------------- POOL ---------------- #
+class SandboxPool:
+    """
+    Fixed-size pool of warm worker processes with per-job time and RSS budgets,
+    recycled after `max_jobs` jobs or `recycle_rss_mb` of RSS.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT,
+                 max_rss_mb=DEFAULT_MAX_RSS_MB, poll_interval=0.05, max_jobs=DEFAULT_MAX_JOBS,
+                 recycle_rss_mb=DEFAULT_RECYCLE_RSS_MB, warm=WARM_WORKERS):
+        self.timeout = timeout or DEFAULT_TIMEOUT
+        self.max_rss = max_rss_mb * 1024 * 1024 if max_rss_mb else None
+        self.poll_interval = poll_interval
+        self.max_jobs = max_jobs or None
+        self.recycle_rss = recycle_rss_mb * 1024 * 1024 if recycle_rss_mb else None
+        self.warm = warm
+        self._ctx = worker_context()
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._closed = False
+        self.counters = {"jobs": 0, "completed": 0, "timeouts": 0, "memory_kills": 0,
+                         "crashes": 0, "kills": 0, "replacements": 0, "recycles": 0, "warm_failures": 0}
+        for name in self.counters:
+            METRICS.count(f"sandbox_{name}", 0)  # exported from the start, at zero
+        for _ in range(workers):
+            self._add_worker()
+
+    def _add_worker(self, replaces=None, warm=None):
+        """Start a worker; it joins the idle queue once warm, in the background."""
+        worker = _Worker(self._ctx, self.warm if warm is None else warm)
+        with self._lock:
+            self._workers.append(worker)
+        threading.Thread(target=self._await_ready, args=(worker, replaces),
+                         name="sandbox-warmup", daemon=True).start()
+
+    def _await_ready(self, worker, replaces):
+        status, _ = self._wait(worker, WARM_TIMEOUT)
+        if status != "ready" and worker.warm:
+            # Hung or crashed while warming: fall back to a cold worker
+            self._count("warm_failures")
+            self._remove(worker)
+            worker.kill()
+            if not self._closed:
+                self._add_worker(replaces, warm=False)
+            return
+        if self._closed:
+            worker.stop()
+            return
+        if replaces is not None:
+            replaces.retired = True
+        # A cold worker that did not start is caught as a crash by its first job
+        self._idle.put(worker)
+
+    def _remove(self, worker):
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+
+    def _retire(self, worker):
+        """Stop a worker whose replacement is ready, off the request path."""
+        self._remove(worker)
+        threading.Thread(target=worker.stop, name="sandbox-retire", daemon=True).start()
+
+    def _worn(self, worker):
+        if self.max_jobs is not None and worker.jobs >= self.max_jobs:
+            return True
+        if self.recycle_rss is not None:
+            rss = _rss_bytes(worker.process.pid)
+            return rss is not None and rss > self.recycle_rss
+        return False
+
+    def _take(self):
+        while True:
+            worker = self._idle.get()
+            if not worker.retired:
+                return worker
+            self._retire(worker)
+
+    def _release(self, worker):
+        worker.jobs += 1
+        if not worker.replacing and self._worn(worker):
+            worker.replacing = True
+            self._count("recycles")
+            self._add_worker(replaces=worker)
+        if worker.retired:
+            self._retire(worker)
+        else:
+            self._idle.put(worker)
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+        METRICS.count(f"sandbox_{name}")
+
+    def _replace(self, worker):
+        worker.kill()
+        self._remove(worker)
+        self._count("kills")
+        if not worker.replacing:  # otherwise its replacement is already warming up
+            self._count("replacements")
+            self._add_worker()
+
+    def _wait(self, worker, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return "timeout", None
+            if worker.conn.poll(min(remaining, self.poll_interval)):
+                try:
+                    status, value, observations = worker.conn.recv()
+                except (EOFError, OSError):
+                    return "crashed", None
+                METRICS.merge(observations)
+                return status, value
+            if not worker.process.is_alive():
+                return "crashed", None
+            if self.max_rss is not None:
+                rss = _rss_bytes(worker.process.pid)
+                if rss is not None and rss > self.max_rss:
+                    return "memory", None
+
+    def run(self, func, *args, timeout=None):
+        """
+        Run func(*args) in a worker and return its result.
+        Raises SandboxAbort if the job overran its budget, RuntimeError if it raised.
+        """
+        self._count("jobs")
+        worker = self._take()
+        status, value = "crashed", None
+        try:
+            worker.conn.send((func, args))
+            status, value = self._wait(worker, timeout or self.timeout)
+        finally:
+            if status in ("ok", "error"):
+                self._release(worker)
+            else:
+                self._count({"timeout": "timeouts", "memory": "memory_kills"}.get(status, "crashes"))
+                self._replace(worker)
+
+        if status == "ok":
+            self._count("completed")
+            return value
+        if status == "error":
+            raise RuntimeError(value)
+        raise SandboxAbort(status)
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, "workers": len(self._workers), "idle": self._idle.qsize()}
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.stop()
+
+
+# ---------------- CHECKS ---------------- #
+def too_complex_verdict(record, reason):
+    """Structured verdict for a check that was killed for exceeding its budget."""
+    return {
+        "id": record.get("id"),
+        "mode": record.get("mode") or "Normal",
+        "status": "too_complex",
+        "reason": reason,
+        "error": TOO_COMPLEX_MESSAGE,
+    }
+
+
+def timed_check(record, submitted_at):
+    """grade_submission() for service.py; runs in a worker and records how long the job waited for it."""
+    from grading import grade_submission
+    queued_ms = (time.time() - submitted_at) * 1000
+    result = grade_submission(record)
+    result["timings"] = {"queued_ms": round(queued_ms, 3), "grading_ms": result.pop("elapsed_ms", None)}
+    return result
+
+
+def run_check(pool, record, timeout=None, memo=None):
+    """grade_submission() inside the sandbox; overruns come back as a "too_complex" verdict."""
+    from grading import grade_submission  # only the workers need SymPy loaded
+    try:
+        return pool.run(grade_submission, record, memo, timeout=timeout)
+    except SandboxAbort as e:
+        return too_complex_verdict(record, e.reason)
+
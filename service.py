@@ -0,0 +1,130 @@
+# Local HTTP grading service for LMS integration.
+#
+#   python service.py --port 8600 --workers 4
+#
+#   POST /check        {"mode": "Normal", "func": "2x³ + 3x", "steps": ["6x² + 3"]}
+#   POST /check/batch  {"submissions": [{...}, {...}]}
+#   GET  /health
+#   GET  /metrics      Prometheus text format
+#
+# The asyncio (tornado) front end only parses and routes requests; the
+# CPU-bound SymPy work runs in sandboxed worker processes, so a slow check
+# never blocks the event loop or the fast requests queued behind it, and a
+# runaway one is killed at its time/memory budget.
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import tornado.web
+
+from metrics import render_prometheus
+from sandbox import SandboxAbort, SandboxPool, timed_check, too_complex_verdict
+
+MAX_BATCH = 500
+
+# ---------------- HANDLERS ---------------- #
+class BaseHandler(tornado.web.RequestHandler):
+    def initialize(self, pool, waiters):
+        self.pool = pool
+        self.waiters = waiters
+
+    def set_default_headers(self):
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+
+    def write_json(self, payload, status=200):
+        self.set_status(status)
+        self.finish(json.dumps(payload, ensure_ascii=False))
+
+    def read_json(self):
+        try:
+            return json.loads(self.request.body or b"{}")
+        except ValueError:
+            return None
+
+    async def grade(self, record):
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.waiters, self.pool.run, timed_check, record, time.time())
+        except SandboxAbort as e:
+            result = too_complex_verdict(record, e.reason)
+            result["timings"] = {}
+        except RuntimeError as e:
+            # The check raised in the worker: an error verdict for this submission
+            # rather than a 500, which would also fail the rest of a batch
+            result = {"id": record.get("id"), "mode": record.get("mode") or "Normal",
+                      "status": "error", "error": f"Internal error while checking: {e}", "timings": {}}
+        result["timings"]["total_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return result
+
+
+class CheckHandler(BaseHandler):
+    async def post(self):
+        record = self.read_json()
+        if not isinstance(record, dict):
+            return self.write_json({"error": "Body must be a JSON object"}, 400)
+        self.write_json(await self.grade(record))
+
+
+class BatchHandler(BaseHandler):
+    async def post(self):
+        body = self.read_json()
+        submissions = body.get("submissions") if isinstance(body, dict) else None
+        if not isinstance(submissions, list) or not all(isinstance(r, dict) for r in submissions):
+            return self.write_json({"error": "Body must be {\"submissions\": [objects]}"}, 400)
+        if len(submissions) > MAX_BATCH:
+            return self.write_json({"error": f"At most {MAX_BATCH} submissions per batch"}, 413)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(self.grade(r) for r in submissions))
+        self.write_json({
+            "results": results,
+            "timings": {"total_ms": round((time.perf_counter() - start) * 1000, 3)},
+        })
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        self.write_json({"status": "ok", "sandbox": self.pool.stats()})
+
+class MetricsHandler(BaseHandler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.finish(render_prometheus())
+
+# ---------------- APP ---------------- #
+def make_app(pool, waiters):
+    handler_args = {"pool": pool, "waiters": waiters}
+    return tornado.web.Application([
+        (r"/check", CheckHandler, handler_args),
+        (r"/check/batch", BatchHandler, handler_args),
+        (r"/health", HealthHandler, handler_args),
+        (r"/metrics", MetricsHandler, handler_args),
+    ])
+
+async def serve(host, port, workers, timeout):
+    pool = SandboxPool(workers=workers, timeout=timeout)
+    # Threads only wait on sandbox workers; two per worker keeps the pipeline full
+    waiters = ThreadPoolExecutor(max_workers=2 * workers)
+    try:
+        make_app(pool, waiters).listen(port, address=host)
+        print(f"DerivaCheck grading service on http://{host}:{port} ({workers} workers)")
+        await asyncio.Event().wait()
+    finally:
+        waiters.shutdown(wait=False)
+        pool.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the DerivaCheck grading service locally.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--timeout", type=float, default=None, help="seconds per check before it is killed")
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.host, args.port, args.workers, args.timeout))
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,15 @@
 from sympy import symbols, diff, simplify
-from sympy.parsing.sympy_parser import parse_expr, standard_transformations, implicit_multiplication_application
 from step_explanations import STEP_EXPLANATIONS
+from equivalence import check_equivalence
+from fingerprint import FingerprintIndex
+from parse_cache import parse_cached
+from normalizer import DY_DX, SUPERSCRIPTS, normalize
+from metrics import span
+from mistakes import diagnose
 import re
 import sympy as sp
-import streamlit as st
 
 x, y, t = symbols('x y t')
-dy_dx = symbols('dy_dx')
-
-# ----------------- UTILITY ----------------- #
-def parse_expr_safe(expr):
-    if isinstance(expr, str):
-        if "=" in expr:
-            lhs, rhs = expr.split("=", 1)
-            expr = f"({lhs}) - ({rhs})"
-
-        superscripts = {"⁰":"**0","¹":"**1","²":"**2","³":"**3","⁴":"**4",
-                        "⁵":"**5","⁶":"**6","⁷":"**7","⁸":"**8","⁹":"**9"}
-        for sup, repl in superscripts.items():
-            expr = expr.replace(sup, repl)
-
-        expr = expr.replace("−","-").replace("×","*").replace("÷","/")
-        expr = expr.replace("^","**").replace("ln","log")
-        expr = re.sub(r'([a-zA-Z])\s*dy/dx', r'\1*dy_dx', expr)
-        expr = expr.replace("dy/dx", "dy_dx")
-
-        transformations = (standard_transformations + (implicit_multiplication_application,))
-        expr = parse_expr(expr, transformations=transformations,
-                          local_dict={"x":x,"y":y,"t":t,"dy_dx":dy_dx})
-    return expr
 
 # ----------------- DERIVATIVES ----------------- #
 def parametric_derivative_chain(x_t, y_t):
@@ -61,6 +42,7 @@ def generate_missing_feedback(missing_steps):
 def check_derivative_steps(student_steps, original_func=None, mode="Normal", parametric_inputs=None):
     feedback = []
     missing_steps = []
+    tiers = []
 
     # ---------- PARAMETRIC ----------
     if mode == "Parametric":
@@ -77,7 +59,9 @@ def check_derivative_steps(student_steps, original_func=None, mode="Normal", par
         for i, step in enumerate(student_steps):
             step_expr = parse_expr_safe(step)
             expected = expected_steps[i] if i < len(expected_steps) else dy_dx_simplified
-            if simplify(step_expr - expected) == 0:
+            verdict = check_equivalence(step_expr, expected)
+            tiers.append(verdict["tier"])
+            if verdict["equivalent"]:
                 feedback.append(f"Step {i+1}: ✅ Correct")
             else:
                 feedback.append(f"Step {i+1}: ❌ Incorrect. Correction: {expected}")
@@ -92,12 +76,14 @@ def check_derivative_steps(student_steps, original_func=None, mode="Normal", par
 
         for i, step in enumerate(student_steps):
             step_expr = parse_expr_safe(step)
-            if simplify(step_expr - correct_derivative) == 0:
+            verdict = check_equivalence(step_expr, correct_derivative)
+            tiers.append(verdict["tier"])
+            if verdict["equivalent"]:
                 feedback.append(f"Step {i+1}: ✅ Correct")
             else:
                 feedback.append(f"Step {i+1}: ❌ Incorrect. Correction: {correct_derivative}")
                 # Detect missing dy/dx
-                if "dy_dx" not in step:
+                if not step_expr.has(DY_DX):
                     missing_steps.append("implicit_dydx")
 
     # ---------- NORMAL ----------
@@ -107,52 +93,53 @@ def check_derivative_steps(student_steps, original_func=None, mode="Normal", par
 
         for i, step in enumerate(student_steps):
             step_expr = parse_expr_safe(step)
-            if simplify(step_expr - expected_derivative) == 0:
+            verdict = check_equivalence(step_expr, expected_derivative)
+            tiers.append(verdict["tier"])
+            if verdict["equivalent"]:
                 feedback.append(f"Step {i+1}: ✅ Correct")
             else:
                 feedback.append(f"Step {i+1}: ❌ Incorrect. Correction: {expected_derivative}")
-                # Detect missing rules
-                s_str = str(step_expr)
-                if "cos" in s_str and "-sin" not in s_str:
-                    missing_steps.append("cos_rule")
-                    missing_steps.append("missing_negative")
-                if "**" in s_str and "*" not in s_str:
-                    missing_steps.append("chain_rule")
+                # Which typical mistake (dropped chain factor, sign, u'/v', ...) gives this answer
+                mistake = diagnose(step_expr, correct_expr)
+                if mistake:
+                    missing_steps.append(mistake["tag"])
 
     # ---------- GENERATE TEXTBOOK FEEDBACK ----------
     missing_feedback = generate_missing_feedback(missing_steps)
 
     return {
         "step_feedback": feedback,
-        "missing_feedback": missing_feedback
+        "missing_feedback": missing_feedback,
+        "missing_steps": missing_steps,
+        "tiers": tiers
     }
 
 # ----------------- BACKEND HELPERS ----------------- #
 def to_backend(expr: str) -> str:
     if not expr:
         return ""
-    # Superscripts → Python power notation
-    expr = expr.replace("⁰","**0").replace("¹","**1").replace("²","**2") \
-               .replace("³","**3").replace("⁴","**4").replace("⁵","**5") \
-               .replace("⁶","**6").replace("⁷","**7").replace("⁸","**8") \
-               .replace("⁹","**9")
-    # Replace math symbols
-    expr = expr.replace("−","-").replace("×","*").replace("÷","/")
+    # Superscripts, −×÷, π, √, dy/dx ... → canonical spelling in one pass
+    return normalize(expr)
+
+def parse_expr_safe(expr):
+    # Allow implicit multiplication (e.g., 4x → 4*x, 2(x+1) → 2*(x+1))
+    if isinstance(expr, str):
+        return parse_cached(expr)
     return expr
 
-def parse_expr_safe(expr: str):
-    try:
-        # Allow implicit multiplication (e.g., 4x → 4*x, 2(x+1) → 2*(x+1))
-        transformations = (standard_transformations + (implicit_multiplication_application,))
-        return parse_expr(expr, transformations=transformations)
-    except Exception as e:
-        raise e
+def _nth_derivative_latex(match):
+    n = match.group(1).translate(SUPERSCRIPTS)
+    return rf"\frac{{d^{{{n}}}y}}{{dx^{{{n}}}}}"
 
 def to_latex(expr: str) -> str:
     if not expr:
         return ""
-    expr = expr.replace("**","^").replace("*","")
+    expr = expr.replace("**","^")
+    # 2*3 is a product, not the number 23
+    expr = re.sub(r"(?<=\d)\s*\*\s*(?=\d)", r" \\cdot ", expr).replace("*","")
+    expr = re.sub(r"d([²³⁴])y/dx\1", _nth_derivative_latex, expr)
     expr = expr.replace("d/dx", r"\frac{d}{dx} ")
+    expr = expr.replace("d/dt", r"\frac{d}{dt} ")
     expr = expr.replace("dy/dx", r"\frac{dy}{dx}")
     expr = re.sub(r"\b(sin|cos|tan|sec|csc|cot|ln|exp)\b", r"\\\1", expr)
     return expr
@@ -161,28 +148,144 @@ def to_latex(expr: str) -> str:
 # NEW STEP-BY-STEP CHECKER (ADDED, NOT REPLACING)
 # ======================================================
 
-def check_steps_against_expected(student_steps, expected_steps):
+def _memo_key(position, expected, student):
+    return f"{position}|{sp.srepr(expected)}|{student}"
+
+def _compare_line(i, student, expected, expected_display, find_expected, also=(), explain=None):
+    """
+    Verdict and feedback line for one student line against its expected step;
+    `also` holds other forms of the step that count as correct, and
+    `explain(expr)` names the mistake behind a wrong line (mistakes.diagnose).
+    """
+    verdict = {"step": i + 1}
+    try:
+        # Parse both into Sympy expressions for math equivalence
+        with span("parse") as s:
+            student_expr = s.expr = parse_expr_safe(to_backend(student))
+        with span("compare", expr=expected):
+            verdict.update(check_equivalence(student_expr, expected))
+            for other in also:
+                if verdict["equivalent"]:
+                    break
+                verdict.update(check_equivalence(student_expr, other))
+        if verdict["equivalent"]:
+            verdict["status"] = "correct"
+            message = f"✅ Step {i+1} correct: {student}"
+        else:
+            verdict["status"] = "incorrect"
+            match = find_expected(student_expr)
+            if match is not None and match != i:
+                # Right expression, wrong place (e.g. a skipped or swapped step)
+                verdict["matches_step"] = match + 1
+                message = f"\\text{{❌ Step {i+1} incorrect: this is expected step {match+1}.}} \nCorrection: {expected_display}"
+            else:
+                mistake = explain(student_expr) if explain is not None else None
+                if mistake:
+                    verdict.update(mistake=mistake["tag"], hint=mistake["textbook"])
+                    message = f"\\text{{❌ Step {i+1} incorrect: {mistake['title']}.}} \nCorrection: {expected_display}"
+                else:
+                    message = f"\\text{{❌ Step {i+1} incorrect.}} \nCorrection: {expected_display}"
+    except Exception:
+        verdict["status"] = "unparsable"
+        message = f"⚠️ Step {i+1} could not be parse \nYour Input: {student} Don't be such nonsense!`"
+    return verdict, message
+
+def check_steps_against_expected(student_steps, expected_steps, verdicts=None, memo=None, intermediates=None,
+                                 explain=None):
+    """
+    Compare each student line with the expected step at the same position.
+    If `verdicts` is a list, one verdict per position is appended to it:
+    {"step", "status"} plus the equivalence tier for compared lines, and
+    "matches_step" when an incorrect or extra line equals another expected step.
+    If `memo` is a dict, verdicts are looked up in it by (position, expected
+    step, line text) and new ones are stored, so only edited lines are
+    re-parsed and re-compared on the next check.
+    Lines to spare (more lines than expected steps) are read as working:
+    a line equal to the next expected step that is followed by another
+    line of the same step, or a line found in `intermediates`
+    (intermediate_forms.intermediate_index()), is "intermediate" and does
+    not use up the step.
+    With `explain(expr, j)`, an incorrect line for expected step j is
+    checked against the typical mistakes for that step and the verdict gets
+    "mistake" (a STEP_EXPLANATIONS tag) and "hint".
+    """
     feedback = []
-    max_len = max(len(student_steps), len(expected_steps))
+    judged = {}
+
+    # Fingerprints of the expected steps, built on first use: finds which
+    # step (if any) a misplaced line matches with one lookup instead of
+    # comparing it against every step
+    index = []
+    def find_expected(expr):
+        if not index:
+            index.append(FingerprintIndex((e["expr"], j) for j, e in enumerate(expected_steps) if e["expr"] is not None))
+        return index[0].lookup(expr)
 
-    for i in range(max_len):
-        student = student_steps[i] if i < len(student_steps) else None
-        expected = expected_steps[i]["expr"] if i < len(expected_steps) else None
-        expected_display = expected_steps[i]["display"] if i < len(expected_steps) else None
+    def judge(i, j):
+        """(verdict, message) for line i against expected step j."""
+        if (i, j) in judged:
+            return judged[i, j]
+        student, expected = student_steps[i], expected_steps[j]["expr"]
+        key = _memo_key(i + 1, expected, student) if memo is not None else None
+        if key in (memo or ()):
+            verdict, message = memo[key]
+        else:
+            verdict, message = _compare_line(i, student, expected, expected_steps[j]["display"], find_expected,
+                                             also=expected_steps[j].get("also", ()),
+                                             explain=explain and (lambda expr: explain(expr, j)))
+            if memo is not None:
+                memo[key] = (dict(verdict), message)
+        judged[i, j] = dict(verdict), message
+        return dict(verdict), message
 
-        if student and expected:
+    def working_form(i, j, verdict):
+        """Label when line i is working towards step j rather than step j itself, else None."""
+        if len(student_steps) - i <= len(expected_steps) - j:
+            return None
+        if verdict["status"] == "correct":
+            if judge(i + 1, j)[0]["status"] == "correct":
+                return "equivalent form"
+        elif verdict["status"] == "incorrect" and intermediates:
             try:
-                # Parse both into Sympy expressions for math equivalence
-                student_expr = parse_expr_safe(to_backend(student))
-                if sp.simplify(student_expr - expected) == 0:
-                    feedback.append(f"✅ Step {i+1} correct: {student}")
-                else:
-                    feedback.append(f"\\text{{❌ Step {i+1} incorrect.}} \nCorrection: {expected_display}")
+                match = intermediates.lookup(parse_expr_safe(to_backend(student_steps[i])),
+                                             where=lambda value: value[0] >= j)
             except Exception:
-                feedback.append(st.write(f"⚠️ Step {i+1} could not be parse \nYour Input: {student} Don't be such nonsense!`"))
-        elif student and not expected:
-            feedback.append(f"⚠️ Extra step {i+1}: {student}")
-        elif expected and not student:
-            feedback.append(st.write(f"❌ Missing step {i+1} \nCorrection: {expected_display}"))
+                match = None
+            if match is not None:
+                return match[1]
+        return None
+
+    j = 0  # next expected step
+    for i, student in enumerate(student_steps):
+        if j < len(expected_steps):
+            verdict, message = judge(i, j)
+            form = working_form(i, j, verdict)
+            if form is not None:
+                verdict = {"step": i + 1, "status": "intermediate", "expected_step": j + 1, "form": form}
+                message = f"✅ Step {i+1} valid intermediate ({form}): {student}"
+            else:
+                j += 1
+            feedback.append(message)
+        else:
+            verdict = {"step": i + 1, "status": "extra"}
+            try:
+                match = find_expected(parse_expr_safe(to_backend(student)))
+            except Exception:
+                match = None
+            if match is not None:
+                verdict["matches_step"] = match + 1
+                feedback.append(f"⚠️ Extra step {i+1} (same as expected step {match+1}): {student}")
+            else:
+                feedback.append(f"⚠️ Extra step {i+1}: {student}")
+
+        if verdicts is not None:
+            verdicts.append(verdict)
+
+    # Expected steps no line reached
+    for k in range(j, len(expected_steps)):
+        step = len(student_steps) + k - j + 1
+        if verdicts is not None:
+            verdicts.append({"step": step, "status": "missing"})
+        feedback.append(f"\\text{{❌ Missing step {step}}} \nCorrection: {expected_steps[k]['display']}")
 
     return feedback
@@ -0,0 +1,37 @@
+import itertools
+import json
+from collections import Counter
+
+from analytics import Summary, parse_records, select
+
+
+def line(ts, status, tag=None, mode="Normal", problem="p1"):
+    record = {"ts": ts, "problem": problem, "inputs": ["x^2"], "mode": mode, "order": 1,
+              "step": 1, "status": status, "tag": tag}
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def test_records_stream_one_line_at_a_time():
+    endless = (line(86400 * i, "correct") for i in itertools.count())
+    first = list(itertools.islice(parse_records(endless, 86400, Counter()), 3))
+    assert [bucket for bucket, _ in first] == [0, 1, 2]
+
+
+def test_bad_lines_and_other_layouts():
+    errors = Counter()
+    lines = [line(10, "correct"), "not json\n", "\n", '{"status": "incorrect", "ts": 20}\n', '{"ts": 5, "x": 1}\n']
+    records = list(parse_records(lines, 3600, errors))
+    assert [r["status"] for _, r in records] == ["correct", "incorrect"]
+    assert errors["bad_lines"] == 2
+
+
+def test_summary_counts_every_row():
+    lines = [line(0, "incorrect", "chain_rule"), line(1, "incorrect", "chain_rule"),
+             line(2, "correct", mode="Implicit", problem="p2"), line(90000, "missing")]
+    errors = Counter()
+    summary = Summary("day").consume(select(parse_records(lines, 86400, errors, since=1), mode="Normal"))
+    result = summary.to_dict()
+    assert result["rows"] == 2
+    assert result["statuses"] == {"incorrect": 1, "missing": 1}
+    assert result["rules"][0]["count"] == 1
+    assert len(result["timeline"]) == 2
@@ -0,0 +1,26 @@
+import io
+
+from batch_grade import grade_record, grade_stream, read_jsonl
+
+LINES = '{"id": 1, "func": "x^2", "steps": ["2x"]}\n{not json\n\n[1, 2]\n"text"\n{"id": 2, "func": "x^2", "steps": ["5"]}\n'
+
+
+def test_unreadable_lines_become_error_records():
+    records = list(read_jsonl(io.StringIO(LINES)))
+    assert [r.get("id") for r in records] == [1, None, None, None, 2]
+    assert [r.get("line") for r in records[1:4]] == [2, 4, 5]
+    assert all("input_error" in r for r in records[1:4])
+
+
+def test_stream_grades_past_malformed_lines():
+    verdicts = list(grade_stream(read_jsonl(io.StringIO(LINES)), workers=1, chunksize=2))
+    assert [v["status"] for v in verdicts] == ["ok", "error", "error", "error", "ok"]
+    assert verdicts[1]["line"] == 2 and "not valid JSON" in verdicts[1]["error"]
+    assert verdicts[4]["verdicts"][0]["status"] == "incorrect"
+
+
+def test_an_exception_while_grading_is_an_error_verdict():
+    def broken(record):
+        raise KeyError("steps")
+    verdict = grade_record({"id": 7, "func": "x^2"}, broken)
+    assert verdict == {"id": 7, "mode": "Normal", "status": "error", "error": "KeyError: 'steps'"}
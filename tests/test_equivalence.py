@@ -0,0 +1,51 @@
+import pytest
+from sympy import Abs, log, sign, sin, cos, sqrt, symbols, tan
+
+from equivalence import TIER_EXACT, TIER_NUMERIC, TIER_STRUCTURAL, check_equivalence, is_equivalent
+
+x, y = symbols("x y")
+
+
+def test_identical_expressions_are_structural():
+    assert check_equivalence(x**2 + 1, x**2 + 1) == {"equivalent": True, "tier": TIER_STRUCTURAL}
+
+
+def test_rewrites_are_equivalent_numerically():
+    result = check_equivalence(2 * sin(x) * cos(x), sin(2 * x))
+    assert result == {"equivalent": True, "tier": TIER_NUMERIC}
+
+
+def test_a_mismatch_is_final():
+    assert check_equivalence(3 * x**2, 3 * x**2 + 1)["equivalent"] is False
+
+
+@pytest.mark.parametrize("wrong, right", [
+    (x, sqrt(x**2)),               # |x|, equal only for x > 0
+    (x, Abs(x)),
+    (2 * log(x), log(x**2)),       # log(x²) is defined for x < 0 too
+    (1, sign(x)),
+    (x / Abs(x), 1),
+])
+def test_branch_sensitive_answers_that_only_agree_for_positive_x(wrong, right):
+    assert not is_equivalent(wrong, right)
+
+
+@pytest.mark.parametrize("a, b", [
+    (Abs(x) ** 2, x**2),
+    (sqrt(x**2) ** 2, x**2),
+    (log(x**2), log(x**2)),
+    (x * sign(x), Abs(x)),
+])
+def test_branch_sensitive_answers_that_are_equal(a, b):
+    assert is_equivalent(a, b)
+
+
+def test_branch_sensitive_match_is_confirmed_exactly():
+    result = check_equivalence(3 * tan(3 * x) / log(x), 3 / (cos(3 * x) ** 2 * log(x)) * sin(3 * x) * cos(3 * x))
+    assert result == {"equivalent": True, "tier": TIER_EXACT}
+
+
+def test_implicit_symbols_are_compared_as_variables():
+    dy_dx = symbols("dy/dx")
+    assert is_equivalent(2 * x + 2 * y * dy_dx, 2 * (x + y * dy_dx))
+    assert not is_equivalent(2 * x + 2 * y * dy_dx, 2 * x + 2 * dy_dx)
@@ -0,0 +1,43 @@
+from derivative_engine import expand_derivatives, x, y
+from equivalence import is_equivalent
+from grading import grade_submission
+from normalizer import LABELS, parse_math
+
+DY_DX = LABELS["dy/dx"]
+
+
+def statuses(record):
+    return [v["status"] for v in grade_submission(record)["verdicts"]]
+
+
+def test_derivative_of_y_uses_the_chain_rule():
+    assert expand_derivatives(parse_math("d/dx(x^2 + y^2)")) == 2 * x + 2 * y * DY_DX
+    assert expand_derivatives(parse_math("d/dx(dy/dx)")) == LABELS["d²y/dx²"]
+
+
+def test_both_sides_differentiated_keeps_the_left_hand_side():
+    assert is_equivalent(parse_math("d/dx(x^2 + y^2) = d/dx(25)"), 2 * x + 2 * y * DY_DX)
+    assert is_equivalent(parse_math("d/dx(sin y) = d/dx(2y)"), parse_math("cos(y) dy/dx - 2 dy/dx"))
+
+
+def test_implicit_working_in_d_dx_form():
+    record = {"mode": "Implicit", "func": "x^2 + y^2 = 25",
+              "steps": ["d/dx(x^2+y^2) = d/dx(25)", "2x + 2y dy/dx", "0", "dy/dx = -x/y"]}
+    assert statuses(record) == ["intermediate", "correct", "correct", "correct"]
+
+
+def test_implicit_sides_in_d_dx_form():
+    record = {"mode": "Implicit", "func": "sin(y) + x^2 = 2y",
+              "steps": ["d/dx(sin(y) + x^2)", "d/dx(2y)", "dy/dx = 2x/(2 - cos y)"]}
+    assert statuses(record) == ["correct", "correct", "correct"]
+
+
+def test_second_order_d_dx_of_first_derivative():
+    record = {"mode": "Implicit", "func": "x^2 + y^2 = 25", "order": 2,
+              "steps": ["2x + 2y dy/dx", "0", "dy/dx = -x/y", "d/dx(-x/y)"]}
+    assert statuses(record)[:4] == ["correct"] * 4
+
+
+def test_wrong_d_dx_line_is_still_wrong():
+    record = {"mode": "Implicit", "func": "x^2 + y^2 = 25", "steps": ["d/dx(x^2 + y)", "0", "dy/dx = -x/y"]}
+    assert statuses(record)[0] == "incorrect"
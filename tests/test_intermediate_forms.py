@@ -0,0 +1,32 @@
+from grading import grade_submission
+
+
+def statuses(record):
+    return [v["status"] for v in grade_submission(record)["verdicts"]]
+
+
+def test_unevaluated_d_dx_before_the_step():
+    record = {"mode": "Normal", "func": "x² sin x", "steps": ["d/dx(x² sin x)", "2x sin x + x² cos x"]}
+    assert statuses(record) == ["intermediate", "correct"]
+
+
+def test_implicit_sides_written_as_d_dx_first():
+    record = {"mode": "Implicit", "func": "x² + y² = 25",
+              "steps": ["d/dx(x² + y²)", "2x + 2y dy/dx", "d/dx(25)", "0", "dy/dx = -x/y"]}
+    assert statuses(record) == ["intermediate", "correct", "intermediate", "correct", "correct"]
+
+
+def test_implicit_differentiated_equation():
+    record = {"mode": "Implicit", "func": "x² + y² = 25",
+              "steps": ["2x + 2y dy/dx", "0", "x + y dy/dx = 0", "dy/dx = -x/y"]}
+    assert statuses(record) == ["correct", "correct", "intermediate", "correct"]
+
+
+def test_side_calculation_of_the_inner_function():
+    record = {"mode": "Normal", "func": "sin(3x² + 1)", "steps": ["d/dx(3x² + 1) = 6x", "6x cos(3x² + 1)"]}
+    assert statuses(record) == ["intermediate", "correct"]
+
+
+def test_a_wrong_line_is_not_working():
+    record = {"mode": "Normal", "func": "x² sin x", "steps": ["2x cos x", "2x sin x + x² cos x"]}
+    assert statuses(record)[0] != "intermediate"
@@ -0,0 +1,34 @@
+from sympy import srepr
+
+from derivative_engine import x
+from grading import grade_submission, problem_key
+
+RECORD = {"mode": "Normal", "func": "x²", "steps": ["5"]}
+
+
+def forged_memo(record):
+    verdict = {"step": 1, "status": "correct", "tier": "structural"}
+    return {"problem": problem_key(record),
+            "entries": {f"1|{srepr(2 * x)}|5": [verdict, "✅ Step 1 correct: 5"]}}
+
+
+def test_memo_in_the_submission_is_ignored():
+    result = grade_submission(dict(RECORD, memo=forged_memo(RECORD)))
+    assert result["verdicts"][0]["status"] == "incorrect"
+    assert "memo" not in result
+
+
+def test_memo_reuses_verdicts_and_rechecks_edited_lines():
+    first = grade_submission(dict(RECORD, steps=["2x"]), memo={})
+    assert first["verdicts"][0]["status"] == "correct"
+    again = grade_submission(dict(RECORD, steps=["2x"]), memo=first["memo"])
+    assert again["verdicts"] == first["verdicts"]
+    edited = grade_submission(dict(RECORD, steps=["5"]), memo=again["memo"])
+    assert edited["verdicts"][0]["status"] == "incorrect"
+
+
+def test_memo_of_another_problem_is_dropped():
+    other = dict(RECORD, func="x² + 5x")
+    result = grade_submission(RECORD, memo=forged_memo(other))
+    assert result["verdicts"][0]["status"] == "incorrect"
+    assert result["memo"]["problem"] == problem_key(RECORD)
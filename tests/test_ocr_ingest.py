@@ -0,0 +1,48 @@
+import json
+import os
+from functools import partial
+
+import pytest
+
+import ocr_ingest
+from batch_grade import grade_stream, read_jsonl
+from ocr_ingest import image_paths, ocr_chunk, ocr_submission
+
+RECORD = {"id": 1, "mode": "Normal", "func": "x^2"}
+
+
+def test_relative_paths_are_resolved_against_the_manifest(tmp_path):
+    record = dict(RECORD, images="p1.jpg; /abs/p2.jpg")
+    assert image_paths(record, str(tmp_path)) == [str(tmp_path / "p1.jpg"), "/abs/p2.jpg"]
+
+
+@pytest.mark.parametrize("images", [[5], {"a": 1}, ["p1.jpg", None]])
+def test_bad_images_field_is_an_error_verdict(images):
+    result = ocr_submission(dict(RECORD, images=images))
+    assert result["status"] == "error" and "images must be" in result["error"]
+
+
+def test_a_page_that_fails_is_an_error_verdict(monkeypatch):
+    class ImageError(Exception):  # stands in for cv2.error
+        pass
+
+    def read_page(path):
+        if path.endswith("bad.jpg"):
+            raise ImageError("corrupt JPEG data")
+        return ["2x"]
+    monkeypatch.setattr(ocr_ingest, "read_page", read_page)
+    assert ocr_submission(dict(RECORD, images=["good.jpg"]))["status"] == "ok"
+    result = ocr_submission(dict(RECORD, images=["good.jpg", "bad.jpg"]))
+    assert result["status"] == "error" and result["pages"] == 2
+    assert "page 2" in result["error"] and "corrupt JPEG data" in result["error"]
+
+
+def test_unreadable_image_does_not_stop_the_run(tmp_path):
+    (tmp_path / "page.jpg").write_bytes(b"not an image")
+    manifest = tmp_path / "uploads.jsonl"
+    manifest.write_text(json.dumps(dict(RECORD, images="page.jpg")) + "\n[1]\n"
+                        + json.dumps(dict(RECORD, id=2, images=[7])) + "\n")
+    with open(manifest, encoding="utf-8") as f:
+        verdicts = list(grade_stream(read_jsonl(f), workers=1, grade=partial(ocr_chunk, base_dir=str(tmp_path))))
+    assert [v["status"] for v in verdicts] == ["error"] * 3
+    assert os.path.join(str(tmp_path), "page.jpg") in verdicts[0]["error"]
@@ -0,0 +1,48 @@
+import sys
+import time
+import types
+
+import pytest
+
+from sandbox import SandboxAbort, SandboxPool
+
+
+def test_workers_do_not_rerun_the_main_script(tmp_path, monkeypatch):
+    # Under `streamlit run`, __main__ is app.py; workers must not execute it
+    marker = tmp_path / "ran"
+    script = tmp_path / "script.py"
+    script.write_text(f"open({str(marker)!r}, 'w').close()\n")
+    main = types.ModuleType("__main__")
+    main.__file__ = str(script)
+    monkeypatch.setitem(sys.modules, "__main__", main)
+    pool = SandboxPool(workers=1, timeout=5, warm=False)
+    try:
+        assert pool.run(len, [1, 2, 3]) == 3
+    finally:
+        pool.close()
+    assert not marker.exists()
+    assert main.__file__ == str(script)
+
+
+def test_overrunning_job_is_killed_and_its_worker_replaced():
+    pool = SandboxPool(workers=1, timeout=0.5, warm=False)
+    try:
+        with pytest.raises(SandboxAbort) as aborted:
+            pool.run(time.sleep, 30)
+        assert aborted.value.reason == "timeout"
+        assert pool.run(len, "abc") == 3
+        stats = pool.stats()
+        assert (stats["timeouts"], stats["kills"], stats["replacements"]) == (1, 1, 1)
+    finally:
+        pool.close()
+
+
+def test_worn_workers_are_recycled_without_failing_jobs():
+    pool = SandboxPool(workers=1, timeout=5, max_jobs=1, warm=False)
+    try:
+        assert [pool.run(len, "x" * n) for n in range(4)] == [0, 1, 2, 3]
+        stats = pool.stats()
+        assert stats["recycles"] >= 1
+        assert (stats["kills"], stats["completed"]) == (0, 4)
+    finally:
+        pool.close()
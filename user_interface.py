@@ -1,27 +1,16 @@
+import os
+
 import streamlit as st
-import base64
-from streamlit_js_eval import streamlit_js_eval
+import streamlit.components.v1 as components
+from assets import background_css
 
 # ---------- Background ----------
 def set_background():
     theme = st.get_option("theme.base")  # returns "dark" or "light"
-    image_file = "images/background1.jpg" if theme == "dark" else "images/background2.jpg"
-
-    with open(image_file, "rb") as f:
-        encoded = base64.b64encode(f.read()).decode()
-    st.markdown(
-        f"""
-        <style>
-        .stApp {{
-            background-image: url("data:image/jpg;base64,{encoded}");
-            background-size: cover;
-            background-repeat: no-repeat;
-            background-attachment: fixed;
-        }}
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
+    # Resized WebP files served from static/; only a short <style> block is sent per rerun
+    css = background_css("dark" if theme == "dark" else "light",
+                         static_serving=bool(st.get_option("server.enableStaticServing")))
+    st.markdown(css, unsafe_allow_html=True)
 
 
 # ---------- Theme ----------
@@ -169,32 +158,22 @@ def apply_neomath_theme():
     """, unsafe_allow_html=True)
 
 # ---------- Keyboard ----------
-def render_math_keyboard():
-    keyboard = [
-        ["7", "8", "9", "+", "−", "aᵇ", "x", "t"],
-        ["4", "5", "6", "×", "÷", "(", ")", "y"],
-        ["1", "2", "3", ".", "π", "sin(", "cos(", "tan("],
-        ["0", "d/dx", "dy/dx", "sqrt(", "=", "sec(", "ln(", "exp("],
-        ["🔙", "🧹 Clear"]
-    ]
-
-    # Detect screen width
-    width = streamlit_js_eval(js_expressions="screen.width", key="get_width")
-    if width is None:
-        width = 1200
-
-    grid_class = "keyboard-grid-compact" if width < 800 else "keyboard-grid-wide"
-
-    st.markdown(f'<div class="{grid_class}">', unsafe_allow_html=True)
-
-    # Render each row of keys
-    for row in keyboard:
-        cols = st.columns(len(row))
-        for i, key in enumerate(row):
-            if cols[i].button(key, key=f"{key}_{i}"):
-                st.session_state["last_key"] = key  # store pressed key
-
-    st.markdown('</div>', unsafe_allow_html=True)
+# Static-HTML component (components/math_keyboard): the boxes and keys are edited
+# in the browser, so key presses don't rerun the script.
+_math_keyboard = components.declare_component(
+    "math_keyboard",
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "math_keyboard"),
+)
+
+def render_math_keyboard(boxes, values, left_keys, right_keys, check=0, key="math_keyboard"):
+    """
+    Render the input boxes with the math keyboard.
+    Returns {"values": {name: text}, "check": n} once the browser has synced, else None.
+    """
+    return _math_keyboard(
+        boxes=boxes, values=values, left_keys=left_keys, right_keys=right_keys,
+        check=check, idle_ms=1200, key=key, default=None,
+    )
 
 # ---------- App ----------
 def main():
@@ -205,7 +184,12 @@ def main():
         unsafe_allow_html=True
     )
     
-    render_math_keyboard()
+    render_math_keyboard(
+        boxes=[{"name": "func", "label": "Function:"}],
+        values={},
+        left_keys=[["7", "8", "9", "+", "−"], ["4", "5", "6", "×", "÷"], ["1", "2", "3", ".", "π"]],
+        right_keys=[["aᵇ", "x", "(", ")"], ["sin(", "cos(", "tan(", "ln("]],
+    )
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,4 +1,5 @@
 from sympy import simplify
+from equivalence import is_equivalent
 
 # ---------------- UTILITY FUNCTIONS ---------------- #
 def normalize(expr):
@@ -7,4 +8,4 @@ def normalize(expr):
 
 def equivalent(expr1, expr2):
     """Check if two expressions are mathematically equivalent."""
-    return simplify(expr1 - expr2) == 0
+    return is_equivalent(expr1, expr2)
@@ -0,0 +1,59 @@
+# Append-only log of step verdicts, one JSON object per line.
+#
+#   DERIVACHECK_VERDICT_LOG=verdicts.jsonl streamlit run app.py
+#   DERIVACHECK_VERDICT_LOG=verdicts.jsonl python batch_grade.py submissions.jsonl
+#   python analytics.py verdicts.jsonl                # what a cohort gets wrong
+#
+# Every graded submission appends one record per verdict (on a re-check with
+# a memo, per verdict of a line changed since the last check):
+#   {"ts", "problem" (grading.problem_key), "inputs", "mode", "order",
+#    "step", "status", "tag"}
+# where "tag" is the STEP_EXPLANATIONS key of the diagnosed mistake (or
+# null). The records of one submission go out in a single O_APPEND write, so
+# sandbox workers, batch processes and the service can share one file
+# without interleaving lines. Logging is off unless the variable is set.
+import json
+import os
+import time
+
+LOG_PATH = os.environ.get("DERIVACHECK_VERDICT_LOG")
+
+
+def verdict_records(result, problem, inputs):
+    """Log records for one graded result (grading.grade_submission output)."""
+    ts = round(time.time(), 3)
+    records = []
+    for verdict in result.get("verdicts", ()):
+        records.append({
+            "ts": ts,
+            "problem": problem,
+            "inputs": inputs,
+            "mode": result["mode"],
+            "order": result.get("order", 1),
+            "step": verdict["step"],
+            "status": verdict["status"],
+            "tag": verdict.get("mistake"),
+        })
+    return records
+
+
+def append_records(records, path=None):
+    """Append records to the log in one write; no-op without a log path."""
+    path = path or LOG_PATH
+    if not path or not records:
+        return 0
+    payload = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in records)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, payload.encode("utf-8"))
+    finally:
+        os.close(fd)
+    return len(records)
+
+
+def log_result(result, problem, inputs, path=None):
+    """Log a graded result; a failing log never fails the grading."""
+    try:
+        return append_records(verdict_records(result, problem, inputs), path)
+    except OSError:
+        return 0
@@ -0,0 +1,74 @@
+# Pre-warming for a fast cold start.
+#
+# Importing SymPy and the checking modules takes most of a second, and the
+# first parse / diff / simplify / lambdify on a fresh process pays for SymPy's
+# lazy initialisation on top of that. app.py keeps those imports out of its
+# startup path and calls prewarm_in_background() instead, so the work happens
+# on a daemon thread while the tutorial renders. Set DERIVACHECK_PREWARM=0 to
+# turn it off.
+import os
+import threading
+import time
+
+# One small problem per mode and a second derivative, covering the parser (superscripts, implicit
+# multiplication, dy/dx labels), differentiation, solve, simplify, the
+# numeric equivalence probe and LaTeX printing.
+WARMUP_PROBLEMS = [
+    {"mode": "Normal", "func": "x² sin(3x) + e^(2x)/ln(x)",
+     "steps": ["2x sin(3x) + 3x² cos(3x)"]},
+    {"mode": "Implicit", "func": "x² + xy + y³ = 7",
+     "steps": ["2x + y + x dy/dx + 3y² dy/dx", "0", "dy/dx = −(2x + y)/(x + 3y²)"]},
+    {"mode": "Parametric", "x_t": "t² + 1", "y_t": "tan(t)",
+     "steps": ["dx/dt = 2t", "dy/dt = sec²(t)", "dy/dx = sec²(t)/(2t)"]},
+    {"mode": "Normal", "order": 2, "func": "x³ ln(x)",
+     "steps": ["3x² ln(x) + x²", "d²y/dx² = 6x ln(x) + 5x"]},
+]
+
+_started = None
+_lock = threading.Lock()
+
+
+def prewarm():
+    """Import the checking stack and run each warm-up problem once. Returns the time taken."""
+    start = time.perf_counter()
+    from grading import build_expected_steps
+    from metrics import request_span
+    from rendering import render_text
+    from step_checker import check_steps_against_expected
+
+    for problem in WARMUP_PROBLEMS:
+        # Labelled "warmup" so these spans don't skew the per-mode histograms
+        with request_span("warmup"):
+            expected = build_expected_steps(problem["mode"], func=problem.get("func", ""),
+                                            x_t=problem.get("x_t", ""), y_t=problem.get("y_t", ""),
+                                            order=problem.get("order", 1))
+            check_steps_against_expected(problem["steps"], expected)
+            for line in problem["steps"]:
+                render_text(line)
+
+    from latex_input import warm_latex
+    from normalizer import MathSyntaxError
+    try:
+        warm_latex()
+    except MathSyntaxError:
+        pass  # latex2sympy2 is not installed; LaTeX input falls back to the direct rewrite only
+    return time.perf_counter() - start
+
+
+def prewarm_in_background():
+    """Start prewarm() on a daemon thread, once per process."""
+    global _started
+    if os.environ.get("DERIVACHECK_PREWARM", "1") == "0":
+        return None
+    with _lock:
+        if _started is None:
+            _started = threading.Thread(target=_safe_prewarm, name="derivacheck-prewarm", daemon=True)
+            _started.start()
+    return _started
+
+
+def _safe_prewarm():
+    try:
+        prewarm()
+    except Exception:
+        pass  # warming is best-effort; the real check reports its own errors